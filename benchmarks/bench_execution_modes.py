@@ -0,0 +1,172 @@
+"""Compare the threaded and async webhook execution modes under the same concurrency.
+
+Usage:
+    python benchmarks/bench_execution_modes.py --webhooks 500 --concurrency 200 --latency 0.05
+
+Every webhook opens a new GitHub issue, which is searched in and created in a fake Jira,
+then commented on a fake GitHub, each request taking `--latency` seconds.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_services import FakeServicesProcess  # noqa: E402
+
+WEBHOOK_SECRET = "bench-secret"
+
+
+def configure_environment(services_url: str, threads: int):
+    """Point the bot to the fake services, must be called before importing it."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    )
+    os.environ.update(
+        {
+            "APP_ID": "1",
+            "PRIVATE_KEY": pem.decode(),
+            "WEBHOOK_SECRET": WEBHOOK_SECRET,
+            "GITHUB_API_URL": f"{services_url}/github",
+            "JIRA_INSTANCE": f"{services_url}/jira",
+            "JIRA_USERNAME": "bench",
+            "JIRA_TOKEN": "bench",
+            "ISSUE_INDEX_PATH": ":memory:",
+            "MAX_CONCURRENT_WEBHOOKS": str(threads),
+            "SYNC_BOT_LOGFILE": os.path.join(tempfile.mkdtemp(), "sync_bot.log"),
+        }
+    )
+
+
+def issue_opened(services_url: str, number: int) -> dict:
+    repo_url = f"{services_url}/github/repos/bench/repo"
+    return {
+        "action": "opened",
+        "installation": {"id": 1},
+        "sender": {"login": "bench-user"},
+        "repository": {
+            "name": "repo",
+            "full_name": "bench/repo",
+            "owner": {"login": "bench"},
+            "url": repo_url,
+            "default_branch": "main",
+        },
+        "issue": {
+            "number": number,
+            "url": f"{repo_url}/issues/{number}",
+            "html_url": f"https://github.com/bench/repo/issues/{number}",
+            "title": f"Benchmark issue {number}",
+            "body": "Steps to reproduce:\n\n1. run `bench`\n2. **observe**\n\n" * 5,
+            "user": {"login": "bench-user"},
+            "labels": [],
+            "state": "open",
+        },
+    }
+
+
+async def run_mode(main, mode: str, payloads: list[dict], concurrency: int) -> dict:
+    main.webhook_execution_mode = mode
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+    peak_threads = threading.active_count()
+
+    async def deliver(client: httpx.AsyncClient, payload: dict):
+        body = json.dumps(payload).encode()
+        signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        headers = {
+            "Content-Type": "application/json",
+            "X-GitHub-Event": "issues",
+            "X-Hub-Signature-256": f"sha256={signature}",
+        }
+        async with limit:
+            start = time.perf_counter()
+            response = await client.post("/", content=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        assert response.json()["msg"].startswith("Issue was created in Jira"), response.text
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app), httpx.AsyncClient(
+        transport=transport, base_url="http://bot", timeout=600
+    ) as client:
+        sampler = asyncio.create_task(sample_threads())
+        start = time.perf_counter()
+        await asyncio.gather(*[deliver(client, payload) for payload in payloads])
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "mode": mode,
+        "elapsed_s": elapsed,
+        "webhooks_per_s": len(payloads) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "peak_threads": peak_threads,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--webhooks", type=int, default=500, help="webhooks per mode")
+    parser.add_argument("--concurrency", type=int, default=200, help="webhooks in flight")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per API call")
+    parser.add_argument(
+        "--threads", type=int, default=20, help="MAX_CONCURRENT_WEBHOOKS of the threaded mode"
+    )
+    args = parser.parse_args(argv)
+
+    with FakeServicesProcess(latency=args.latency) as services:
+        configure_environment(services.url, args.threads)
+        from github_jira_sync_app import main as bot
+
+        logging.getLogger("sync-bot-server").setLevel(logging.WARNING)
+
+        results = []
+        for offset, mode in enumerate(["threaded", "async"]):
+            first = offset * args.webhooks
+            payloads = [issue_opened(services.url, first + n) for n in range(args.webhooks)]
+            services.reset()
+            result = asyncio.run(run_mode(bot, mode, payloads, args.concurrency))
+            result["api_calls"] = sum(services.requests().values())
+            results.append(result)
+
+    print(
+        f"{args.webhooks} webhooks, {args.concurrency} in flight, "
+        f"{args.latency * 1000:.0f} ms per API call"
+    )
+    print(f"{'mode':<10}{'elapsed s':>11}{'webhooks/s':>12}{'p50 ms':>9}{'p95 ms':>9}", end="")
+    print(f"{'threads':>9}{'API calls':>11}")
+    for r in results:
+        print(
+            f"{r['mode']:<10}{r['elapsed_s']:>11.2f}{r['webhooks_per_s']:>12.1f}"
+            f"{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}{r['peak_threads']:>9}{r['api_calls']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
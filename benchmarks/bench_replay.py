@@ -0,0 +1,233 @@
+"""Replay recorded webhook deliveries against the bot, with fake GitHub and Jira services.
+
+Usage:
+    python benchmarks/bench_replay.py --deliveries 1000 --concurrency 50
+    python benchmarks/bench_replay.py --capture deliveries.jsonl --rate 20 --error-rate 0.02
+    python benchmarks/bench_replay.py --throttle-rate 0.05 --max-p95-ms 2000 --json result.json
+
+Deliveries are read from the payload fixtures of the unit tests, or from a JSONL capture with
+one delivery per line: `{"event": "issues", "delivery": "<X-GitHub-Delivery>", "payload": {...}}`.
+They are replayed in order, cycling through the recording, each cycle on distinct issue numbers
+unless `--no-distinct-issues`. The fake services add `--latency` to every API call and answer
+a fraction of them with 503 (`--error-rate`) or 429 (`--throttle-rate`).
+
+With `--rate`, deliveries are sent on a fixed schedule and their latency is measured from their
+scheduled time, so that a slow bot is not hidden by the harness waiting for it. The run fails
+(exit code 1) if a `--max-*`/`--min-*` threshold is not met, to catch regressions in CI.
+"""
+
+import argparse
+import asyncio
+import copy
+import hashlib
+import hmac
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_execution_modes import WEBHOOK_SECRET  # noqa: E402
+from bench_execution_modes import configure_environment  # noqa: E402
+from fake_services import FakeServicesProcess  # noqa: E402
+
+PAYLOADS_DIR = Path(__file__).parent.parent / "tests" / "unit" / "payloads"
+
+# issue numbers of the n-th replay of the recording are shifted by n times this offset
+ISSUE_NUMBER_OFFSET = 1_000_000
+
+
+def load_fixtures(payloads_dir: Path = PAYLOADS_DIR) -> list[dict]:
+    """Return the payload fixtures of the unit tests as deliveries."""
+    deliveries = []
+    for path in sorted(payloads_dir.glob("*.json")):
+        event = "issue_comment" if path.name.startswith("comment_") else "issues"
+        deliveries.append({"event": event, "payload": json.loads(path.read_text())})
+    return deliveries
+
+
+def load_capture(path: Path) -> list[dict]:
+    """Return the deliveries of a JSONL capture, see the module documentation."""
+    deliveries = []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            delivery = json.loads(line)
+            deliveries.append({"event": delivery["event"], "payload": delivery["payload"]})
+    return deliveries
+
+
+def prepare(deliveries: list[dict], services_url: str, count: int, distinct: bool) -> list:
+    """Return `count` (event, body) pairs, with the GitHub API URLs of the fake services."""
+    prepared = []
+    for n in range(count):
+        delivery = deliveries[n % len(deliveries)]
+        payload = copy.deepcopy(delivery["payload"])
+        cycle = n // len(deliveries)
+        if distinct and cycle and "issue" in payload:
+            issue = payload["issue"]
+            issue["number"] += cycle * ISSUE_NUMBER_OFFSET
+            for key in ["url", "html_url"]:
+                issue[key] = f"{issue[key].rsplit('/', 1)[0]}/{issue['number']}"
+        body = json.dumps(payload).replace("https://api.github.com", f"{services_url}/github")
+        prepared.append((delivery["event"], body.encode()))
+    return prepared
+
+
+async def replay(main, deliveries: list, concurrency: int, rate: float) -> dict:
+    limit = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    messages: Counter[str] = Counter()
+
+    async def deliver(client: httpx.AsyncClient, event: str, body: bytes, scheduled: float):
+        signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        headers = {
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event,
+            "X-GitHub-Delivery": str(uuid.uuid4()),
+            "X-Hub-Signature-256": f"sha256={signature}",
+        }
+        await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+        async with limit:
+            start = scheduled if rate else time.perf_counter()
+            try:
+                response = await client.post("/", content=body, headers=headers)
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+                return
+            finally:
+                latencies.append(time.perf_counter() - start)
+        statuses[str(response.status_code)] += 1
+        if response.is_success:
+            messages[response.json().get("msg", "")] += 1
+
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with main.lifespan(main.app), httpx.AsyncClient(
+        transport=transport, base_url="http://bot", timeout=600
+    ) as client:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[
+                deliver(client, event, body, start + (n / rate if rate else 0))
+                for n, (event, body) in enumerate(deliveries)
+            ]
+        )
+        elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "deliveries": len(deliveries),
+        "elapsed_s": elapsed,
+        "throughput_per_s": len(deliveries) / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p95_ms": quantiles[94] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "error_rate": errors / len(deliveries),
+        "statuses": dict(statuses),
+        "messages": dict(messages.most_common()),
+        # kilobytes on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def check_thresholds(result: dict, args) -> list[str]:
+    """Return the thresholds the result does not meet."""
+    failures = []
+    for key, maximum in [
+        ("p95_ms", args.max_p95_ms),
+        ("p99_ms", args.max_p99_ms),
+        ("error_rate", args.max_error_rate),
+        ("peak_rss_mib", args.max_rss_mib),
+    ]:
+        if maximum is not None and result[key] > maximum:
+            failures.append(f"{key} {result[key]:.3f} > {maximum}")
+    throughput = result["throughput_per_s"]
+    if args.min_throughput is not None and throughput < args.min_throughput:
+        failures.append(f"throughput_per_s {throughput:.1f} < {args.min_throughput}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--capture", type=Path, help="JSONL capture (default: test fixtures)")
+    parser.add_argument("--deliveries", type=int, default=500, help="deliveries to send")
+    parser.add_argument("--concurrency", type=int, default=50, help="deliveries in flight")
+    parser.add_argument("--rate", type=float, default=0, help="deliveries per second (0: max)")
+    parser.add_argument(
+        "--distinct-issues",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="replay every cycle of the recording on new issue numbers",
+    )
+    parser.add_argument("--mode", choices=["threaded", "async"], default="threaded")
+    parser.add_argument(
+        "--threads", type=int, default=20, help="MAX_CONCURRENT_WEBHOOKS of the threaded mode"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per API call")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of API 503s")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="fraction of API 429s")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After of the 429s")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the injected failures")
+    parser.add_argument("--json", type=Path, help="also write the result to this file")
+    parser.add_argument("--max-p95-ms", type=float)
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-error-rate", type=float)
+    parser.add_argument("--max-rss-mib", type=float)
+    parser.add_argument("--min-throughput", type=float, help="deliveries per second")
+    args = parser.parse_args(argv)
+
+    recording = load_capture(args.capture) if args.capture else load_fixtures()
+    failures = {
+        "error_rate": args.error_rate,
+        "throttle_rate": args.throttle_rate,
+        "retry_after": args.retry_after,
+        "seed": args.seed,
+    }
+    with FakeServicesProcess(latency=args.latency, **failures) as services:
+        configure_environment(services.url, args.threads)
+        os.environ["WEBHOOK_EXECUTION_MODE"] = args.mode
+        from github_jira_sync_app import main as bot
+
+        # failed deliveries are counted, their tracebacks would flood the report
+        logging.getLogger("sync-bot-server").setLevel(logging.CRITICAL)
+
+        deliveries = prepare(recording, services.url, args.deliveries, args.distinct_issues)
+        result = asyncio.run(replay(bot, deliveries, args.concurrency, args.rate))
+        result["mode"] = args.mode
+        result["api_calls"] = services.requests()
+        result["api_faults"] = services.faults()
+
+    print(
+        f"{result['deliveries']} deliveries ({args.mode}), {args.concurrency} in flight, "
+        f"{args.latency * 1000:.0f} ms per API call"
+    )
+    print(
+        f"throughput {result['throughput_per_s']:.1f}/s, p50 {result['p50_ms']:.0f} ms, "
+        f"p95 {result['p95_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms, "
+        f"errors {result['error_rate']:.1%}, peak RSS {result['peak_rss_mib']:.0f} MiB"
+    )
+    print(f"statuses {result['statuses']}, API calls {result['api_calls']}", end="")
+    print(f", API faults {result['api_faults']}")
+    for msg, count in result["messages"].items():
+        print(f"{count:>8} {msg}")
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+
+    failed = check_thresholds(result, args)
+    if failed:
+        print("FAILED: " + ", ".join(failed))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
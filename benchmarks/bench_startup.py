@@ -0,0 +1,136 @@
+"""Measure the cold start of the bot: its import, and the time until it serves a first webhook.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5
+
+Every run starts the bot in a new uvicorn process, pointed to fake GitHub and Jira services,
+polls `/healthz` and `/readyz` until they succeed, then delivers a webhook opening a new issue.
+Times are measured from the start of the process. The import time of the bot is measured
+separately, in a new interpreter only importing `github_jira_sync_app.main`.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bench_execution_modes import WEBHOOK_SECRET  # noqa: E402
+from bench_execution_modes import configure_environment  # noqa: E402
+from bench_execution_modes import issue_opened  # noqa: E402
+from fake_services import FakeServicesProcess  # noqa: E402
+
+REPO_DIR = Path(__file__).parent.parent
+
+
+def measure_import() -> float:
+    """Return the seconds taken to import the bot in a new interpreter."""
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import github_jira_sync_app.main\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(client: httpx.Client, path: str, deadline: float):
+    while True:
+        try:
+            if client.get(path).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{path} did not succeed in time")
+        time.sleep(0.01)
+
+
+def measure_cold_start(services_url: str, number: int, timeout: float = 60) -> dict:
+    """Start the bot, return the seconds until it is live, ready and has served a webhook."""
+    port = _free_port()
+    body = json.dumps(issue_opened(services_url, number)).encode()
+    signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    headers = {
+        "Content-Type": "application/json",
+        "X-GitHub-Event": "issues",
+        "X-Hub-Signature-256": f"sha256={signature}",
+    }
+
+    start = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    server = subprocess.Popen(
+        [
+            *[sys.executable, "-m", "uvicorn", "github_jira_sync_app.main:app"],
+            *["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        ],
+        cwd=REPO_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            _wait_for(client, "/healthz", deadline)
+            live = time.perf_counter() - start
+            _wait_for(client, "/readyz", deadline)
+            ready = time.perf_counter() - start
+            sent = time.perf_counter()
+            response = client.post("/", content=body, headers=headers)
+            served = time.perf_counter()
+    finally:
+        server.terminate()
+        server.wait()
+
+    assert response.status_code == 200, response.text
+    assert response.json()["msg"].startswith("Issue was created in Jira"), response.text
+    return {
+        "live_s": live,
+        "ready_s": ready,
+        "first_webhook_s": served - start,
+        "first_webhook_ms": (served - sent) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts measured")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per API call")
+    args = parser.parse_args(argv)
+
+    with FakeServicesProcess(latency=args.latency) as services:
+        # the started processes inherit the environment
+        configure_environment(services.url, threads=20)
+        imports = [measure_import() for _ in range(args.runs)]
+        starts = [measure_cold_start(services.url, number) for number in range(args.runs)]
+
+    print(f"median of {args.runs} runs, {args.latency * 1000:.0f} ms per API call")
+    print(f"{'import s':>10}{'live s':>9}{'ready s':>9}{'webhook s':>11}{'webhook ms':>12}")
+    print(
+        f"{statistics.median(imports):>10.2f}"
+        f"{statistics.median(s['live_s'] for s in starts):>9.2f}"
+        f"{statistics.median(s['ready_s'] for s in starts):>9.2f}"
+        f"{statistics.median(s['first_webhook_s'] for s in starts):>11.2f}"
+        f"{statistics.median(s['first_webhook_ms'] for s in starts):>12.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""In-process fake GitHub and Jira REST APIs with simulated latency and failures.
+
+They serve the calls made by the bot, through PyGithub and python-jira in the threaded
+mode and through the async clients in the async mode, so both modes can be benchmarked
+without touching the real services. GitHub is served under `/github`, Jira under `/jira`.
+"""
+
+import asyncio
+import base64
+import hashlib
+import itertools
+import math
+import multiprocessing
+import random
+import re
+import socket
+import time
+from collections import Counter
+
+import httpx
+import uvicorn
+import yaml
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.responses import Response
+from starlette.routing import Mount
+from starlette.routing import Route
+
+GH_ISSUE_URL_RE = re.compile(r"created from GitHub Issue (\S+?)\\")
+
+BENCH_CONFIG = {
+    "settings": {
+        "jira_project_key": "BENCH",
+        "status_mapping": {"opened": "To Do", "closed": "Done"},
+        "labels": [],
+        "add_gh_comment": True,
+        "sync_description": True,
+        "sync_comments": True,
+    }
+}
+
+
+class FakeServices:
+    """Fake GitHub and Jira, holding the Jira issues in memory.
+
+    Failures are drawn from a seeded random generator, so that runs with the same
+    arguments inject the same failures.
+
+    Args:
+        latency: seconds every request waits before being answered
+        error_rate: fraction of the requests answered with a 503
+        throttle_rate: fraction of the requests answered with a 429
+        retry_after: seconds of the Retry-After header of the 429 responses
+        seed: seed of the failures
+
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        retry_after: float = 1,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.requests: Counter[str] = Counter()
+        # "<service> <status>" -> number of failures injected
+        self.faults: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self.issues: dict[str, dict] = {}
+        self._ids = itertools.count(1)
+
+        config = yaml.safe_dump(BENCH_CONFIG).encode()
+        self._config = {
+            "type": "file",
+            "encoding": "base64",
+            "name": ".jira_sync_config.yaml",
+            "path": ".github/.jira_sync_config.yaml",
+            "content": base64.b64encode(config).decode(),
+            "sha": hashlib.sha1(config).hexdigest(),
+        }
+
+        github = [
+            Route("/app/installations/{id}/access_tokens", self.access_token, methods=["POST"]),
+            Route("/repos/{owner}/{repo}/contents/{path:path}", self.contents),
+            Route("/repos/{owner}/{repo}/issues/{number}/labels", self.ok, methods=["POST"]),
+            Route("/repos/{owner}/{repo}/issues/{number}/comments", self.ok, methods=["POST"]),
+        ]
+        jira = [
+            Route("/rest/api/2/serverInfo", self.server_info),
+            Route("/rest/api/2/field", self.fields),
+            Route("/rest/api/2/search/jql", self.search, methods=["GET", "POST"]),
+            Route("/rest/api/2/issue", self.create_issue, methods=["POST"]),
+            Route("/rest/api/2/issue/{key}", self.issue, methods=["GET", "PUT"]),
+            Route("/rest/api/2/issue/{key}/transitions", self.transitions, methods=["GET", "POST"]),
+            Route("/rest/api/2/issue/{key}/comment", self.ok, methods=["POST"]),
+            Route("/rest/api/2/project/{key}/components", self.components),
+        ]
+        self.app = Starlette(
+            routes=[
+                Mount("/github", routes=github),
+                Mount("/jira", routes=jira),
+                Route("/stats", self.stats, methods=["GET", "DELETE"]),
+                Route("/faults", self.faults_stats),
+            ]
+        )
+        self.app.middleware("http")(self._delay)
+
+    async def _delay(self, request: Request, call_next):
+        service = request.url.path.split("/")[1]
+        if service not in ["stats", "faults"]:
+            self.requests[service] += 1
+            await asyncio.sleep(self.latency)
+            fault = self._random.random()
+            if fault < self.throttle_rate:
+                self.faults[f"{service} 429"] += 1
+                return JSONResponse(
+                    {"message": "API rate limit exceeded"},
+                    status_code=429,
+                    headers={"Retry-After": str(math.ceil(self.retry_after))},
+                )
+            if fault < self.throttle_rate + self.error_rate:
+                self.faults[f"{service} 503"] += 1
+                return JSONResponse({"message": "Service unavailable"}, status_code=503)
+        return await call_next(request)
+
+    async def stats(self, request: Request):
+        if request.method == "DELETE":
+            self.requests.clear()
+            self.faults.clear()
+        return JSONResponse(self.requests)
+
+    async def faults_stats(self, request: Request):
+        return JSONResponse(self.faults)
+
+    async def access_token(self, request: Request):
+        expires_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + 3600))
+        return JSONResponse({"token": "ghs_bench", "expires_at": expires_at}, status_code=201)
+
+    async def contents(self, request: Request):
+        etag = f'"{self._config["sha"]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status_code=304)
+        return JSONResponse(self._config, headers={"ETag": etag})
+
+    async def ok(self, request: Request):
+        return JSONResponse({"id": next(self._ids)}, status_code=201)
+
+    async def server_info(self, request: Request):
+        return JSONResponse(
+            {"versionNumbers": [1001, 0, 0], "version": "1001.0.0", "deploymentType": "Cloud"}
+        )
+
+    async def fields(self, request: Request):
+        return JSONResponse([])
+
+    async def search(self, request: Request):
+        if request.method == "POST":
+            jql = (await request.json())["jql"]
+        else:
+            jql = request.query_params["jql"]
+        match = GH_ISSUE_URL_RE.search(jql)
+        issues = [
+            issue
+            for issue in self.issues.values()
+            if match and match.group(1) in issue["fields"]["description"]
+        ]
+        return JSONResponse({"issues": issues, "isLast": True})
+
+    async def create_issue(self, request: Request):
+        fields = (await request.json())["fields"]
+        issue_id = next(self._ids)
+        key = f"{fields['project']['key']}-{issue_id}"
+        self.issues[key] = {
+            "id": str(issue_id),
+            "key": key,
+            "self": f"{request.base_url}jira/rest/api/2/issue/{issue_id}",
+            "fields": {
+                "description": fields["description"],
+                "labels": [],
+                "components": [],
+                "issuetype": fields["issuetype"],
+                "status": {"name": "To Do"},
+            },
+        }
+        return JSONResponse(
+            {"id": str(issue_id), "key": key, "self": self.issues[key]["self"]}, status_code=201
+        )
+
+    async def issue(self, request: Request):
+        issue = self._find(request.path_params["key"])
+        if issue is None:
+            return JSONResponse({"errorMessages": ["Issue does not exist"]}, status_code=404)
+        if request.method == "PUT":
+            issue["fields"].update((await request.json()).get("fields", {}))
+            return Response(status_code=204)
+        return JSONResponse(issue)
+
+    async def transitions(self, request: Request):
+        if request.method == "POST":
+            return Response(status_code=204)
+        transitions = [{"id": "11", "name": "To Do"}, {"id": "31", "name": "Done"}]
+        return JSONResponse({"transitions": transitions})
+
+    async def components(self, request: Request):
+        return JSONResponse([])
+
+    def _find(self, key_or_id: str) -> dict | None:
+        if key_or_id in self.issues:
+            return self.issues[key_or_id]
+        return next((i for i in self.issues.values() if i["id"] == key_or_id), None)
+
+
+class FakeServicesProcess:
+    """Serve `FakeServices` with uvicorn from a subprocess, on a free local port.
+
+    A subprocess keeps the fake services from competing for the GIL with the benchmarked
+    server. The number of requests received per service is available via `requests()`, the
+    failures injected via `faults()`. Arguments are the ones of `FakeServices`.
+    """
+
+    def __init__(self, latency: float = 0.05, **failures):
+        self._socket = socket.socket()
+        self._socket.bind(("127.0.0.1", 0))
+        self.url = "http://127.0.0.1:{}".format(self._socket.getsockname()[1])
+        self._process = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(self._socket, latency), kwargs=failures, daemon=True
+        )
+
+    def requests(self) -> dict[str, int]:
+        return httpx.get(f"{self.url}/stats").json()
+
+    def faults(self) -> dict[str, int]:
+        return httpx.get(f"{self.url}/faults").json()
+
+    def reset(self):
+        httpx.delete(f"{self.url}/stats").raise_for_status()
+
+    def __enter__(self) -> "FakeServicesProcess":
+        self._process.start()
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                self.reset()
+                return self
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def __exit__(self, *exc_info):
+        self._process.terminate()
+        self._process.join()
+        self._socket.close()
+
+
+def _serve(sock: socket.socket, latency: float, **failures):
+    services = FakeServices(latency, **failures)
+    config = uvicorn.Config(
+        services.app, log_level="warning", lifespan="off", timeout_keep_alive=60
+    )
+    uvicorn.Server(config).run(sockets=[sock])
@@ -0,0 +1,126 @@
+"""Micro-benchmarks of the CPU-side stages of a webhook, see the README to run them."""
+
+import hashlib
+import hmac
+import json
+import logging
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+import yaml
+
+pytest.importorskip("pytest_benchmark")
+
+from github_jira_sync_app import main  # noqa: E402
+from github_jira_sync_app.config_cache import RepoConfigCache  # noqa: E402
+from github_jira_sync_app.rendering import MarkdownRenderer  # noqa: E402
+from github_jira_sync_app.repo_settings import SettingsCompiler  # noqa: E402
+
+SECRET = "bench-secret"
+
+
+@pytest.mark.benchmark(group="parse")
+def test_parse_body(benchmark, body):
+    benchmark(main._parse_payload, body)
+
+
+@pytest.mark.benchmark(group="signature")
+def test_verify_signature(benchmark, body):
+    signature = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    benchmark(main.verify_signature, body, SECRET, signature)
+
+
+@pytest.mark.benchmark(group="hydration")
+def test_make_gh_issue(benchmark, payload):
+    def hydrate():
+        issue = main._make_gh_issue(None, payload)
+        return issue.repository.full_name, [label.name for label in issue.labels]
+
+    benchmark(hydrate)
+
+
+def _config_file(labels: int) -> bytes:
+    settings = {
+        "settings": {
+            "jira_project_key": "BENCH",
+            "labels": [f"label-{n}" for n in range(labels)],
+            "label_mapping": {f"label-{n}": "Bug" for n in range(labels)},
+            "status_mapping": {"opened": "To Do", "closed": "Done"},
+        }
+    }
+    return yaml.safe_dump(settings).encode()
+
+
+@pytest.mark.benchmark(group="settings")
+@pytest.mark.parametrize("labels", [1, 20, 200])
+def test_compile_settings(benchmark, labels):
+    content = _config_file(labels)
+
+    def setup():
+        return (SettingsCompiler(main.DEFAULT_SETTINGS),), {}
+
+    benchmark.pedantic(lambda compiler: compiler.compile(content), setup=setup, rounds=200)
+
+
+@pytest.mark.benchmark(group="settings")
+@pytest.mark.parametrize("labels", [1, 20, 200])
+def test_cached_settings(benchmark, labels):
+    # config file fetched and compiled by a previous webhook of the repository
+    repo = MagicMock()
+    repo.get_contents.return_value = MagicMock(decoded_content=_config_file(labels))
+    config_cache = RepoConfigCache()
+    compiler = SettingsCompiler(main.DEFAULT_SETTINGS)
+
+    def lookup():
+        content = config_cache.get("canonical/bench", repo)
+        return compiler.compile(content, source="canonical/bench")
+
+    lookup()
+    benchmark(lookup)
+    repo.get_contents.assert_called_once()
+
+
+@pytest.mark.benchmark(group="render")
+def test_render_description(benchmark, payload):
+    renderer = MarkdownRenderer(cache_bytes=0)
+    benchmark(renderer.render_description, payload["issue"]["body"])
+
+
+@pytest.mark.benchmark(group="render")
+def test_render_description_cached(benchmark, payload):
+    renderer = MarkdownRenderer()
+    renderer.render_description(payload["issue"]["body"])
+    benchmark(renderer.render_description, payload["issue"]["body"])
+
+
+@pytest.mark.benchmark(group="summary")
+@pytest.mark.parametrize(
+    "template",
+    [None, "[{issue.repository.name}] {issue.title}", "{issue.user.login}: {issue.title}"],
+    ids=["title", "repository", "user"],
+)
+def test_generate_summary(benchmark, payload, template):
+    issue = main._make_gh_issue(None, payload)
+    benchmark(main._generate_summary, template, issue)
+
+
+@pytest.mark.benchmark(group="logging")
+@pytest.mark.parametrize("with_exception", [False, True], ids=["message", "exception"])
+def test_json_formatter(benchmark, with_exception):
+    exc_info = None
+    if with_exception:
+        try:
+            json.loads("{")
+        except ValueError:
+            exc_info = sys.exc_info()
+    record = logging.LogRecord(
+        "sync-bot-server",
+        logging.INFO,
+        __file__,
+        1,
+        "Received webhook %s, action=%s",
+        ("72d3162e-cc78-11e3-81ab-4c9367dc0958", "opened"),
+        exc_info,
+    )
+    benchmark(main.JSONFormatter().format, record)
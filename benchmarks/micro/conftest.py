@@ -0,0 +1,73 @@
+"""Payloads of the micro-benchmarks, from the unit test fixtures grown to realistic sizes."""
+
+import copy
+import json
+from pathlib import Path
+
+import pytest
+from dotenv import load_dotenv
+
+PAYLOADS_DIR = Path(__file__).parent.parent.parent / "tests" / "unit" / "payloads"
+
+# the bot reads its configuration when imported
+load_dotenv(PAYLOADS_DIR.parent / "dumm_env")
+
+MARKDOWN_BLOCK = """## Steps to reproduce
+
+1. Run `snap install foo --channel=latest/edge`
+2. Open **Settings** and click [Apply](https://example.com/apply)
+
+```python
+def reproduce():
+    return foo.run(retries=3)
+```
+
+| version | result |
+|---------|--------|
+| 1.2.3   | fails  |
+
+> Works on `1.2.2`, see #42.
+
+"""
+
+# size -> (markdown blocks of the issue body, labels, comments)
+SIZES = {
+    "small": (1, 2, 0),
+    "medium": (20, 10, 30),
+    "huge": (400, 50, 500),
+}
+
+
+def make_payload(size: str) -> dict:
+    """Return an `opened` issue webhook with a body, labels and comment count of the size."""
+    blocks, labels, comments = SIZES[size]
+    payload = json.loads((PAYLOADS_DIR / "issue_created_with_label.json").read_text())
+    issue = payload["issue"]
+    issue["body"] = MARKDOWN_BLOCK * blocks
+    label = issue["labels"][0]
+    issue["labels"] = [dict(copy.deepcopy(label), name=f"label-{n}") for n in range(labels)]
+    issue["comments"] = comments
+    return payload
+
+
+def pytest_sessionstart(session):
+    """Fail when there is no baseline to compare with, pytest-benchmark only warns."""
+    benchmarks = getattr(session.config, "_benchmarksession", None)
+    if benchmarks is None or not benchmarks.compare:
+        return
+    compare = () if benchmarks.compare is True else (benchmarks.compare,)
+    if not list(benchmarks.storage.load(*compare)):
+        raise pytest.UsageError(
+            f"No baseline to compare with in {benchmarks.storage}, save one with "
+            "`tox -e bench-save` on this machine"
+        )
+
+
+@pytest.fixture(params=list(SIZES))
+def payload(request) -> dict:
+    return make_payload(request.param)
+
+
+@pytest.fixture()
+def body(payload) -> bytes:
+    return json.dumps(payload).encode()
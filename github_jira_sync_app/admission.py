@@ -0,0 +1,106 @@
+"""Admission control of the webhooks waiting for a worker."""
+
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import anyio
+
+logger = logging.getLogger("sync-bot-server")
+
+
+class Overloaded(Exception):
+    """Raised when a webhook is not admitted, to be answered with a 503."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Too many webhooks in progress ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Reject the webhooks that would wait too long for a free worker.
+
+    Without admission control, webhooks beyond the worker limit wait for a worker until
+    GitHub times them out, e.g. during a Jira slowdown. A webhook is rejected right away
+    when `max_waiting` webhooks are already waiting, or once it waited `max_wait` seconds,
+    so that GitHub redelivers it later instead of piling up connections.
+
+    Args:
+        max_waiting: maximum number of webhooks waiting for a worker, 0 for no limit
+        max_wait: maximum seconds a webhook waits for a worker, 0 for no limit
+        retry_after: seconds of the Retry-After header of the rejections
+        meter: OpenTelemetry meter of the in-flight, waiting and rejected webhooks, if any
+
+    """
+
+    def __init__(
+        self, max_waiting: int = 0, max_wait: float = 0, retry_after: int = 60, meter=None
+    ):
+        self._max_waiting = max_waiting
+        self._max_wait = max_wait
+        self._retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self._rejected_counter = None
+        if meter is not None:
+            self._instrument(meter)
+
+    @asynccontextmanager
+    async def admit(self, limiter: anyio.CapacityLimiter) -> AsyncIterator[None]:
+        """Hold a token of the worker limiter while the webhook is processed.
+
+        Raises:
+            Overloaded: if the webhook is not admitted
+
+        """
+        try:
+            limiter.acquire_nowait()
+        except anyio.WouldBlock:
+            await self._wait(limiter)
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            limiter.release()
+
+    async def _wait(self, limiter: anyio.CapacityLimiter):
+        if 0 < self._max_waiting <= self.waiting:
+            self._reject("queue_full")
+
+        self.waiting += 1
+        try:
+            with anyio.fail_after(self._max_wait or None):
+                await limiter.acquire()
+        except TimeoutError:
+            self._reject("wait_timeout")
+        finally:
+            self.waiting -= 1
+
+    def _reject(self, reason: str):
+        logger.warning(
+            f"Webhook rejected ({reason}): {self.in_flight} in flight, {self.waiting} waiting"
+        )
+        if self._rejected_counter is not None:
+            self._rejected_counter.add(1, {"reason": reason})
+        raise Overloaded(reason, self._retry_after)
+
+    def _instrument(self, meter):
+        from opentelemetry.metrics import Observation
+
+        meter.create_observable_gauge(
+            "syncbot_webhooks_in_flight",
+            callbacks=[lambda _options: [Observation(self.in_flight)]],
+            description="Webhooks being processed by a worker",
+        )
+        meter.create_observable_gauge(
+            "syncbot_webhooks_waiting",
+            callbacks=[lambda _options: [Observation(self.waiting)]],
+            description="Webhooks waiting for a worker",
+        )
+        self._rejected_counter = meter.create_counter(
+            "syncbot_webhooks_rejected_total",
+            description="Total number of webhooks answered with 503 as the bot was overloaded",
+        )
@@ -0,0 +1,259 @@
+"""Async GitHub and Jira REST clients used by the async execution mode.
+
+They cover only the calls made while syncing an issue. Jira issues are returned as
+python-jira resources built from the JSON responses, so the code shared with the threaded
+mode can read them (``issue.key``, ``issue.fields.labels``, ``issue.permalink()``) as usual.
+"""
+
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any
+from typing import Callable
+
+import httpx
+from github.InstallationAuthorization import InstallationAuthorization
+from jira import JIRAError
+from jira.resources import Component
+from jira.resources import Issue as JiraIssue
+
+from .circuit_breaker import CircuitBreaker
+from .rate_limits import AdaptiveLimiter
+
+Limiter = Callable[[], AdaptiveLimiter | None]
+
+# fields read from the Jira issues found for a GitHub issue
+JIRA_ISSUE_FIELDS = ["labels", "components", "issuetype", "status"]
+
+
+class _Sender:
+    """Send requests with a bounded concurrency, retrying transport errors.
+
+    Requests beyond ``max_connections`` wait on a semaphore: the connection pool of httpx
+    scans all the queued requests whenever a connection is released, which burns CPU on
+    the event loop when thousands of webhooks are in flight. Transport errors are retried
+    like PyGithub and python-jira do, they are mostly keep-alive connections closed by the
+    server while idle in the pool. With a ``limiter``, every request also holds a slot of
+    the adaptive limiter of its backend, see `OutboundLimits`, and with a ``breaker``, no
+    request is sent while the backend is down, see `CircuitBreaker`.
+    """
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        max_connections: int,
+        max_retries: int,
+        limiter: Limiter | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.http = http
+        self._slots = asyncio.Semaphore(max_connections)
+        self._max_retries = max_retries
+        self._limiter = limiter
+        self._breaker = breaker
+
+    async def send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                return await self._send_once(method, url, **kwargs)
+            except httpx.TransportError:
+                if attempt >= self._max_retries:
+                    raise
+                await asyncio.sleep(min(0.1 * 2**attempt, 2))
+                attempt += 1
+
+    async def _send_once(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with AsyncExitStack() as stack:
+            # the breaker first, not to wait for a slot to call a backend that is down
+            breaker_call = limiter_call = None
+            if self._breaker is not None:
+                breaker_call = await stack.enter_async_context(self._breaker.call_async())
+            limiter = self._limiter() if self._limiter is not None else None
+            if limiter is not None:
+                limiter_call = await stack.enter_async_context(limiter.call_async())
+
+            async with self._slots:
+                response = await self.http.request(method, url, **kwargs)
+            if breaker_call is not None:
+                breaker_call.observe(response.status_code, response.headers)
+            if limiter_call is not None:
+                limiter_call.observe(response.status_code, response.headers)
+        return response
+
+
+class AsyncGithubClient:
+    """GitHub REST client authenticated as the GitHub App or as one of its installations.
+
+    Args:
+        http: HTTP client, its ``base_url`` is the GitHub API URL
+        create_jwt: callable returning a JWT authenticating the GitHub App
+        max_connections: maximum number of requests sent concurrently
+        max_retries: number of retries of a request failing with a transport error
+        limiter: callable returning the adaptive limiter of the requests, if any
+        breaker: circuit breaker of the backend, if any
+
+    """
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        create_jwt: Callable[[], str],
+        max_connections: int = 100,
+        max_retries: int = 3,
+        limiter: Limiter | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self._sender = _Sender(http, max_connections, max_retries, limiter, breaker)
+        self._create_jwt = create_jwt
+
+    async def get_access_token(self, installation_id: int) -> InstallationAuthorization:
+        """Mint a new access token for the installation."""
+        response = await self._request(
+            "POST",
+            f"/app/installations/{installation_id}/access_tokens",
+            headers={"Authorization": f"Bearer {self._create_jwt()}"},
+        )
+        response.raise_for_status()
+        return InstallationAuthorization(
+            None, response.headers, response.json(), completed=True  # type: ignore[arg-type]
+        )
+
+    async def get_contents(
+        self, repo_full_name: str, path: str, token: str, etag: str | None = None
+    ) -> httpx.Response:
+        """Request a file of the repository, conditionally if `etag` is given.
+
+        The response is returned as is (200, 304 or 404), so that `RepoConfigCache` can
+        handle it like the responses of the threaded mode.
+        """
+        headers = self._headers(token)
+        if etag:
+            headers["If-None-Match"] = etag
+        return await self._request(
+            "GET", f"/repos/{repo_full_name}/contents/{path}", headers=headers
+        )
+
+    async def add_labels(self, issue_url: str, token: str, labels: list[str]):
+        """Add labels to the issue with the given API URL."""
+        response = await self._request(
+            "POST", f"{issue_url}/labels", json={"labels": labels}, headers=self._headers(token)
+        )
+        response.raise_for_status()
+
+    async def create_comment(self, issue_url: str, token: str, body: str):
+        """Comment the issue with the given API URL."""
+        response = await self._request(
+            "POST", f"{issue_url}/comments", json={"body": body}, headers=self._headers(token)
+        )
+        response.raise_for_status()
+
+    async def aclose(self):
+        await self._sender.http.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self._sender.send(method, url, **kwargs)
+
+    @staticmethod
+    def _headers(token: str) -> dict[str, str]:
+        return {"Authorization": f"token {token}", "Accept": "application/vnd.github+json"}
+
+
+class AsyncJiraClient:
+    """Jira REST (v2) client mirroring the subset of `jira.JIRA` used by the bot.
+
+    Failed requests raise `JIRAError` with the status code of the response, as python-jira
+    does. Unlike python-jira, created and updated issues are not fetched again.
+
+    Args:
+        http: HTTP client, its ``base_url`` is the Jira instance
+        credentials: callable returning the current (username, token) credentials
+        max_connections: maximum number of requests sent concurrently
+        max_retries: number of retries of a request failing with a transport error
+        limiter: callable returning the adaptive limiter of the requests, if any
+        breaker: circuit breaker of the backend, if any
+
+    """
+
+    def __init__(
+        self,
+        http: httpx.AsyncClient,
+        credentials: Callable[[], tuple[str, str]],
+        max_connections: int = 100,
+        max_retries: int = 3,
+        limiter: Limiter | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self._sender = _Sender(http, max_connections, max_retries, limiter, breaker)
+        self._credentials = credentials
+        self._options = {"server": str(http.base_url).rstrip("/")}
+
+    async def enhanced_search_issues(self, jql: str, fields: list[str] | None = None) -> list:
+        """Return the first page of issues matching the JQL query."""
+        data = await self._request(
+            "POST",
+            "/rest/api/2/search/jql",
+            json={"jql": jql, "fields": fields or JIRA_ISSUE_FIELDS},
+        )
+        return [self._issue(raw) for raw in data.get("issues", [])]
+
+    async def issue(self, key: str, fields: list[str] | None = None) -> JiraIssue:
+        data = await self._request(
+            "GET",
+            f"/rest/api/2/issue/{key}",
+            params={"fields": ",".join(fields or JIRA_ISSUE_FIELDS)},
+        )
+        return self._issue(data)
+
+    async def create_issue(self, fields: dict) -> JiraIssue:
+        """Create an issue, the result only knows its `id` and `key`."""
+        data = await self._request("POST", "/rest/api/2/issue", json={"fields": fields})
+        return self._issue(data)
+
+    async def update_issue(self, issue: JiraIssue, fields: dict):
+        await self._request("PUT", f"/rest/api/2/issue/{issue.key}", json={"fields": fields})
+
+    async def transitions(self, issue: JiraIssue) -> list[dict]:
+        data = await self._request("GET", f"/rest/api/2/issue/{issue.key}/transitions")
+        return data.get("transitions", [])
+
+    async def transition_issue(self, issue: JiraIssue, transition: str):
+        """Transition the issue, `transition` being the id or the name of the transition."""
+        if not transition.isdigit():
+            transition_id = next(
+                (
+                    t["id"]
+                    for t in await self.transitions(issue)
+                    if t["name"].lower() == transition.lower()
+                ),
+                None,
+            )
+            if transition_id is None:
+                raise JIRAError(f"Invalid transition name. {transition}")
+            transition = transition_id
+
+        await self._request(
+            "POST",
+            f"/rest/api/2/issue/{issue.key}/transitions",
+            json={"transition": {"id": transition}},
+        )
+
+    async def add_comment(self, issue: JiraIssue, body: str):
+        await self._request("POST", f"/rest/api/2/issue/{issue.key}/comment", json={"body": body})
+
+    async def project_components(self, project_key: str) -> list:
+        data = await self._request("GET", f"/rest/api/2/project/{project_key}/components")
+        return [Component(self._options, None, raw=raw) for raw in data]  # type: ignore[arg-type]
+
+    async def aclose(self):
+        await self._sender.http.aclose()
+
+    def _issue(self, raw: dict) -> JiraIssue:
+        return JiraIssue(self._options, None, raw=raw)  # type: ignore[arg-type]
+
+    async def _request(self, method: str, url: str, **kwargs) -> Any:
+        response = await self._sender.send(method, url, auth=self._credentials(), **kwargs)
+        if response.is_error:
+            raise JIRAError(response.text, status_code=response.status_code, url=str(response.url))
+        if not response.content:
+            return {}
+        return response.json()
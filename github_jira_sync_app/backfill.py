@@ -0,0 +1,436 @@
+"""Sync the open issues of existing repositories into Jira, e.g. when onboarding a repository.
+
+Usage:
+    python -m github_jira_sync_app.backfill --repo canonical/foo --repo canonical/bar
+    python -m github_jira_sync_app.backfill --installation 12345 --dry-run
+    python -m github_jira_sync_app.backfill --repo canonical/foo --checkpoint backfill.json
+
+Uses the same environment variables as the server. Issues are filtered, and their Jira
+issues built, from the `.jira_sync_config.yaml` of each repository as the webhooks would.
+Issues already linked to a Jira issue (issue index, then a batched JQL search) are skipped,
+the other ones are created with the Jira bulk-create endpoint.
+"""
+
+import argparse
+import json
+import logging
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Callable
+from typing import Collection
+from typing import Iterable
+from typing import Iterator
+
+from github import Github
+from github.Issue import Issue
+from github.PaginatedList import PaginatedList
+from github.Repository import Repository
+from jira import JIRA
+
+from .import_index import GH_ISSUE_URL_RE
+from .issue_index import IssueIndex
+from .repo_settings import RepoSettings
+
+logger = logging.getLogger("sync-bot-server")
+
+# maximum number of issues of a Jira bulk-create request
+JIRA_BULK_LIMIT = 50
+
+
+@dataclass
+class BackfillReport:
+    """Outcome of the backfill of a repository."""
+
+    repo: str
+    listed: int = 0
+    not_labeled: int = 0
+    linked: int = 0
+    created: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+    def summary(self, dry_run: bool = False) -> str:
+        created = "to create" if dry_run else "created"
+        return (
+            f"{self.repo}: {self.listed} open issues, {self.not_labeled} without allowed labels, "
+            f"{self.linked} already in Jira, {len(self.created)} {created}, "
+            f"{len(self.failed)} failed"
+        )
+
+
+class Checkpoint:
+    """Progress of the backfill, saved to a JSON file so that it can be resumed.
+
+    Issues are processed in creation order, so the progress of a repository is the number
+    of its last processed issue, along with the numbers of the issues whose Jira issue
+    failed to be created, retried when the backfill is resumed.
+
+    Args:
+        path: JSON file, None to not save the progress
+
+    """
+
+    def __init__(self, path: str | None):
+        self._path = Path(path) if path else None
+        self._repos: dict[str, dict] = {}
+        if self._path and self._path.exists():
+            self._repos = json.loads(self._path.read_text())
+
+    def last_number(self, repo_name: str) -> int:
+        return self._repos.get(repo_name, {}).get("last_number", 0)
+
+    def failed_numbers(self, repo_name: str) -> set[int]:
+        return set(self._repos.get(repo_name, {}).get("failed", []))
+
+    def is_done(self, repo_name: str) -> bool:
+        return self._repos.get(repo_name, {}).get("done", False)
+
+    def save(
+        self, repo_name: str, last_number: int, done: bool = False, failed: Iterable[int] = ()
+    ):
+        self._repos[repo_name] = {"last_number": last_number, "done": done}
+        if failed:
+            self._repos[repo_name]["failed"] = sorted(failed)
+        if self._path:
+            tmp_path = self._path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._repos, indent=2))
+            tmp_path.replace(self._path)
+
+
+def wait_for_rate_limit(github: Github, min_remaining: int):
+    """Sleep until the GitHub rate limit resets if fewer than `min_remaining` calls are left."""
+    remaining, _limit = github.rate_limiting
+    if remaining >= min_remaining:
+        return
+    delay = max(github.rate_limiting_resettime - time.time(), 0) + 1
+    logger.warning(f"{remaining} GitHub API calls left, waiting {delay:.0f}s for the reset")
+    time.sleep(delay)
+
+
+def list_open_issues(
+    github: Github,
+    repo: Repository,
+    after_number: int = 0,
+    min_remaining: int = 100,
+    retry: Collection[int] = (),
+) -> Iterator[Issue]:
+    """Yield the open issues of the repository (not the pull requests), oldest first.
+
+    Issues are listed 100 per request, pausing when the rate limit is almost exhausted.
+    They are built like the issues of the webhooks, with their repository attached.
+    Only the issues after `after_number` are yielded, and the ones of `retry`.
+    """
+    from .main import _make_gh_issue
+
+    page = repo.get_issues(state="open", sort="created", direction="asc")
+    for n, issue in enumerate(page):
+        if n % 100 == 0:
+            wait_for_rate_limit(github, min_remaining)
+        if "pull_request" in issue.raw_data:
+            continue
+        if issue.number <= after_number and issue.number not in retry:
+            continue
+        yield _make_gh_issue(
+            github.requester, {"issue": issue.raw_data, "repository": repo.raw_data}
+        )
+
+
+def find_linked_issues(
+    jira: JIRA,
+    index: IssueIndex | None,
+    project_key: str,
+    gh_issue_urls: list[str],
+    on_search: Callable[[], object] | None = None,
+) -> dict[str, str]:
+    """Return the Jira issue keys of the GitHub issues already synced, by GitHub issue URL.
+
+    The issue index is looked up first, the remaining issues with a single JQL search.
+    Links found by the search are added to the index. `on_search` is called before every
+    page of the search, e.g. to charge an API budget.
+    """
+    linked: dict[str, str] = {}
+    if index is not None:
+        for url in gh_issue_urls:
+            jira_key = index.get(url)
+            if jira_key and jira_key.startswith(f"{project_key}-"):
+                linked[url] = jira_key
+
+    missing = [url for url in gh_issue_urls if url not in linked]
+    if not missing:
+        return linked
+
+    clauses = " OR ".join(
+        rf'description ~ "\"This issue was created from GitHub Issue {url}\""' for url in missing
+    )
+    jql = rf'project="{project_key}" AND ({clauses}) ORDER BY created ASC'
+    found = []
+    next_page_token = None
+    while True:
+        if on_search is not None:
+            on_search()
+        page = jira.enhanced_search_issues(
+            jql,
+            nextPageToken=next_page_token,
+            maxResults=100,
+            fields="description",
+            json_result=True,
+        )
+        assert isinstance(page, dict), "Jira did not return a page of issues"
+        for issue in page.get("issues", []):
+            match = GH_ISSUE_URL_RE.search((issue.get("fields") or {}).get("description") or "")
+            # the text search is fuzzy, .../issues/1 also matches .../issues/10
+            if match and match.group(1) in missing and match.group(1) not in linked:
+                linked[match.group(1)] = issue["key"]
+                found.append((match.group(1), issue["key"]))
+        next_page_token = page.get("nextPageToken")
+        if not next_page_token:
+            break
+
+    if found and index is not None:
+        index.set_many(found)
+    return linked
+
+
+def backfill_repo(
+    github: Github,
+    repo: Repository,
+    jira: JIRA,
+    settings: RepoSettings,
+    index: IssueIndex | None,
+    checkpoint: Checkpoint,
+    batch_size: int = JIRA_BULK_LIMIT,
+    dry_run: bool = False,
+    update_github: bool = False,
+    min_remaining: int = 100,
+    jira_delay: float = 0,
+) -> BackfillReport:
+    """Create the Jira issues of the open issues of the repository not synced yet.
+
+    Args:
+        github: GitHub client authenticated as the installation of the repository
+        repo: repository to backfill
+        jira: Jira client
+        settings: compiled settings of the repository
+        index: issue index, if enabled
+        checkpoint: progress of the backfill, updated after every batch, the issues that
+            failed to be created are retried on the next run
+        batch_size: number of issues looked up and created per Jira request
+        dry_run: only report the issues that would be created
+        update_github: label and comment the GitHub issues as configured in the settings
+        min_remaining: GitHub API calls to keep before pausing until the rate limit reset
+        jira_delay: seconds to wait between two Jira bulk-create requests
+
+    Returns:
+        report of the backfill
+
+    """
+    from .main import jira_metadata
+
+    report = BackfillReport(repo.full_name)
+    allowed_components = None
+    if settings.components:
+        allowed_components = jira_metadata.components(jira, settings.jira_project_key)
+
+    last_number = checkpoint.last_number(repo.full_name)
+    # issues that failed in a previous run, listed first as issues are listed oldest first
+    retry = checkpoint.failed_numbers(repo.full_name)
+    failed: set[int] = set()
+
+    def flush(batch: list[Issue], position: int):
+        before = len(report.failed)
+        _sync_batch(
+            jira, settings, index, batch, allowed_components, report, dry_run, update_github
+        )
+        new_failures = set(report.failed[before:])
+        failed.update(i.number for i in batch if i.html_url in new_failures)
+        if not dry_run:
+            pending = {number for number in retry if number > position}
+            checkpoint.save(repo.full_name, last_number, failed=failed | pending)
+        logger.info(report.summary(dry_run))
+        if jira_delay and not dry_run:
+            time.sleep(jira_delay)
+
+    batch: list[Issue] = []
+    for issue in list_open_issues(github, repo, last_number, min_remaining, retry):
+        report.listed += 1
+        last_number = max(last_number, issue.number)
+        labels = {label.name.lower() for label in issue.labels}
+        if settings.labels and settings.labels.isdisjoint(labels):
+            report.not_labeled += 1
+            continue
+        batch.append(issue)
+        if len(batch) == batch_size:
+            flush(batch, issue.number)
+            batch = []
+    if batch:
+        flush(batch, batch[-1].number)
+
+    if not dry_run:
+        # failed issues are retried by the next run, closed ones are forgotten
+        checkpoint.save(repo.full_name, last_number, done=not failed, failed=failed)
+    return report
+
+
+def _sync_batch(
+    jira: JIRA,
+    settings: RepoSettings,
+    index: IssueIndex | None,
+    batch: list[Issue],
+    allowed_components: frozenset[str] | None,
+    report: BackfillReport,
+    dry_run: bool,
+    update_github: bool,
+):
+    """Create the Jira issues of the batch not linked yet, with a single bulk request."""
+    from .main import _build_issue_fields
+    from .main import gh_comment_body_template
+    from .main import gh_synced_label_name
+
+    linked = find_linked_issues(jira, index, settings.jira_project_key, [i.html_url for i in batch])
+    report.linked += len(linked)
+    to_create = [i for i in batch if i.html_url not in linked]
+    if dry_run or not to_create:
+        report.created.extend(i.html_url for i in to_create)
+        return
+
+    fields = [
+        _build_issue_fields(
+            settings, i, {label.name.lower() for label in i.labels}, allowed_components
+        )
+        for i in to_create
+    ]
+    created = []
+    for gh_issue, result in zip(to_create, jira.create_issues(fields, prefetch=False)):
+        if result["status"] != "Success":
+            logger.error(f"{gh_issue.html_url}: Jira issue not created: {result['error']}")
+            report.failed.append(gh_issue.html_url)
+            continue
+
+        jira_issue = result["issue"]
+        created.append((gh_issue.html_url, jira_issue.key))
+        report.created.append(gh_issue.html_url)
+        if update_github and settings.add_gh_synced_label:
+            gh_issue.add_to_labels(gh_synced_label_name)
+        if update_github and settings.add_gh_comment:
+            gh_issue.create_comment(
+                gh_comment_body_template.format(jira_issue_link=jira_issue.permalink())
+            )
+
+    if index is not None and created:
+        index.set_many(created)
+
+
+def list_installation_repos(github: Github) -> PaginatedList[Repository]:
+    """Return the repositories the installation, authenticating `github`, has access to.
+
+    The repositories are listed lazily, 100 per page.
+    """
+    return PaginatedList(
+        Repository,
+        github.requester,
+        "/installation/repositories",
+        {"per_page": 100},
+        list_item="repositories",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--repo",
+        dest="repos",
+        action="append",
+        help="repository (owner/name) to backfill, can be repeated",
+    )
+    source.add_argument(
+        "--installation", type=int, help="backfill all the repositories of this installation"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only report the issues that would be created"
+    )
+    parser.add_argument("--checkpoint", help="JSON file saving the progress, to resume from")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=JIRA_BULK_LIMIT,
+        help=f"issues per Jira request (at most {JIRA_BULK_LIMIT})",
+    )
+    parser.add_argument(
+        "--update-github",
+        action="store_true",
+        help="add the synced label and comment to the GitHub issues, as configured",
+    )
+    parser.add_argument(
+        "--min-rate-remaining",
+        type=int,
+        default=100,
+        help="GitHub API calls to keep before waiting for the rate limit reset",
+    )
+    parser.add_argument(
+        "--jira-delay", type=float, default=0, help="seconds between two Jira bulk creations"
+    )
+    args = parser.parse_args(argv)
+    if not 0 < args.batch_size <= JIRA_BULK_LIMIT:
+        parser.error(f"--batch-size must be between 1 and {JIRA_BULK_LIMIT}")
+
+    from .main import config_cache
+    from .main import git_integration
+    from .main import github_client
+    from .main import issue_index
+    from .main import jira_pool
+    from .main import settings_compiler
+    from .main import token_cache
+    from .repo_settings import SettingsError
+
+    def connect(installation_id: int) -> Github:
+        return github_client(token_cache.get_token(installation_id), per_page=100)
+
+    if args.installation:
+        github = connect(args.installation)
+        targets = [(github, repo) for repo in list_installation_repos(github)]
+    else:
+        targets = []
+        for repo_name in args.repos:
+            owner, name = repo_name.split("/", 1)
+            github = connect(git_integration.get_repo_installation(owner, name).id)
+            targets.append((github, github.get_repo(repo_name)))
+
+    checkpoint = Checkpoint(args.checkpoint)
+    with jira_pool.client() as jira:
+        for github, repo in targets:
+            if checkpoint.is_done(repo.full_name):
+                print(f"{repo.full_name}: already backfilled")
+                continue
+            settings_content = config_cache.get(repo.full_name, repo)
+            if settings_content is None:
+                print(f"{repo.full_name}: no .jira_sync_config.yaml, skipped")
+                continue
+            try:
+                settings = settings_compiler.compile(settings_content, source=repo.full_name)
+            except SettingsError as e:
+                print(f"{repo.full_name}: {e}, skipped")
+                continue
+
+            report = backfill_repo(
+                github,
+                repo,
+                jira,
+                settings,
+                issue_index,
+                checkpoint,
+                batch_size=args.batch_size,
+                dry_run=args.dry_run,
+                update_github=args.update_github,
+                min_remaining=args.min_rate_remaining,
+                jira_delay=args.jira_delay,
+            )
+            print(report.summary(args.dry_run))
+            if args.dry_run:
+                for url in report.created:
+                    print(f"  {url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Circuit breakers failing the webhooks fast while Jira or GitHub is down."""
+
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator
+from typing import Iterator
+from typing import Mapping
+
+import httpx
+import requests
+
+logger = logging.getLogger("sync-bot-server")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# value of the state in the `syncbot_circuit_state` metric
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# responses of a backend that is down, 429 is left to the rate limiters
+OUTAGE_STATUSES = [500, 502, 503, 504]
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a backend that is down."""
+
+    def __init__(self, backend: str, retry_after: int):
+        super().__init__(f"{backend} is unavailable")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+def _is_outage(error: Exception) -> bool | None:
+    """Return whether the error is an outage, None if it says nothing of the backend."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError)):
+        return True
+    # JIRAError and GithubException
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status is None:
+        return None
+    return status in OUTAGE_STATUSES
+
+
+@dataclass
+class _Call:
+    probe: bool
+    status: int | None = None
+
+    def observe(self, status: int, _headers: Mapping[str, str]):
+        """Record the response of the call."""
+        self.status = status
+
+
+class CircuitBreaker:
+    """Closed, open and half-open circuit breaker of the calls to a backend.
+
+    The circuit opens after `failure_threshold` consecutive failed calls (connection errors,
+    timeouts, 5xx), calls failing before a response (e.g. `RateLimited`) are not counted.
+    While open, calls raise `CircuitOpen` without reaching the backend.
+    After `reset_timeout` seconds the circuit is half-open: up to `probes` calls are let
+    through, the circuit closes if they succeed and opens again if one of them fails.
+
+    Args:
+        backend: name of the backend, e.g. `jira`
+        failure_threshold: consecutive failed calls opening the circuit
+        reset_timeout: seconds the circuit stays open before probing the backend
+        probes: calls let through at once while the circuit is half-open
+
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        probes: int = 1,
+    ):
+        self._backend = backend
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._probes = probes
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Close the circuit."""
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._state = CLOSED
+
+    @property
+    def state(self) -> str:
+        """State of the circuit, half-open once an open circuit may probe the backend."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._opened_at + self._reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    @contextmanager
+    def call(self) -> Iterator[_Call]:
+        """Guard a call, its response is reported with `observe`.
+
+        Raises:
+            CircuitOpen: if the circuit is open
+
+        """
+        call = _Call(self._enter())
+        try:
+            yield call
+        except Exception as e:
+            outage = _is_outage(e)
+            if outage is None:
+                # e.g. `RateLimited` before sending the request, or an error after the response
+                outage = None if call.status is None else call.status in OUTAGE_STATUSES
+            self._exit(call, failed=outage)
+            raise
+        self._exit(call, failed=None if call.status is None else call.status in OUTAGE_STATUSES)
+
+    @asynccontextmanager
+    async def call_async(self) -> AsyncIterator[_Call]:
+        """Async variant of `call`, the breaker never waits."""
+        with self.call() as call:
+            yield call
+
+    def check(self):
+        """Raise `CircuitOpen` if the circuit is open, without probing the backend."""
+        with self._lock:
+            if self._state == OPEN:
+                self._raise_if_open()
+
+    def _enter(self) -> bool:
+        """Return whether the call probes the backend, raise if it is not allowed."""
+        with self._lock:
+            if self._state == OPEN:
+                self._raise_if_open()
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self._probes:
+                    raise CircuitOpen(self._backend, 1)
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def _exit(self, call: _Call, failed: bool | None):
+        """Record the outcome of the call, `failed` is None if nothing reached the backend."""
+        with self._lock:
+            if call.probe:
+                self._probes_in_flight -= 1
+                if failed:
+                    self._open()
+                elif failed is not None:
+                    self._failures = 0
+                    self._set_state(CLOSED)
+            elif self._state == CLOSED and failed is not None:
+                self._failures = self._failures + 1 if failed else 0
+                if self._failures >= self._failure_threshold:
+                    self._open()
+
+    def _raise_if_open(self):
+        remaining = self._opened_at + self._reset_timeout - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpen(self._backend, max(1, math.ceil(remaining)))
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            log = logger.info if state == CLOSED else logger.warning
+            log(f"Circuit of {self._backend} is {state.replace('_', '-')}")
+        self._state = state
+
+
+class CircuitBreakers:
+    """Circuit breakers of the backends, e.g. `jira` and `github`.
+
+    Args:
+        backends: names of the backends
+        failure_threshold: consecutive failed calls opening a circuit
+        reset_timeout: seconds a circuit stays open before probing its backend
+        probes: calls let through at once while a circuit is half-open
+        meter: OpenTelemetry meter of the state of the circuits, if any
+
+    """
+
+    def __init__(
+        self,
+        backends: list[str],
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        probes: int = 1,
+        meter=None,
+    ):
+        self._breakers = {
+            backend: CircuitBreaker(backend, failure_threshold, reset_timeout, probes)
+            for backend in backends
+        }
+        if meter is not None:
+            self._instrument(meter)
+
+    def get(self, backend: str) -> CircuitBreaker:
+        return self._breakers[backend]
+
+    def check(self):
+        """Raise `CircuitOpen` if the circuit of any backend is open."""
+        for breaker in self._breakers.values():
+            breaker.check()
+
+    def clear(self):
+        """Close all circuits."""
+        for breaker in self._breakers.values():
+            breaker.reset()
+
+    def _instrument(self, meter):
+        from opentelemetry.metrics import Observation
+
+        meter.create_observable_gauge(
+            "syncbot_circuit_state",
+            callbacks=[
+                lambda _options: [
+                    Observation(STATE_VALUES[breaker.state], {"backend": backend})
+                    for backend, breaker in self._breakers.items()
+                ]
+            ],
+            description="State of the circuit of a backend: 0 closed, 1 half-open, 2 open",
+        )
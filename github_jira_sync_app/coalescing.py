@@ -0,0 +1,114 @@
+"""Debounce of bursts of webhooks updating the same GitHub issue."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from dataclasses import field
+
+logger = logging.getLogger("sync-bot-server")
+
+# actions whose effect only depends on the latest state of the issue
+COALESCIBLE_ACTIONS = frozenset(["edited", "labeled", "unlabeled"])
+
+
+@dataclass
+class _Burst:
+    started: float
+    actions: set[str] = field(default_factory=set)
+    # set when a later event of the burst arrives, releasing the previous one
+    latest: asyncio.Event = field(default_factory=asyncio.Event)
+    # set once the last event of the burst is released
+    released: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class EventCoalescer:
+    """Merge the events of an issue received within a sliding window into a single sync.
+
+    Every event waits `window` seconds for a later event of the same issue. When one arrives,
+    the waiting event is released right away as coalesced, and the later one waits in turn.
+    The last event of the burst is processed with the actions of the whole burst, so a
+    single Jira update applies their effective state. A burst is flushed `max_delay`
+    seconds after its first event at the latest, or as soon as an event of the issue that
+    cannot be delayed arrives, see `flush`. All the bursts live on the event loop.
+
+    Args:
+        window: seconds to wait for a later event, 0 disables coalescing
+        max_delay: maximum seconds an event of a burst is delayed
+        meter: OpenTelemetry meter counting the coalesced events, if any
+
+    """
+
+    def __init__(self, window: float = 0, max_delay: float = 30, meter=None):
+        self.window = window
+        self._max_delay = max_delay
+        self._bursts: dict[str, _Burst] = {}
+        self._counter = None
+        if meter is not None:
+            self._counter = meter.create_counter(
+                "syncbot_coalesced_events_total",
+                description="Total number of webhooks merged into a later webhook of their issue",
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def wait(self, key: str, action: str) -> frozenset[str] | None:
+        """Wait for later events of the issue.
+
+        Args:
+            key: key of the issue, e.g. its URL
+            action: action of the event
+
+        Returns:
+            the actions of the burst to process, None if a later event took over this one
+
+        """
+        now = time.monotonic()
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _Burst(started=now)
+        else:
+            burst.latest.set()
+            burst.latest = asyncio.Event()
+        burst.actions.add(action)
+        latest = burst.latest
+
+        timeout = max(min(self.window, burst.started + self._max_delay - now), 0)
+        try:
+            await asyncio.wait_for(latest.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if latest is burst.latest:
+                # last event of the burst, also when flushed or cancelled
+                if self._bursts.get(key) is burst:
+                    del self._bursts[key]
+                burst.released.set()
+
+        if latest is not burst.latest:
+            if self._counter is not None:
+                self._counter.add(1)
+            return None
+        return frozenset(burst.actions)
+
+    async def flush(self, key: str):
+        """Release the last event of the pending burst of the issue right away.
+
+        Returns once the event is released: it resumes before the caller, so it enters the
+        lane of the issue first, see `IssueLanes`. E.g. an `edited` event waiting for later
+        events is processed before the `closed` event flushing it.
+
+        Args:
+            key: key of the issue, e.g. its URL
+
+        """
+        burst = self._bursts.pop(key, None)
+        if burst is None:
+            return
+        burst.latest.set()
+        await burst.released.wait()
+
+    def clear(self):
+        self._bursts.clear()
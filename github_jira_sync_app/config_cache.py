@@ -0,0 +1,190 @@
+"""Per-repository cache of the `.jira_sync_config.yaml` file."""
+
+import base64
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from typing import Awaitable
+from typing import Callable
+from typing import NamedTuple
+
+import httpx
+from github import UnknownObjectException
+from github.ContentFile import ContentFile
+from github.Repository import Repository
+
+logger = logging.getLogger("sync-bot-server")
+
+CONFIG_PATH = ".github/.jira_sync_config.yaml"
+
+
+class _CachedConfig(NamedTuple):
+    content: bytes | None  # None if the repository has no config file
+    sha: str | None
+    etag: str | None
+    checked_at: float
+
+
+class RepoConfigCache:
+    """Thread-safe cache of the raw config file of every repository, keyed by `owner/repo`.
+
+    A cached file is served without any network I/O for ``ttl`` seconds. After that it is
+    revalidated with a conditional request (``If-None-Match``); GitHub answers unchanged
+    files with 304, which does not count against the rate limit. Repositories without a
+    config file are cached for ``negative_ttl`` seconds. Entries are dropped right away
+    when a `push` webhook touches the config file on the default branch.
+
+    Args:
+        ttl: seconds during which a cached config file is served without revalidation
+        negative_ttl: seconds to remember that a repository has no config file
+
+    """
+
+    def __init__(self, ttl: float = 60, negative_ttl: float = 300):
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._entries: dict[str, _CachedConfig] = {}
+        self._lock = threading.Lock()
+
+    def get(self, repo_name: str, repo: Repository) -> bytes | None:
+        """Return the raw config file of the repository, None if it does not exist.
+
+        Args:
+            repo_name: full name of the repository (`owner/repo`), used as cache key
+            repo: repository object authenticated with the installation token
+
+        Raises:
+            GithubException: if GitHub could not be queried for the file
+
+        """
+        key = repo_name.lower()
+        cached = self._entries.get(key)
+        if cached:
+            ttl = self._ttl if cached.content is not None else self._negative_ttl
+            if time.monotonic() - cached.checked_at < ttl:
+                return cached.content
+
+            if cached.etag:
+                revalidated = self._revalidate(key, repo, cached)
+                if revalidated is not None:
+                    return revalidated.content
+
+        try:
+            contents = repo.get_contents(CONFIG_PATH)
+        except UnknownObjectException:
+            self._store(key, _CachedConfig(None, None, None, time.monotonic()))
+            return None
+
+        entry = self._from_content_file(contents)  # type: ignore[arg-type]
+        self._store(key, entry)
+        return entry.content
+
+    async def get_async(
+        self, repo_name: str, fetch: Callable[[str | None], Awaitable[httpx.Response]]
+    ) -> bytes | None:
+        """Async variant of `get`, for the async execution mode.
+
+        Args:
+            repo_name: full name of the repository (`owner/repo`), used as cache key
+            fetch: coroutine function requesting the config file via the GitHub contents API,
+                conditionally if it is given the etag of the cached file
+
+        Raises:
+            httpx.HTTPError: if GitHub could not be queried for the file
+
+        """
+        key = repo_name.lower()
+        cached = self._entries.get(key)
+        if cached:
+            ttl = self._ttl if cached.content is not None else self._negative_ttl
+            if time.monotonic() - cached.checked_at < ttl:
+                return cached.content
+
+        response = await fetch(cached.etag if cached else None)
+        if response.status_code == 304 and cached:
+            entry = cached._replace(checked_at=time.monotonic())
+        elif response.status_code == 404:
+            entry = _CachedConfig(None, None, None, time.monotonic())
+        else:
+            response.raise_for_status()
+            data = response.json()
+            entry = _CachedConfig(
+                base64.b64decode(data["content"]),
+                data["sha"],
+                response.headers.get("ETag"),
+                time.monotonic(),
+            )
+            if cached and cached.etag:
+                logger.info(f"{key}: {CONFIG_PATH} changed (sha {cached.sha} -> {entry.sha})")
+
+        self._store(key, entry)
+        return entry.content
+
+    def handle_push(self, payload: dict) -> bool:
+        """Invalidate the repository entry if a push changed its config on the default branch.
+
+        Returns:
+            True if the entry was invalidated
+
+        """
+        repository = payload["repository"]
+        if payload.get("ref") != f"refs/heads/{repository.get('default_branch')}":
+            return False
+
+        commits = payload.get("commits") or []
+        touched = {
+            path
+            for commit in commits
+            for key in ["added", "modified", "removed"]
+            for path in commit.get(key) or []
+        }
+        # GitHub includes at most 20 commits in a push payload, and force pushes may rewrite
+        # the history without listing the file, be conservative in both cases
+        if CONFIG_PATH in touched or payload.get("forced") or len(commits) >= 20:
+            self.invalidate(repository["full_name"])
+            return True
+        return False
+
+    def invalidate(self, repo_name: str):
+        """Drop the cached config file of the repository."""
+        with self._lock:
+            self._entries.pop(repo_name.lower(), None)
+
+    def clear(self):
+        """Drop all cached config files."""
+        with self._lock:
+            self._entries = {}
+
+    def _revalidate(
+        self, key: str, repo: Repository, cached: _CachedConfig
+    ) -> _CachedConfig | None:
+        """Revalidate the entry with a conditional request, None if a full fetch is required."""
+        status, headers, output = repo.requester.requestJson(
+            "GET",
+            f"{repo.url}/contents/{urllib.parse.quote(CONFIG_PATH)}",
+            headers={"If-None-Match": cached.etag},
+        )
+        if status == 304:
+            entry = cached._replace(checked_at=time.monotonic())
+            self._store(key, entry)
+            return entry
+
+        if status == 200:
+            contents = ContentFile(repo.requester, headers, json.loads(output), completed=True)
+            entry = self._from_content_file(contents)
+            self._store(key, entry)
+            logger.info(f"{key}: {CONFIG_PATH} changed (sha {cached.sha} -> {entry.sha})")
+            return entry
+
+        return None
+
+    def _from_content_file(self, contents: ContentFile) -> _CachedConfig:
+        return _CachedConfig(
+            contents.decoded_content, contents.sha, contents.etag, time.monotonic()
+        )
+
+    def _store(self, key: str, entry: _CachedConfig):
+        with self._lock:
+            self._entries[key] = entry
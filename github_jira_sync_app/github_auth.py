@@ -0,0 +1,223 @@
+"""Caching of GitHub App installation credentials."""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable
+from typing import Callable
+from typing import NamedTuple
+
+from github import UnknownObjectException
+from github.InstallationAuthorization import InstallationAuthorization
+
+logger = logging.getLogger("sync-bot-server")
+
+# GitHub documents installation tokens as valid for one hour
+DEFAULT_TOKEN_LIFETIME = 3600
+
+
+class _CachedToken(NamedTuple):
+    token: str
+    expires_at: float
+
+
+class InstallationTokenCache:
+    """Thread-safe cache of installation access tokens keyed by installation id.
+
+    A token is reused until ``refresh_margin`` seconds before its ``expires_at``, then
+    it is minted again. Only one thread refreshes a given installation at a time: other
+    threads asking for the same installation wait for that refresh and reuse its result,
+    while lookups for other installations are not blocked.
+
+    Args:
+        fetch_token: callable minting a new token for an installation id
+            (usually ``GithubIntegration.get_access_token``)
+        refresh_margin: seconds before expiration when the token is refreshed
+
+    """
+
+    def __init__(
+        self,
+        fetch_token: Callable[[int], InstallationAuthorization],
+        refresh_margin: float = 300,
+    ):
+        self._fetch_token = fetch_token
+        self._refresh_margin = refresh_margin
+        self._tokens: dict[int, _CachedToken] = {}
+        self._refresh_locks: dict[int, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get_token(self, installation_id: int) -> str:
+        """Return a valid access token for the installation, minting one if needed."""
+        cached = self._tokens.get(installation_id)
+        if cached and self._is_fresh(cached):
+            return cached.token
+
+        with self._refresh_lock(installation_id):
+            # another thread could have refreshed the token while we were waiting
+            cached = self._tokens.get(installation_id)
+            if cached and self._is_fresh(cached):
+                return cached.token
+
+            authorization = self._fetch_token(installation_id)
+            self._tokens[installation_id] = _cached_token(authorization)
+            logger.debug(f"Minted access token for installation {installation_id}")
+            return authorization.token
+
+    def invalidate(self, installation_id: int):
+        """Drop the cached token, e.g. when GitHub rejected it or the App was uninstalled."""
+        self._tokens.pop(installation_id, None)
+
+    def clear(self):
+        """Drop all cached tokens."""
+        self._tokens.clear()
+
+    def _is_fresh(self, cached: _CachedToken) -> bool:
+        return cached.expires_at - self._refresh_margin > time.time()
+
+    def _refresh_lock(self, installation_id: int) -> threading.Lock:
+        with self._guard:
+            return self._refresh_locks.setdefault(installation_id, threading.Lock())
+
+
+class AsyncInstallationTokenCache:
+    """Installation access token cache for the async execution mode.
+
+    Same behavior as `InstallationTokenCache`, with one refreshing coroutine (instead of
+    thread) per installation.
+
+    Args:
+        fetch_token: coroutine function minting a new token for an installation id
+            (usually ``AsyncGithubClient.get_access_token``)
+        refresh_margin: seconds before expiration when the token is refreshed
+
+    """
+
+    def __init__(
+        self,
+        fetch_token: Callable[[int], Awaitable[InstallationAuthorization]],
+        refresh_margin: float = 300,
+    ):
+        self._fetch_token = fetch_token
+        self._refresh_margin = refresh_margin
+        self._tokens: dict[int, _CachedToken] = {}
+        self._refresh_locks: dict[int, asyncio.Lock] = {}
+
+    async def get_token(self, installation_id: int) -> str:
+        """Return a valid access token for the installation, minting one if needed."""
+        cached = self._tokens.get(installation_id)
+        if cached and self._is_fresh(cached):
+            return cached.token
+
+        async with self._refresh_locks.setdefault(installation_id, asyncio.Lock()):
+            cached = self._tokens.get(installation_id)
+            if cached and self._is_fresh(cached):
+                return cached.token
+
+            authorization = await self._fetch_token(installation_id)
+            self._tokens[installation_id] = _cached_token(authorization)
+            logger.debug(f"Minted access token for installation {installation_id}")
+            return authorization.token
+
+    def invalidate(self, installation_id: int):
+        """Drop the cached token, e.g. when GitHub rejected it or the App was uninstalled."""
+        self._tokens.pop(installation_id, None)
+
+    def clear(self):
+        """Drop all cached tokens."""
+        self._tokens.clear()
+
+    def _is_fresh(self, cached: _CachedToken) -> bool:
+        return cached.expires_at - self._refresh_margin > time.time()
+
+
+def _cached_token(authorization: InstallationAuthorization) -> _CachedToken:
+    expires_at = authorization.expires_at
+    if expires_at:
+        expires_ts = expires_at.timestamp()
+    else:
+        expires_ts = time.time() + DEFAULT_TOKEN_LIFETIME
+    return _CachedToken(authorization.token, expires_ts)
+
+
+class _CachedInstallation(NamedTuple):
+    installation_id: int | None
+    expires_at: float
+
+
+class InstallationResolver:
+    """Resolve the GitHub App installation id that serves a repository.
+
+    Webhooks delivered to a GitHub App carry ``installation.id``, so the id is taken from
+    the payload whenever present. Otherwise, the ``owner/repo -> installation id`` mapping is
+    looked up via GitHub and cached for ``ttl`` seconds. Repositories where the App is not
+    installed are cached as well (for ``negative_ttl`` seconds) and resolve to ``None``.
+
+    Args:
+        lookup: callable returning the installation id for ``(owner, repo)``
+            (usually ``GithubIntegration.get_repo_installation(owner, repo).id``)
+        ttl: seconds to keep a resolved mapping
+        negative_ttl: seconds to remember that the App is not installed on a repository
+
+    """
+
+    def __init__(self, lookup: Callable[[str, str], int], ttl: float = 3600, negative_ttl=300):
+        self._lookup = lookup
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._entries: dict[str, _CachedInstallation] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, payload: dict) -> int | None:
+        """Return the installation id for the webhook's repository, None if not installed."""
+        installation_id = (payload.get("installation") or {}).get("id")
+        owner = payload["repository"]["owner"]["login"]
+        repo_name = payload["repository"]["name"]
+        key = f"{owner}/{repo_name}".lower()
+        if installation_id:
+            self._store(key, installation_id, self._ttl)
+            return installation_id
+
+        cached = self._entries.get(key)
+        if cached and cached.expires_at > time.monotonic():
+            return cached.installation_id
+
+        try:
+            installation_id = self._lookup(owner, repo_name)
+        except UnknownObjectException:
+            logger.info(f"{key}: GitHub App is not installed on the repository")
+            self._store(key, None, self._negative_ttl)
+            return None
+
+        self._store(key, installation_id, self._ttl)
+        return installation_id
+
+    def invalidate(self, installation_id: int | None = None, repositories=()):
+        """Drop cached mappings of the installation and of the given repositories.
+
+        Negative entries are always dropped, since a (re)installation may now cover them.
+
+        Args:
+            installation_id: id of the installation whose mappings are dropped
+            repositories: full names (``owner/repo``) of repositories to drop
+
+        """
+        repositories = {name.lower() for name in repositories}
+        with self._lock:
+            self._entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if entry.installation_id is not None
+                and entry.installation_id != installation_id
+                and key not in repositories
+            }
+
+    def clear(self):
+        """Drop all cached mappings."""
+        with self._lock:
+            self._entries = {}
+
+    def _store(self, key: str, installation_id: int | None, ttl: float):
+        with self._lock:
+            self._entries[key] = _CachedInstallation(installation_id, time.monotonic() + ttl)
@@ -0,0 +1,89 @@
+"""Seed the issue index from the Jira issues previously created by the bot.
+
+Usage:
+    python -m github_jira_sync_app.import_index --project MTC --project ABC
+
+Uses the same environment variables as the server (Jira credentials and
+`ISSUE_INDEX_BACKEND`/`ISSUE_INDEX_PATH`).
+"""
+
+import argparse
+import logging
+import re
+
+from jira import JIRA
+
+from .issue_index import IssueIndex
+
+logger = logging.getLogger("sync-bot-server")
+
+GH_ISSUE_URL_RE = re.compile(r"This issue was created from GitHub Issue (https?://\S+)")
+
+
+def import_project(jira: JIRA, index: IssueIndex, project_key: str, page_size: int = 100) -> int:
+    """Link every GitHub issue of the project description to its Jira issue.
+
+    When several Jira issues were created from the same GitHub issue, the oldest one wins,
+    as it is the one the bot keeps updating.
+
+    Returns:
+        number of links imported
+
+    """
+    jql = (
+        rf'project="{project_key}" AND '
+        r'description ~ "\"This issue was created from GitHub Issue\"" ORDER BY created DESC'
+    )
+    imported = 0
+    next_page_token = None
+    while True:
+        page = jira.enhanced_search_issues(
+            jql,
+            nextPageToken=next_page_token,
+            maxResults=page_size,
+            fields="description",
+            json_result=True,
+        )
+        assert isinstance(page, dict), "Jira did not return a page of issues"
+
+        links = []
+        for issue in page.get("issues", []):
+            match = GH_ISSUE_URL_RE.search((issue.get("fields") or {}).get("description") or "")
+            if match:
+                links.append((match.group(1), issue["key"]))
+        index.set_many(links)
+        imported += len(links)
+        logger.info(f"{project_key}: imported {imported} links")
+
+        next_page_token = page.get("nextPageToken")
+        if not next_page_token:
+            return imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--project",
+        dest="projects",
+        action="append",
+        required=True,
+        help="Jira project key to import, can be repeated",
+    )
+    parser.add_argument("--page-size", type=int, default=100, help="Jira issues per request")
+    args = parser.parse_args(argv)
+
+    from .main import issue_index
+    from .main import jira_pool
+
+    if issue_index is None:
+        parser.error("Issue index is disabled (ISSUE_INDEX_BACKEND=none)")
+
+    # same client as the server, authenticated with `JIRA_TOKEN` or `JIRA_TOKEN_FILE`
+    with jira_pool.client() as jira:
+        for project_key in args.projects:
+            imported = import_project(jira, issue_index, project_key, page_size=args.page_size)
+            print(f"{project_key}: {imported} GitHub issues linked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Iterator
+
+from opentelemetry import trace
+
+logger = logging.getLogger("sync-bot-server")
+
+# no-op unless tracing is enabled, see `setup_tracing`
+tracer = trace.get_tracer("sync-bot-server")
+
+
+@dataclass
+class _Delivery:
+    webhook_id: str
+    jira_project: str = "unknown"
+    # stage -> total seconds, in the order the stages started
+    stages: dict[str, float] = field(default_factory=dict)
+
+
+_delivery: ContextVar[_Delivery | None] = ContextVar("delivery", default=None)
+
+
+class StageTimer:
+    """Time the stages of the webhooks: token, config fetch, Jira search, create, etc.
+
+    Every stage is recorded in the `syncbot_stage_duration_seconds` histogram, by stage,
+    outcome (`ok` or `error`) and Jira project. Only the first `max_projects` Jira projects
+    get their own label value, the other ones are recorded as `other`. The stages of a
+    delivery are also summed up in a log line once it is processed. With tracing enabled,
+    a delivery and its stages are spans.
+
+    The delivery is tracked in a context variable: the stages of a webhook processed in a
+    worker thread are added to the delivery started on the event loop.
+
+    Args:
+        meter: OpenTelemetry meter of the histogram, None to only log the timings
+        max_projects: maximum number of Jira project label values
+
+    """
+
+    def __init__(self, meter=None, max_projects: int = 50):
+        self._max_projects = max_projects
+        self._projects: set[str] = set()
+        self._lock = threading.Lock()
+        self._histogram = None
+        if meter is not None:
+            self._histogram = meter.create_histogram(
+                "syncbot_stage_duration_seconds",
+                unit="s",
+                description="Duration of the stages of webhook processing",
+            )
+
+    @contextmanager
+    def delivery(self, webhook_id: str) -> Iterator[None]:
+        """Collect the stages of the webhook, logging them at the end."""
+        delivery = _Delivery(webhook_id)
+        token = _delivery.set(delivery)
+        start = time.perf_counter()
+        try:
+            with tracer.start_as_current_span(
+                "webhook", attributes={"github.delivery": webhook_id}
+            ):
+                yield
+        finally:
+            _delivery.reset(token)
+            if delivery.stages:
+                self._log(delivery, time.perf_counter() - start)
+
+    def set_project(self, project_key: str):
+        """Label the next stages of the current delivery with the Jira project."""
+        delivery = _delivery.get()
+        if delivery is not None:
+            delivery.jira_project = self._bounded(project_key)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage of the current delivery."""
+        delivery = _delivery.get()
+        project = delivery.jira_project if delivery is not None else "unknown"
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with tracer.start_as_current_span(name, attributes={"jira.project": project}):
+                yield
+            outcome = "ok"
+        finally:
+            duration = time.perf_counter() - start
+            if delivery is not None:
+                delivery.stages[name] = delivery.stages.get(name, 0) + duration
+            if self._histogram is not None:
+                self._histogram.record(
+                    duration, {"stage": name, "outcome": outcome, "jira_project": project}
+                )
+
+    def clear(self):
+        with self._lock:
+            self._projects.clear()
+
+    def _bounded(self, project_key: str) -> str:
+        with self._lock:
+            if project_key in self._projects:
+                return project_key
+            if len(self._projects) < self._max_projects:
+                self._projects.add(project_key)
+                return project_key
+        return "other"
+
+    @staticmethod
+    def _log(delivery: _Delivery, total: float):
+        breakdown = ", ".join(
+            f"{name}={seconds * 1000:.0f}ms" for name, seconds in delivery.stages.items()
+        )
+        logger.info(
+            f"Webhook {delivery.webhook_id} processed in {total * 1000:.0f}ms: {breakdown}",
+            extra={
+                "delivery": delivery.webhook_id,
+                "stages": {name: round(seconds, 4) for name, seconds in delivery.stages.items()},
+            },
+        )
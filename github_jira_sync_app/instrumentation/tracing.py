@@ -0,0 +1,85 @@
+import logging
+import os
+
+from fastapi import FastAPI
+from opentelemetry import trace
+from opentelemetry.sdk.resources import SERVICE_NAME
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+logger = logging.getLogger("sync-bot-server")
+
+
+def _delivery_attributes(span, scope: dict):
+    """Tag the root span of a webhook request with its GitHub delivery and event."""
+    if span is None or not span.is_recording():
+        return
+    headers = dict(scope.get("headers") or [])
+    for header, attribute in [
+        (b"x-github-delivery", "github.delivery"),
+        (b"x-github-event", "github.event"),
+    ]:
+        if header in headers:
+            span.set_attribute(attribute, headers[header].decode("latin-1"))
+
+
+def _span_exporter(exporter: str):
+    if exporter == "console":
+        return ConsoleSpanExporter()
+
+    # endpoint, headers and timeout come from the OTEL_EXPORTER_OTLP_* environment variables
+    protocol = os.getenv(
+        "OTEL_EXPORTER_OTLP_TRACES_PROTOCOL", os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc")
+    )
+    if protocol == "grpc":
+        from opentelemetry.exporter.otlp.proto.grpc import (
+            trace_exporter as grpc_exporter,
+        )
+
+        return grpc_exporter.OTLPSpanExporter()
+
+    from opentelemetry.exporter.otlp.proto.http import trace_exporter as http_exporter
+
+    return http_exporter.OTLPSpanExporter()
+
+
+def setup_tracing(app: FastAPI, service_name="sync-bot") -> TracerProvider | None:
+    """Export traces of the webhooks if `OTEL_TRACES_EXPORTER` is `otlp` or `console`.
+
+    The root span of a webhook is the span of its request, tagged with its delivery id.
+    The stages of the webhook are its child spans (see `StageTimer`), with the spans of their
+    GitHub, Jira and Redis calls made with requests, httpx and redis-py. Sampling is set with
+    the standard `OTEL_TRACES_SAMPLER` and `OTEL_TRACES_SAMPLER_ARG` environment variables.
+
+    Returns:
+        the tracer provider, to be shut down to flush the last spans, None if disabled
+
+    """
+    exporter = os.getenv("OTEL_TRACES_EXPORTER", "none").lower()
+    if exporter not in ["otlp", "console"]:
+        return None
+
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+    from opentelemetry.instrumentation.redis import RedisInstrumentor
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+
+    provider = TracerProvider(resource=Resource(attributes={SERVICE_NAME: service_name}))
+    provider.add_span_processor(BatchSpanProcessor(_span_exporter(exporter)))
+    trace.set_tracer_provider(provider)
+
+    FastAPIInstrumentor.instrument_app(
+        app,
+        tracer_provider=provider,
+        excluded_urls="metrics",
+        server_request_hook=_delivery_attributes,
+        # do not create a span per ASGI message of every request
+        exclude_spans=["receive", "send"],
+    )
+    RequestsInstrumentor().instrument(tracer_provider=provider)
+    HTTPXClientInstrumentor().instrument(tracer_provider=provider)
+    RedisInstrumentor().instrument(tracer_provider=provider)
+    logger.info(f"Tracing enabled, exporting spans with {exporter}")
+    return provider
@@ -0,0 +1,139 @@
+"""Persistent mapping of GitHub issues to the Jira issues created from them."""
+
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from typing import Iterable
+
+logger = logging.getLogger("sync-bot-server")
+
+
+class IssueIndex(ABC):
+    """Mapping of GitHub issue URL -> Jira issue key.
+
+    The index is consulted before falling back to a JQL full-text search, which is slow and
+    eventually consistent. It is filled when the bot creates a Jira issue, when a JQL search
+    finds one, and in bulk by `python -m github_jira_sync_app.import_index`.
+    """
+
+    @abstractmethod
+    def get(self, gh_issue_url: str) -> str | None:
+        """Return the key of the Jira issue linked to the GitHub issue, if known."""
+
+    def set(self, gh_issue_url: str, jira_key: str):
+        """Link the GitHub issue to the Jira issue."""
+        self.set_many([(gh_issue_url, jira_key)])
+
+    @abstractmethod
+    def set_many(self, links: Iterable[tuple[str, str]]):
+        """Link every GitHub issue URL to its Jira issue key."""
+
+    @abstractmethod
+    def delete(self, gh_issue_url: str):
+        """Forget the link of the GitHub issue, e.g. when the Jira issue was deleted."""
+
+    @abstractmethod
+    def clear(self):
+        """Forget all the links."""
+
+
+class SQLiteIssueIndex(IssueIndex):
+    """Issue index stored in a local SQLite database (one per replica).
+
+    Args:
+        path: path of the database file, ":memory:" for a non-persistent index
+
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS issue_links ("
+                "gh_issue_url TEXT PRIMARY KEY, jira_key TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def get(self, gh_issue_url: str) -> str | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT jira_key FROM issue_links WHERE gh_issue_url = ?", (gh_issue_url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_many(self, links: Iterable[tuple[str, str]]):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO issue_links (gh_issue_url, jira_key, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(gh_issue_url) DO UPDATE SET "
+                "jira_key = excluded.jira_key, updated_at = excluded.updated_at",
+                [(gh_issue_url, jira_key, now) for gh_issue_url, jira_key in links],
+            )
+
+    def delete(self, gh_issue_url: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM issue_links WHERE gh_issue_url = ?", (gh_issue_url,)
+            )
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM issue_links")
+
+
+class RedisIssueIndex(IssueIndex):
+    """Issue index stored in a Redis hash, shared by all replicas.
+
+    Args:
+        client: Redis client
+        key: name of the Redis hash holding the links
+
+    """
+
+    def __init__(self, client, key: str = "jira:issue-index"):
+        self._client = client
+        self._key = key
+
+    def get(self, gh_issue_url: str) -> str | None:
+        jira_key = self._client.hget(self._key, gh_issue_url)
+        if isinstance(jira_key, bytes):
+            return jira_key.decode()
+        return jira_key
+
+    def set_many(self, links: Iterable[tuple[str, str]]):
+        mapping = dict(links)
+        if mapping:
+            self._client.hset(self._key, mapping=mapping)
+
+    def delete(self, gh_issue_url: str):
+        self._client.hdel(self._key, gh_issue_url)
+
+    def clear(self):
+        self._client.delete(self._key)
+
+
+def create_issue_index(backend: str, path: str, redis_client=None) -> IssueIndex | None:
+    """Create the issue index configured via `ISSUE_INDEX_BACKEND`.
+
+    Args:
+        backend: "sqlite", "redis" or "none" to only rely on JQL searches
+        path: database file of the SQLite backend
+        redis_client: Redis client, required by the Redis backend
+
+    """
+    backend = backend.lower()
+    if backend == "none":
+        return None
+    if backend == "redis":
+        if redis_client is not None:
+            return RedisIssueIndex(redis_client)
+        logger.error("Redis issue index requested, but Redis is not available. Using SQLite.")
+    elif backend != "sqlite":
+        logger.error(f"Unknown issue index backend '{backend}'. Using SQLite.")
+    return SQLiteIssueIndex(path)
@@ -0,0 +1,116 @@
+"""Ordered processing of the webhooks of a GitHub issue, different issues running in parallel."""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from typing import AsyncIterator
+from typing import Iterator
+
+logger = logging.getLogger("sync-bot-server")
+
+
+class IssueLanes:
+    """Lanes serializing the webhooks of the same GitHub issue.
+
+    Within the process, webhooks of an issue wait on the event loop for the previous ones to
+    be processed, in arrival order, so that waiting costs a coroutine instead of a worker
+    thread. Across replicas, the lane of an issue is a Redis lock: a replica waits for the
+    replicas processing the issue instead of ignoring the webhook. A webhook still waiting
+    after `wait_timeout` fails, to be redelivered, rather than being dropped.
+
+    Args:
+        lock_timeout: seconds after which the Redis lock of a crashed replica expires
+        wait_timeout: maximum seconds to wait for the Redis lock
+
+    """
+
+    def __init__(self, lock_timeout: float = 120, wait_timeout: float = 300):
+        self._lock_timeout = lock_timeout
+        self._wait_timeout = wait_timeout
+        # issue key -> lock, number of webhooks holding or waiting for it
+        self._lanes: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def local(self, key: str) -> AsyncIterator[None]:
+        """Wait for the webhooks of the issue received earlier by this process."""
+        lock, users = self._lanes.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._lanes[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._lanes[key]
+            if users == 1:
+                del self._lanes[key]
+            else:
+                self._lanes[key] = (lock, users - 1)
+
+    @contextmanager
+    def distributed(self, redis_client, key: str) -> Iterator[None]:
+        """Wait for the replicas processing the issue, if Redis is configured.
+
+        Blocks the calling thread while waiting, webhooks being answered wait on the event loop
+        with `distributed_async` instead.
+        """
+        if redis_client is None:
+            yield
+            return
+
+        lock = redis_client.lock(
+            self._redis_key(key),
+            timeout=self._lock_timeout,
+            blocking_timeout=self._wait_timeout,
+        )
+        if not lock.acquire():
+            raise TimeoutError(f"Timed out waiting for the lock of {key}")
+        try:
+            yield
+        finally:
+            self._release(lock, key)
+
+    @asynccontextmanager
+    async def distributed_async(self, redis_client, key: str) -> AsyncIterator[None]:
+        """Async variant of `distributed`, `redis_client` being a `redis.asyncio.Redis`."""
+        if redis_client is None:
+            yield
+            return
+
+        lock = redis_client.lock(
+            self._redis_key(key),
+            timeout=self._lock_timeout,
+            blocking_timeout=self._wait_timeout,
+        )
+        if not await lock.acquire():
+            raise TimeoutError(f"Timed out waiting for the lock of {key}")
+        try:
+            yield
+        finally:
+            try:
+                await lock.release()
+            except Exception as e:
+                self._log_release_error(key, e)
+
+    def pending(self) -> int:
+        """Return the number of issues with webhooks in progress in this process."""
+        return len(self._lanes)
+
+    def clear(self):
+        self._lanes.clear()
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return f"jira:lane:{key}"
+
+    def _release(self, lock, key: str):
+        try:
+            lock.release()
+        except Exception as e:
+            self._log_release_error(key, e)
+
+    @staticmethod
+    def _log_release_error(key: str, error: Exception):
+        # the lock expired while the webhook was processed, the sync itself succeeded
+        logger.warning(f"Could not release the lock of {key}: {error!r}")
@@ -0,0 +1,101 @@
+"""Cache of rarely changing Jira project metadata."""
+
+import logging
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Hashable
+
+from jira import JIRA
+from jira.resources import Issue as JiraIssue
+
+logger = logging.getLogger("sync-bot-server")
+
+
+class JiraMetadataCache:
+    """Thread-safe TTL cache of Jira project components and workflow transitions.
+
+    Transitions available to an issue depend on its project, issue type (workflow) and
+    current status, so the transition name -> id mapping is cached per such triple.
+    Transitioning by id then takes a single Jira call instead of resolving the name first.
+
+    Args:
+        ttl: seconds to keep the metadata of a project
+
+    """
+
+    def __init__(self, ttl: float = 600):
+        self._ttl = ttl
+        self._entries: dict[tuple, tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def components(self, jira: JIRA, project_key: str) -> frozenset[str]:
+        """Return the names of the components of the project."""
+        return self._get(
+            ("components", project_key),
+            lambda: frozenset(c.name for c in jira.project_components(project_key)),
+        )
+
+    def transition_id(
+        self, jira: JIRA, project_key: str, issue: JiraIssue, name: str
+    ) -> str | None:
+        """Return the id of the transition called `name` available to the issue, if any."""
+        key = ("transitions", project_key, issue.fields.issuetype.name, issue.fields.status.name)
+        transitions = self._get(
+            key,
+            lambda: {t["name"].lower(): t["id"] for t in jira.transitions(issue)},
+        )
+        return transitions.get(name.lower())
+
+    async def components_async(self, jira, project_key: str) -> frozenset[str]:
+        """Async variant of `components`, `jira` being an `AsyncJiraClient`."""
+        key = ("components", project_key)
+        cached = self._cached(key)
+        if cached is None:
+            components = await jira.project_components(project_key)
+            cached = self._store(key, frozenset(c.name for c in components))
+        return cached
+
+    async def transition_id_async(
+        self, jira, project_key: str, issue: JiraIssue, name: str
+    ) -> str | None:
+        """Async variant of `transition_id`, `jira` being an `AsyncJiraClient`."""
+        key = ("transitions", project_key, issue.fields.issuetype.name, issue.fields.status.name)
+        transitions = self._cached(key)
+        if transitions is None:
+            transitions = self._store(
+                key, {t["name"].lower(): t["id"] for t in await jira.transitions(issue)}
+            )
+        return transitions.get(name.lower())
+
+    def invalidate(self, project_key: str | None = None):
+        """Drop the cached metadata of the project, or of all projects."""
+        with self._lock:
+            if project_key is None:
+                self._entries.clear()
+            else:
+                self._entries = {
+                    key: entry for key, entry in self._entries.items() if key[1] != project_key
+                }
+
+    def clear(self):
+        """Drop all cached metadata."""
+        self.invalidate()
+
+    def _get(self, key: tuple[Hashable, ...], fetch: Callable[[], Any]) -> Any:
+        cached = self._cached(key)
+        if cached is None:
+            cached = self._store(key, fetch())
+        return cached
+
+    def _cached(self, key: tuple[Hashable, ...]) -> Any:
+        cached = self._entries.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        return None
+
+    def _store(self, key: tuple[Hashable, ...], value: Any) -> Any:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+        return value
@@ -0,0 +1,128 @@
+"""Pool of long-lived Jira clients shared by the worker threads."""
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+from typing import Iterator
+
+import requests
+from jira import JIRA
+from jira import JIRAError
+
+logger = logging.getLogger("sync-bot-server")
+
+Credentials = tuple[str, str]
+
+
+class _PooledClient:
+    def __init__(self, client: JIRA, credentials: Credentials):
+        self.client = client
+        self.credentials = credentials
+        self.last_used = time.monotonic()
+
+
+class JiraClientPool:
+    """Thread-safe pool of Jira clients reused across webhooks.
+
+    Building a `JIRA` client creates a new HTTP session and queries the server info, so
+    clients are kept alive with their keep-alive connections and handed out to one thread
+    at a time. A client is discarded and rebuilt when:
+      - the credentials changed (e.g. the token file was rotated)
+      - Jira rejected its credentials or the connection failed while it was used
+      - it was idle for longer than ``health_check_interval`` and fails a health check
+
+    Args:
+        factory: callable building a new client for the given credentials
+        credentials: callable returning the current (username, token) credentials
+        size: maximum number of clients, extra threads wait for a client to be released
+        health_check_interval: idle seconds after which a client is checked before use
+
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[Credentials], JIRA],
+        credentials: Callable[[], Credentials],
+        size: int,
+        health_check_interval: float = 300,
+    ):
+        self._factory = factory
+        self._credentials = credentials
+        self._health_check_interval = health_check_interval
+        self._idle: queue.LifoQueue[_PooledClient] = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def client(self) -> Iterator[JIRA]:
+        """Borrow a healthy client for the duration of the `with` block."""
+        with self._slots:
+            pooled = self._checkout()
+            discard = False
+            try:
+                yield pooled.client
+            except JIRAError as e:
+                # the request reached Jira, the client is fine unless authentication failed
+                discard = e.status_code in [401, 403]
+                raise
+            except (requests.ConnectionError, requests.Timeout):
+                discard = True
+                raise
+            finally:
+                if discard:
+                    logger.info("Discarding Jira client after a failed request")
+                    self._close(pooled)
+                else:
+                    pooled.last_used = time.monotonic()
+                    self._release(pooled)
+
+    def clear(self):
+        """Close all idle clients."""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _checkout(self) -> _PooledClient:
+        credentials = self._credentials()
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+            if pooled.credentials != credentials:
+                logger.info("Jira credentials changed, reconnecting")
+                self._close(pooled)
+            elif self._is_healthy(pooled):
+                return pooled
+            else:
+                self._close(pooled)
+
+        return _PooledClient(self._factory(credentials), credentials)
+
+    def _is_healthy(self, pooled: _PooledClient) -> bool:
+        if time.monotonic() - pooled.last_used < self._health_check_interval:
+            return True
+        try:
+            pooled.client.myself()
+        except (JIRAError, requests.RequestException) as e:
+            logger.warning(f"Idle Jira client failed the health check: {e!r}")
+            return False
+        return True
+
+    def _release(self, pooled: _PooledClient):
+        try:
+            self._idle.put_nowait(pooled)
+        except queue.Full:
+            self._close(pooled)
+
+    @staticmethod
+    def _close(pooled: _PooledClient):
+        try:
+            pooled.client.close()
+        except Exception:
+            logger.exception("Failed to close Jira client")
@@ -0,0 +1,146 @@
+"""Structured logs written by a background thread."""
+
+import copy
+import logging
+import queue
+import random
+import threading
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from datetime import timezone
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from typing import Iterator
+
+import orjson
+
+# record attributes added to the JSON logs, set with `extra=` (e.g. by `StageTimer`) or with
+# `log_context`
+LOG_FIELDS = ["delivery", "repo", "issue", "stages"]
+
+_log_context: ContextVar[dict | None] = ContextVar("log_context", default=None)
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """Add the fields, e.g. the delivery id, to the records logged in the `with` block.
+
+    Fields set to None are ignored. The fields follow the context into the worker threads
+    started with `run_in_threadpool`.
+    """
+    fields = {key: value for key, value in fields.items() if value is not None}
+    token = _log_context.set({**(_log_context.get() or {}), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class JSONFormatter(logging.Formatter):
+    """JSON log formatter for structured logging (Loki, Grafana, etc.)."""
+
+    def format(self, record):
+        log_entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).strftime(
+                "%Y-%m-%dT%H:%M:%S.%fZ"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in LOG_FIELDS:
+            if hasattr(record, key):
+                log_entry[key] = getattr(record, key)
+        if record.exc_info and record.exc_info[0]:
+            log_entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        return orjson.dumps(log_entry, default=str).decode()
+
+
+class _QueueHandler(QueueHandler):
+    def __init__(self, records: queue.Queue, sample_rate: float):
+        super().__init__(records)
+        self._sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.addFilter(self._sample)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # only merge the arguments into the message, the record is formatted by the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        for key, value in (_log_context.get() or {}).items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _sample(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", False):
+            return random.random() < self._sample_rate
+        return True
+
+
+class _QueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # wait for room in a full queue, instead of failing to stop
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """Write the log records to their handlers from a background thread.
+
+    Logging calls only put the record in a bounded queue: the records are formatted and
+    written to stdout and to the log file by a background thread, so that log I/O does not
+    add latency to the webhooks. Records logged while the queue is full are dropped and
+    counted. Records logged with `extra={"sampled": True}`, e.g. the ignored webhooks, are
+    kept with the probability `sample_rate`. The fields set with `log_context` are added to
+    the records.
+
+    Args:
+        handlers: handlers writing the records
+        max_queue: maximum number of records waiting to be written
+        sample_rate: fraction of the sampled records that are kept
+
+    """
+
+    def __init__(
+        self, handlers: list[logging.Handler], max_queue: int = 10000, sample_rate: float = 1
+    ):
+        records: queue.Queue = queue.Queue(max_queue)
+        self.handler = _QueueHandler(records, sample_rate)
+        self._listener = _QueueListener(records, *handlers, respect_handler_level=True)
+        self._started = False
+
+    @property
+    def dropped(self) -> int:
+        """Number of records dropped as the queue was full."""
+        return self.handler.dropped
+
+    def start(self):
+        self._listener.start()
+        self._started = True
+
+    def stop(self):
+        """Write the queued records and stop the background thread."""
+        if self._started:
+            self._listener.stop()
+            self._started = False
+
+    def instrument(self, meter):
+        """Export the number of dropped records, once the metrics are set up."""
+        from opentelemetry.metrics import Observation
+
+        meter.create_observable_counter(
+            "syncbot_log_records_dropped_total",
+            callbacks=[lambda _options: [Observation(self.dropped)]],
+            description="Total number of log records dropped as the log queue was full",
+        )
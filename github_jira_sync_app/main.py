@@ -1,34 +1,75 @@
+import atexit
 import hashlib
 import hmac
 import json
 import logging
 import os
-import traceback
+import threading
+from contextlib import AsyncExitStack
+from contextlib import ExitStack
 from contextlib import asynccontextmanager
+from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Any
 
 import anyio
+import httpx
+import orjson
 import yaml
 from dotenv import load_dotenv
-from fastapi import Body
 from fastapi import FastAPI
 from fastapi import HTTPException
 from fastapi import Request
+from fastapi.responses import JSONResponse
 from github import Github
 from github import GithubException
 from github import GithubIntegration
 from github.Issue import Issue
 from github.Repository import Repository
 from jira import JIRA
-from mistletoe import Document  # type: ignore[import]
-from mistletoe.contrib.jira_renderer import JIRARenderer  # type: ignore[import]
+from jira import JIRAError
 from starlette.concurrency import run_in_threadpool
-from yaml.scanner import ScannerError
 
+from .admission import AdmissionController
+from .admission import Overloaded
+from .async_clients import AsyncGithubClient
+from .async_clients import AsyncJiraClient
+from .circuit_breaker import CircuitBreakers
+from .circuit_breaker import CircuitOpen
+from .coalescing import COALESCIBLE_ACTIONS
+from .coalescing import EventCoalescer
+from .config_cache import CONFIG_PATH
+from .config_cache import RepoConfigCache
+from .github_auth import AsyncInstallationTokenCache
+from .github_auth import InstallationResolver
+from .github_auth import InstallationTokenCache
 from .instrumentation.metrics import setup_metrics
-
-jira_text_renderer = JIRARenderer()
+from .instrumentation.stages import StageTimer
+from .instrumentation.tracing import setup_tracing
+from .issue_index import create_issue_index
+from .issue_lanes import IssueLanes
+from .jira_metadata import JiraMetadataCache
+from .jira_pool import Credentials
+from .jira_pool import JiraClientPool
+from .log_pipeline import JSONFormatter
+from .log_pipeline import LogPipeline
+from .log_pipeline import log_context
+from .rate_limits import LimiterConfig
+from .rate_limits import OutboundLimits
+from .rate_limits import RateLimited
+from .rate_limits import ThrottledAdapter
+from .rate_limits import throttle_pygithub
+from .reconcile import Reconciler
+from .reconcile import WatermarkStore
+from .reconcile import run_all as run_reconciliation
+from .rendering import MarkdownRenderer
+from .rendering import truncate
+from .repo_settings import RepoSettings
+from .repo_settings import SettingsCompiler
+from .repo_settings import SettingsError
+from .webhook_queue import QueuedWebhook
+from .webhook_queue import QueueWorkers
+from .webhook_queue import WebhookQueue
 
 load_dotenv()
 
@@ -36,9 +77,15 @@ jira_instance_url = os.getenv("JIRA_INSTANCE", "")
 jira_username = os.getenv("JIRA_USERNAME", "")
 jira_token = os.getenv("JIRA_TOKEN", "")
 
-assert jira_instance_url, "URL to your Jira instance must be provided via JIRA_INSTANCE env var"
-assert jira_username, "Jira username must be provided via JIRA_USERNAME env var"
-assert jira_token, "Jira API token must be provided via JIRA_TOKEN env var"
+
+def _check_configuration():
+    """Fail the startup of the server if the Jira configuration is missing."""
+    assert jira_instance_url, "URL to your Jira instance must be provided via JIRA_INSTANCE env var"
+    assert jira_username, "Jira username must be provided via JIRA_USERNAME env var"
+    assert jira_token or os.getenv(
+        "JIRA_TOKEN_FILE"
+    ), "Jira API token must be provided via JIRA_TOKEN or JIRA_TOKEN_FILE env var"
+
 
 jira_issue_description_template = """
 This issue was created from GitHub Issue {gh_issue_url}
@@ -64,39 +111,45 @@ with open(Path(__file__).parent / "settings.yaml") as file:
 
 allowed_gh_actions = ["opened", "edited", "closed", "reopened", "labeled", "unlabeled"]
 
+# events GitHub delivers to every App when it is (un)installed or its repository selection changes
+installation_events = ["installation", "installation_repositories"]
 
-class JSONFormatter(logging.Formatter):
-    """JSON log formatter for structured logging (Loki, Grafana, etc.)."""
+# events that can require work, the other ones are answered without parsing their payload
+handled_events = ["issues", "issue_comment", "push", *installation_events]
 
-    def format(self, record):
-        log_entry = {
-            "timestamp": self.formatTime(record, datefmt="%Y-%m-%dT%H:%M:%S.%fZ"),
-            "level": record.levelname,
-            "logger": record.name,
-            "message": record.getMessage(),
-        }
-        if record.exc_info and record.exc_info[0]:
-            log_entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
-        return json.dumps(log_entry)
 
-
-def define_logger():
-    """Define logger to output to the file and to STDOUT."""
+def define_logger(pipeline: LogPipeline):
+    """Define logger to output to the file and to STDOUT, through the background pipeline."""
     log = logging.getLogger("sync-bot-server")
     log.setLevel(logging.DEBUG)
+    log.addHandler(pipeline.handler)
+    return log
+
+
+def _log_handlers() -> list[logging.Handler]:
     formatter = JSONFormatter()
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
-    log.addHandler(stream_handler)
 
-    log_file = os.environ.get("SYNC_BOT_LOGFILE", "sync_bot.log")
-    file_handler = logging.FileHandler(filename=log_file)
+    # rotated once it reaches SYNC_BOT_LOGFILE_MAX_BYTES, 0 to never rotate it
+    file_handler = RotatingFileHandler(
+        filename=os.environ.get("SYNC_BOT_LOGFILE", "sync_bot.log"),
+        maxBytes=int(os.getenv("SYNC_BOT_LOGFILE_MAX_BYTES", 100 * 1024 * 1024)),
+        backupCount=int(os.getenv("SYNC_BOT_LOGFILE_BACKUPS", "5")),
+    )
     file_handler.setFormatter(formatter)
-    log.addHandler(file_handler)
-    return log
+    return [stream_handler, file_handler]
 
 
-logger = define_logger()
+# log records are written by a background thread, the records of ignored webhooks are sampled
+log_pipeline = LogPipeline(
+    _log_handlers(),
+    max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    sample_rate=float(os.getenv("LOG_IGNORED_SAMPLE_RATE", "1")),
+)
+logger = define_logger(log_pipeline)
+log_pipeline.start()
+atexit.register(log_pipeline.stop)
 
 
 _env_settings = yaml.safe_load(os.getenv("DEFAULT_BOT_CONFIG", "{}"))
@@ -107,9 +160,36 @@ app_id = os.getenv("APP_ID", "")
 app_key = os.getenv("PRIVATE_KEY", "")
 app_key = app_key.replace("\\n", "\n")  # since docker env variables do not support multiline
 
+# API of GitHub Enterprise Server is served under https://<hostname>/api/v3
+github_api_url = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
 git_integration = GithubIntegration(
     app_id,
     app_key,
+    base_url=github_api_url,
+)
+
+# requester of the GitHub objects built from the payloads in the async mode, it sends nothing
+payload_requester = Github(base_url=github_api_url).requester
+
+# Installation tokens are valid for an hour, reuse them instead of minting one per webhook.
+# Resolve `git_integration` at call time, so the integration can be swapped (e.g. in tests).
+token_cache = InstallationTokenCache(
+    lambda installation_id: git_integration.get_access_token(installation_id),
+    refresh_margin=float(os.getenv("GITHUB_TOKEN_REFRESH_MARGIN", "300")),
+)
+
+installation_resolver = InstallationResolver(
+    lambda owner, repo: git_integration.get_repo_installation(owner, repo).id,
+    ttl=float(os.getenv("INSTALLATION_CACHE_TTL", "3600")),
+    negative_ttl=float(os.getenv("INSTALLATION_NEGATIVE_CACHE_TTL", "300")),
+)
+
+settings_compiler = SettingsCompiler(DEFAULT_SETTINGS)
+
+config_cache = RepoConfigCache(
+    ttl=float(os.getenv("CONFIG_CACHE_TTL", "60")),
+    negative_ttl=float(os.getenv("CONFIG_NEGATIVE_CACHE_TTL", "300")),
 )
 
 # Maximum number of webhooks processed concurrently. Blocking GitHub/Jira/Redis
@@ -117,17 +197,180 @@ git_integration = GithubIntegration(
 # cannot block the loop; this cap also prevents overloading Jira/GitHub.
 max_concurrent_webhooks = int(os.getenv("MAX_CONCURRENT_WEBHOOKS", "20"))
 
+# "threaded" processes webhooks with the blocking GitHub/Jira/Redis clients in the thread pool
+# above, "async" processes them on the event loop with async clients, so that waiting on I/O
+# costs a coroutine instead of a thread.
+webhook_execution_mode = os.getenv("WEBHOOK_EXECUTION_MODE", "threaded").lower()
+if webhook_execution_mode not in ["threaded", "async"]:
+    logger.error(f"Unknown webhook execution mode '{webhook_execution_mode}'. Using threaded.")
+    webhook_execution_mode = "threaded"
+
+# in async mode, maximum number of webhooks processed concurrently on the event loop and
+# maximum number of connections opened to GitHub and to Jira
+async_max_concurrent_webhooks = int(os.getenv("ASYNC_MAX_CONCURRENT_WEBHOOKS", "1000"))
+async_max_connections = int(os.getenv("ASYNC_MAX_CONNECTIONS", "50"))
+async_webhook_limiter = anyio.CapacityLimiter(async_max_concurrent_webhooks)
+
+
+# path, modification time and token of the last read `JIRA_TOKEN_FILE`
+_token_file: tuple[str, int, str] | None = None
+
+
+def _jira_credentials() -> Credentials:
+    """Return the Jira credentials, re-reading `JIRA_TOKEN_FILE` so the token can be rotated.
+
+    The file is only read again once modified: the credentials are needed by every request of
+    the async Jira client, on the event loop.
+    """
+    global _token_file
+    token_file = os.getenv("JIRA_TOKEN_FILE")
+    if token_file:
+        modified = os.stat(token_file).st_mtime_ns
+        cached = _token_file
+        if cached is None or cached[:2] != (token_file, modified):
+            cached = _token_file = (token_file, modified, Path(token_file).read_text().strip())
+        return jira_username, cached[2]
+    return jira_username, jira_token
+
+
+def _create_jira_client(credentials: Credentials) -> JIRA:
+    # building a client queries the server info
+    with circuit_breakers.get("jira").call():
+        client = JIRA(
+            jira_instance_url,
+            basic_auth=credentials,
+            timeout=float(os.getenv("JIRA_TIMEOUT", "30")),
+            max_retries=int(os.getenv("JIRA_MAX_RETRIES", "3")),
+        )
+    client._session.mount(
+        jira_instance_url, ThrottledAdapter(_jira_limiter, circuit_breakers.get("jira"))
+    )
+    return client
+
+
+# Jira clients (HTTP sessions with keep-alive connections) are reused across webhooks
+jira_pool = JiraClientPool(
+    _create_jira_client,
+    _jira_credentials,
+    size=int(os.getenv("JIRA_POOL_SIZE", max_concurrent_webhooks)),
+    health_check_interval=float(os.getenv("JIRA_POOL_HEALTH_CHECK_INTERVAL", "300")),
+)
+
+
+jira_metadata = JiraMetadataCache(ttl=float(os.getenv("JIRA_METADATA_CACHE_TTL", "600")))
+
+# async mode clients are created on first use, within the event loop serving the webhooks
+_async_github: AsyncGithubClient | None = None
+_async_jira: AsyncJiraClient | None = None
+_async_redis = None
+
+
+def _async_connection_limits() -> httpx.Limits:
+    # keep every connection alive, the concurrency is already bounded by the clients
+    return httpx.Limits(
+        max_connections=async_max_connections, max_keepalive_connections=async_max_connections
+    )
+
+
+def _async_github_client() -> AsyncGithubClient:
+    global _async_github
+    if _async_github is None:
+        _async_github = AsyncGithubClient(
+            httpx.AsyncClient(
+                base_url=github_api_url,
+                timeout=15,  # same as PyGithub
+                limits=_async_connection_limits(),
+            ),
+            lambda: git_integration.create_jwt(),
+            max_connections=async_max_connections,
+            limiter=_github_limiter,
+            breaker=circuit_breakers.get("github"),
+        )
+    return _async_github
+
+
+def _async_jira_client() -> AsyncJiraClient:
+    global _async_jira
+    if _async_jira is None:
+        _async_jira = AsyncJiraClient(
+            httpx.AsyncClient(
+                base_url=jira_instance_url,
+                timeout=float(os.getenv("JIRA_TIMEOUT", "30")),
+                limits=_async_connection_limits(),
+            ),
+            _jira_credentials,
+            max_connections=async_max_connections,
+            max_retries=int(os.getenv("JIRA_MAX_RETRIES", "3")),
+            limiter=_jira_limiter,
+            breaker=circuit_breakers.get("jira"),
+        )
+    return _async_jira
+
+
+def _async_redis_client():
+    global _async_redis
+    if _async_redis is None:
+        import redis.asyncio
+
+        _async_redis = redis.asyncio.Redis(host=redis_host, port=redis_port, db=0)
+    return _async_redis
+
+
+async_token_cache = AsyncInstallationTokenCache(
+    lambda installation_id: _async_github_client().get_access_token(installation_id),
+    refresh_margin=float(os.getenv("GITHUB_TOKEN_REFRESH_MARGIN", "300")),
+)
+
+
+async def _close_async_clients():
+    global _async_github, _async_jira, _async_redis
+    for client in [_async_github, _async_jira]:
+        if client is not None:
+            await client.aclose()
+    if _async_redis is not None:
+        await _async_redis.aclose()
+    _async_github = _async_jira = _async_redis = None
+
+
+# set once the server is started, reported by /readyz
+started = False
+
 
 @asynccontextmanager
 async def lifespan(_app: "FastAPI"):
-    """Bound the worker thread pool used to process webhooks off the event loop."""
+    """Check the configuration and bound the worker thread pool used to process webhooks.
+
+    Nothing connects to Jira, GitHub or Redis on startup, `/readyz` reports their availability.
+    """
+    global started
+    _check_configuration()
     anyio.to_thread.current_default_thread_limiter().total_tokens = max_concurrent_webhooks
+    if queue_workers is not None:
+        queue_workers.start()
+    if reconcile_interval:
+        reconciler.start(reconcile_interval, lambda: run_reconciliation(reconciler))
+    # the Markdown renderer is slow to import, import it while serving instead of on the first
+    # webhook
+    threading.Thread(target=markdown_renderer.warm_up, name="render-warm-up", daemon=True).start()
+    started = True
     yield
+    started = False
+    reconciler.stop()
+    if queue_workers is not None:
+        await anyio.to_thread.run_sync(queue_workers.stop)
+    jira_pool.clear()
+    markdown_renderer.close()
+    await _close_async_clients()
+    if tracer_provider is not None:
+        tracer_provider.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
 
 metrics_instruments = setup_metrics(app)
+log_pipeline.instrument(metrics_instruments["meter"])
+# opt-in, with OTEL_TRACES_EXPORTER=otlp
+tracer_provider = setup_tracing(app)
 
 redis_host = os.getenv("REDIS_HOST", "")
 redis_port = os.getenv("REDIS_PORT", "")
@@ -135,38 +378,160 @@ redis_client = None
 if redis_host:
     import redis
 
+    # connects on first use, its availability is reported by /readyz
     redis_client = redis.Redis(host=redis_host, port=redis_port, db=0)
-    try:
-        redis_client.ping()
-        logger.info("Redis connection established")
-    except redis.ConnectionError:
-        logger.error("Redis connection error. Redis is not available.")
-        redis_client = None
 
+# timeout of the Redis ping of the readiness probe
+readiness_timeout = float(os.getenv("READINESS_TIMEOUT", "2"))
 
-def merge_dicts(d1, d2):
-    """Merge the two dictionaries (d2 into d1) recursively.
+# GitHub issue URL -> Jira issue key, consulted before the (slow) JQL full-text search
+issue_index = create_issue_index(
+    os.getenv("ISSUE_INDEX_BACKEND", "sqlite"),
+    os.getenv("ISSUE_INDEX_PATH", "jira_issue_index.sqlite3"),
+    redis_client,
+)
 
-    If the key from d2 exists in d1, then skip (do not override).
+# Markdown of descriptions and comments is rendered once per distinct (truncated) text
+markdown_renderer = MarkdownRenderer(
+    cache_bytes=int(os.getenv("RENDER_CACHE_BYTES", 16 * 1024 * 1024)),
+    max_description_length=int(os.getenv("MAX_DESCRIPTION_LENGTH", "28000")),
+    max_comment_length=int(os.getenv("MAX_COMMENT_LENGTH", "28000")),
+    pool_workers=int(os.getenv("RENDER_POOL_WORKERS", "0")),
+    pool_threshold=int(os.getenv("RENDER_POOL_THRESHOLD", "8192")),
+    pool_timeout=float(os.getenv("RENDER_POOL_TIMEOUT", "10")),
+    meter=metrics_instruments["meter"],
+)
+
+# webhooks waiting for a worker (thread or async slot) beyond these limits get a 503 with
+# Retry-After, to be redelivered later, instead of waiting until GitHub times them out
+webhook_slots = anyio.CapacityLimiter(max_concurrent_webhooks)
+admission = AdmissionController(
+    max_waiting=int(os.getenv("ADMISSION_MAX_WAITING", "0")),
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "0")),
+    retry_after=int(os.getenv("ADMISSION_RETRY_AFTER", "60")),
+    meter=metrics_instruments["meter"],
+)
+
+# after CIRCUIT_FAILURE_THRESHOLD consecutive failed calls to Jira or GitHub (connection errors,
+# timeouts, 5xx), webhooks fail fast with 503 for CIRCUIT_RESET_TIMEOUT seconds, after which
+# CIRCUIT_HALF_OPEN_PROBES calls probe the backend
+circuit_breakers = CircuitBreakers(
+    ["jira", "github"],
+    failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30")),
+    probes=int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1")),
+    meter=metrics_instruments["meter"],
+)
+
+# client-side limits of the calls to Jira (per instance) and GitHub (per installation): a
+# token bucket of RATE_LIMIT calls per second, and a concurrency limit adapted to the latency
+# and to the throttled calls, honoring Retry-After
+outbound_limits = OutboundLimits(
+    {
+        backend: LimiterConfig(
+            rate=float(os.getenv(f"{backend.upper()}_RATE_LIMIT", "0")),
+            burst=int(os.getenv(f"{backend.upper()}_RATE_BURST", "10")),
+            max_concurrency=int(
+                os.getenv(f"{backend.upper()}_MAX_CONCURRENCY", max_concurrent_webhooks)
+            ),
+            latency_tolerance=float(os.getenv("OUTBOUND_LATENCY_TOLERANCE", "0")),
+            max_wait=float(os.getenv("OUTBOUND_MAX_WAIT", "30")),
+        )
+        for backend in ["jira", "github"]
+    },
+    max_keys=int(os.getenv("OUTBOUND_LIMITS_MAX_KEYS", "100")),
+    meter=metrics_instruments["meter"],
+)
+
+
+def _jira_limiter():
+    return outbound_limits.get("jira", jira_instance_url)
+
+
+def _github_limiter():
+    return outbound_limits.current("github")
 
-    Mutates d1
-    """
-    for key in d2:
-        if key in d1 and isinstance(d1[key], dict) and isinstance(d2[key], dict):
-            merge_dicts(d1[key], d2[key])
-        elif key not in d1:
-            d1[key] = d2[key]
+
+# only the GitHub clients of the bot are throttled, not every PyGithub client of the process
+throttle_pygithub(git_integration.requester, _github_limiter, circuit_breakers.get("github"))
+
+
+def github_client(token: str, **kwargs) -> Github:
+    """Return a GitHub client authenticated with an installation token, its calls throttled."""
+    github = Github(login_or_token=token, base_url=github_api_url, **kwargs)
+    throttle_pygithub(github.requester, _github_limiter, circuit_breakers.get("github"))
+    return github
+
+
+# durations of the stages of the webhooks, by stage, outcome and (bounded) Jira project
+stage_timer = StageTimer(
+    meter=metrics_instruments["meter"],
+    max_projects=int(os.getenv("METRICS_MAX_JIRA_PROJECTS", "50")),
+)
+
+# webhooks of the same GitHub issue are processed one at a time, in arrival order
+issue_lanes = IssueLanes(
+    lock_timeout=float(os.getenv("ISSUE_LOCK_TIMEOUT", "120")),
+    wait_timeout=float(os.getenv("ISSUE_LOCK_WAIT_TIMEOUT", "300")),
+)
+
+# edited/labeled/unlabeled webhooks of an issue already in Jira, received within this many
+# seconds of each other, are merged into a single Jira update (0 disables it)
+event_coalescer = EventCoalescer(
+    window=float(os.getenv("COALESCE_WINDOW", "0")),
+    max_delay=float(os.getenv("COALESCE_MAX_DELAY", "30")),
+    meter=metrics_instruments["meter"],
+)
+
+# "sync" answers GitHub once the webhook is processed, "queue" answers 202 as soon as the
+# webhook is stored in a durable local queue, which worker threads then drain
+webhook_ack_mode = os.getenv("WEBHOOK_ACK_MODE", "sync").lower()
+if webhook_ack_mode not in ["sync", "queue"]:
+    logger.error(f"Unknown webhook acknowledgement mode '{webhook_ack_mode}'. Using sync.")
+    webhook_ack_mode = "sync"
+
+
+def _process_queued_webhook(webhook: QueuedWebhook):
+    webhook_id = webhook.delivery_id or "unknown"
+    # retried later by the queue workers
+    circuit_breakers.check()
+    payload = json.loads(webhook.body)
+    with log_context(**_log_fields(webhook_id, payload)), stage_timer.delivery(webhook_id):
+        process_webhook(payload, webhook_id, webhook.event)
+
+
+webhook_queue: WebhookQueue | None = None
+queue_workers: QueueWorkers | None = None
+if webhook_ack_mode == "queue":
+    webhook_queue = WebhookQueue(os.getenv("WEBHOOK_QUEUE_PATH", "webhook_queue.sqlite3"))
+    queue_workers = QueueWorkers(
+        webhook_queue,
+        _process_queued_webhook,
+        workers=int(os.getenv("WEBHOOK_QUEUE_WORKERS", max_concurrent_webhooks)),
+        max_attempts=int(os.getenv("WEBHOOK_QUEUE_MAX_ATTEMPTS", "8")),
+        retry_delay=float(os.getenv("WEBHOOK_QUEUE_RETRY_DELAY", "5")),
+        max_retry_delay=float(os.getenv("WEBHOOK_QUEUE_MAX_RETRY_DELAY", "600")),
+        lease=float(os.getenv("WEBHOOK_QUEUE_LEASE", "300")),
+        meter=metrics_instruments["meter"],
+        # an outage of Jira or GitHub does not use up the attempts of the queued webhooks
+        deferred_errors=(CircuitOpen, RateLimited),
+    )
+
+# the Jira issues of the GitHub issues updated since the previous run are checked for drift
+# every this many seconds (0 disables it), also available as a command, see reconcile.py
+reconcile_interval = float(os.getenv("RECONCILE_INTERVAL", "0"))
+reconciler = Reconciler(
+    WatermarkStore(os.getenv("RECONCILE_STATE_PATH", "reconcile_state.json")),
+    issue_index,
+    budget=int(os.getenv("RECONCILE_API_BUDGET", "1000")),
+    grace=float(os.getenv("RECONCILE_GRACE", "300")),
+    meter=metrics_instruments["meter"],
+)
 
 
 def truncate_description(s):
     """Jira has a limitation of 23000 characters for description. Truncate to avoid API error."""
-    if len(s) > 28000:
-        return (
-            s[:28000]
-            + "..."
-            + "\n Text exceeded Jira maximum length. Please see the original issue for details."
-        )
-    return s
+    return truncate(s, 28000)
 
 
 def verify_signature(payload_body, secret_token, signature_header):
@@ -189,7 +554,7 @@ def verify_signature(payload_body, secret_token, signature_header):
         raise HTTPException(status_code=403, detail="Request signatures didn't match!")
 
 
-def _generate_summary(settings: dict, issue: Issue):
+def _generate_summary(summary: str | None, issue: Issue):
     """Allow customizing the JIRA issue's summary field.
 
     Examples:
@@ -197,50 +562,276 @@ def _generate_summary(settings: dict, issue: Issue):
         - "GitHub Issue: {issue.title}" will result in "GitHub Issue: Issue title"
         - "{issue.assignee.email}: {issue.title}" will result in "foo@bar.com: Issue title"
 
-    If the summary field is not specified or invalid, fall back to using the raw GitHub issue title.
+    The syntax of the template is validated once, when the settings are compiled. It can still
+    fail for a particular issue (e.g. an issue without assignee), in which case or if the
+    summary is not specified, fall back to using the raw GitHub issue title.
     """
-    summary_str = settings.get("summary", "")
-    if isinstance(summary_str, str) and summary_str:
+    if isinstance(summary, str) and summary:
         try:
             # we treat the input 'summary' as a format string and
             # attempt to substitute any values we can access from the issue.
-            return settings["summary"].format(issue=issue)
-        except Exception:
-            msg = ".github/.jira_sync_config.yaml has invalid summary field. Check syntax."
-            logger.error(msg)
+            return summary.format(issue=issue)
+        except Exception as e:
+            logger.warning(f"Summary template {summary!r} failed for {issue.html_url}: {e!r}")
 
     return issue.title
 
 
+def _find_existing_issues(jira: JIRA, settings: RepoSettings, gh_issue_url: str) -> list:
+    """Find the Jira issue created from the GitHub issue.
+
+    The issue index is consulted first. The JQL full-text search on the description is only
+    a fallback, its result back-fills the index.
+    """
+    if issue_index:
+        jira_key = issue_index.get(gh_issue_url)
+        # ignore links to another project, e.g. when `jira_project_key` was changed
+        if jira_key and jira_key.startswith(f"{settings.jira_project_key}-"):
+            try:
+                return [jira.issue(jira_key)]
+            except JIRAError as e:
+                if e.status_code != 404:
+                    raise
+                logger.warning(f"Jira issue {jira_key} linked to {gh_issue_url} does not exist")
+                issue_index.delete(gh_issue_url)
+
+    jira_task_desc_match = f"This issue was created from GitHub Issue {gh_issue_url}"
+    existing_issues = jira.enhanced_search_issues(
+        rf'project="{settings.jira_project_key}" AND '
+        + rf'description ~"\"{jira_task_desc_match}\""',
+        json_result=False,
+    )
+    assert isinstance(existing_issues, list), "Jira did not return a list of existing issues"
+
+    if existing_issues and issue_index:
+        issue_index.set(gh_issue_url, existing_issues[0].key)
+    return existing_issues
+
+
+def _transition_issue(jira: JIRA, settings: RepoSettings, jira_issue, transition_name: str):
+    """Transition the Jira issue, using the cached transition id to save a Jira call."""
+    with stage_timer.stage("jira_transition"):
+        project_key = settings.jira_project_key
+        transition_id = jira_metadata.transition_id(jira, project_key, jira_issue, transition_name)
+        if transition_id is None:
+            jira.transition_issue(jira_issue, transition_name)
+            return
+
+        try:
+            jira.transition_issue(jira_issue, transition_id)
+        except JIRAError:
+            # the workflow could have changed since the transitions were cached
+            logger.warning(f"Cached transition '{transition_name}' failed for {jira_issue.key}")
+            jira_metadata.invalidate(project_key)
+            jira.transition_issue(jira_issue, transition_name)
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the event loop is serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: the server is started and Redis is reachable.
+
+    Redis is pinged, with a `READINESS_TIMEOUT` seconds timeout. Answers 503 while the server is
+    starting or stopping, or while Redis is down. Jira and GitHub are shared by every replica,
+    taking the replicas out of service would not bring them back: the state of their circuit
+    breaker is only reported, see `CircuitBreaker`.
+    """
+    checks = {"startup": "ok" if started else "pending"}
+    if redis_client is None:
+        checks["redis"] = "disabled"
+    else:
+        try:
+            with anyio.fail_after(readiness_timeout):
+                await _async_redis_client().ping()
+            checks["redis"] = "ok"
+        except Exception as e:
+            logger.warning(f"Redis is not available: {e!r}")
+            checks["redis"] = "down"
+    for backend in ["jira", "github"]:
+        checks[backend] = circuit_breakers.get(backend).state
+
+    ready = started and checks["redis"] != "down"
+    return JSONResponse(
+        {"status": "ready" if ready else "not ready", "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
+
 @app.post("/")
-async def bot(request: Request, payload: dict = Body(...)):
+async def bot(request: Request):
     """Receive a GitHub webhook and dispatch it for processing.
 
-    Signature verification is cheap and stays on the event loop. The actual
-    GitHub<->Jira synchronization performs blocking network I/O, so it runs in a
-    bounded thread pool to keep the event loop responsive under bursts of
-    concurrent webhooks. The real result is still returned synchronously (2xx on
-    success, 5xx on failure) so GitHub's webhook redelivery can retry failures
-    (e.g. an expired Jira token).
+    The body is read once, its signature verified, and it is parsed with orjson. Webhooks
+    that do not require a sync (other events, events of bots or pull requests, ignored
+    actions) are answered on the event loop, other events without even being parsed.
+    The actual GitHub<->Jira synchronization performs blocking network I/O, so it runs in
+    a bounded thread pool to keep the event loop responsive under bursts of
+    concurrent webhooks, unless the async execution mode is enabled. Webhooks of the same
+    issue wait for each other on the event loop, see `IssueLanes`. Webhooks waiting too
+    long for a worker are answered with 503, see `AdmissionController`, as are webhooks
+    whose GitHub or Jira calls are rate limited, see `OutboundLimits`, and webhooks received
+    while GitHub or Jira is down, see `CircuitBreaker`. The real result
+    is still returned synchronously (2xx on success, 5xx on failure) so GitHub's
+    webhook redelivery can retry failures (e.g. an expired Jira token).
+
+    In the queue acknowledgement mode, webhooks to sync are stored in the local queue
+    and answered with 202 instead, their failures are retried by the queue workers.
     """
     body_ = await request.body()
     signature_ = request.headers.get("x-hub-signature-256")
     webhook_id = request.headers.get("X-GitHub-Delivery", "unknown")
+    event = request.headers.get("X-GitHub-Event", "")
 
     verify_signature(body_, os.getenv("WEBHOOK_SECRET"), signature_)
 
-    logger.info(f"Received webhook {webhook_id}, action={payload.get('action', 'N/A')}")
+    if event and event not in handled_events:
+        # e.g. pull_request or workflow_run events of organization-wide installations
+        return {"msg": "Action wasn't triggered by Issue action. Ignoring."}
 
-    return await run_in_threadpool(process_webhook, payload, webhook_id)
+    payload = _parse_payload(body_)
+    with log_context(**_log_fields(webhook_id, payload)):
+        return await _dispatch(body_, payload, webhook_id, event)
 
 
-def process_webhook(payload: dict, webhook_id: str = "unknown") -> dict:
-    """Synchronously process a single GitHub webhook (runs in a worker thread).
+def _log_fields(webhook_id: str, payload: dict) -> dict:
+    """Return the fields identifying the webhook in its log records, see `log_context`."""
+    return {
+        "delivery": webhook_id,
+        "repo": (payload.get("repository") or {}).get("full_name"),
+        "issue": (payload.get("issue") or {}).get("number"),
+    }
 
-    Contains all blocking GitHub/Jira/Redis I/O. Returning a dict yields a 2xx
-    response; raising an exception propagates as a 5xx so GitHub can redeliver
-    the webhook and the work can be retried.
+
+async def _dispatch(body_: bytes, payload: dict, webhook_id: str, event: str):
+    """Answer, queue or process the parsed webhook, see `bot`."""
+    received = f"Received webhook {webhook_id}, action={payload.get('action', 'N/A')}"
+    response = _triage(payload, event)
+    if response is not None:
+        # most webhooks of organization-wide installations are ignored, their logs are sampled
+        logger.info(f"{received}: {response['msg']}", extra={"sampled": True})
+        return response
+    logger.info(received)
+
+    if webhook_queue is not None and queue_workers is not None:
+        delivery_id = webhook_id if webhook_id != "unknown" else None
+        queued = await anyio.to_thread.run_sync(
+            webhook_queue.put, body_, delivery_id, event, _issue_key(payload)
+        )
+        if not queued:
+            return {"msg": "Webhook is already queued. Ignoring."}
+        queue_workers.notify()
+        return JSONResponse({"msg": "Webhook was queued"}, status_code=202)
+
+    issue_key = _issue_key(payload)
+    coalesced: frozenset[str] = frozenset()
+    if issue_key and await _is_coalescible(payload):
+        actions = await event_coalescer.wait(issue_key, payload["action"])
+        if actions is None:
+            return {"msg": "Coalesced with a later event of the issue. Ignoring."}
+        coalesced = actions
+    elif issue_key and event_coalescer.enabled:
+        # e.g. a `closed` event must not overtake the `edited` event waiting for later events
+        await event_coalescer.flush(issue_key)
+
+    try:
+        # do not hold a worker while Jira or GitHub is down
+        circuit_breakers.check()
+        with stage_timer.delivery(webhook_id):
+            async with AsyncExitStack() as stack:
+                if issue_key:
+                    with stage_timer.stage("lane"):
+                        await stack.enter_async_context(issue_lanes.local(issue_key))
+                if webhook_execution_mode == "async":
+                    async with admission.admit(async_webhook_limiter):
+                        return await process_webhook_async(payload, webhook_id, event, coalesced)
+                if issue_key and redis_client is not None:
+                    # wait for the replicas processing the issue on the event loop, a worker
+                    # thread waiting for them could not serve the webhooks of other issues
+                    with stage_timer.stage("lock"):
+                        await stack.enter_async_context(
+                            issue_lanes.distributed_async(_async_redis_client(), issue_key)
+                        )
+                async with admission.admit(webhook_slots):
+                    return await run_in_threadpool(
+                        process_webhook, payload, webhook_id, event, coalesced, lane_locked=True
+                    )
+    except (Overloaded, RateLimited, CircuitOpen) as e:
+        return JSONResponse(
+            {"msg": f"{e}. Retry later."},
+            status_code=503,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+async def _is_coalescible(payload: dict) -> bool:
+    """Return whether the webhook only updates an issue already synced to Jira.
+
+    Creations (the issue is not indexed yet), transitions and comments are never delayed.
     """
+    if not event_coalescer.enabled or issue_index is None:
+        return False
+    if "comment" in payload or payload.get("action") not in COALESCIBLE_ACTIONS:
+        return False
+    return bool(await anyio.to_thread.run_sync(issue_index.get, payload["issue"]["html_url"]))
+
+
+def _parse_payload(body: bytes) -> dict:
+    """Parse the JSON body of a webhook whose signature was verified."""
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=422, detail="Webhook body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=422, detail="Webhook body is not a JSON object")
+    return payload
+
+
+def _issue_key(payload: dict) -> str | None:
+    """Return the key of the lane of the webhook: the URL of its GitHub issue, if any."""
+    issue = payload.get("issue")
+    return issue.get("html_url") if isinstance(issue, dict) else None
+
+
+def _handle_installation_event(event: str, payload: dict) -> dict:
+    """Drop cached installation data affected by an `installation*` webhook."""
+    installation_id = payload["installation"]["id"]
+    repositories = [
+        repo["full_name"]
+        for key in ["repositories", "repositories_added", "repositories_removed"]
+        for repo in payload.get(key) or []
+    ]
+    installation_resolver.invalidate(installation_id, repositories)
+    if payload.get("action") in ["deleted", "suspend"]:
+        token_cache.invalidate(installation_id)
+        async_token_cache.invalidate(installation_id)
+
+    msg = f"Installation {installation_id} cache invalidated on {event} {payload.get('action')}"
+    logger.info(msg)
+    return {"msg": msg}
+
+
+def _triage(payload: dict, event: str) -> dict | None:
+    """Answer the webhooks that do not require a sync with Jira, without network I/O.
+
+    Returns:
+        the response to the webhook, None if its issue must be synced
+
+    """
+    if event in installation_events:
+        return _handle_installation_event(event, payload)
+
+    if event == "push":
+        repo_name = payload["repository"]["full_name"]
+        if config_cache.handle_push(payload):
+            logger.info(f"{repo_name}: {CONFIG_PATH} changed, cached config invalidated")
+            return {"msg": f"{CONFIG_PATH} changed. Cached config invalidated."}
+        return {"msg": f"Push did not change {CONFIG_PATH}. Ignoring."}
+
     if not all(k in payload.keys() for k in ["action", "issue"]):
         return {"msg": "Action wasn't triggered by Issue action. Ignoring."}
 
@@ -283,93 +874,137 @@ def process_webhook(payload: dict, webhook_id: str = "unknown") -> dict:
                         " Purposefully ignored as caused by this bot."
                     )
                 }
+    return None
+
+
+def _make_gh_issue(requester, payload: dict) -> Issue:
+    """Build the GitHub issue of the webhook from its payload, without any request.
 
+    The repository of the payload is attached, so that summary templates such as
+    `{issue.repository.name}` do not fetch it.
+    """
+    attributes = dict(payload["issue"], repository=payload["repository"])
+    return Issue(requester, {}, attributes, completed=True)
+
+
+def _check_labels(
+    settings: RepoSettings,
+    payload: dict,
+    payload_labels: set[str],
+    repo_name: str,
+    coalesced: frozenset[str] = frozenset(),
+) -> dict | None:
+    """Return the response ignoring the webhook if the issue has none of the allowed labels."""
+    allowed_labels = settings.labels
+    if (
+        not _updates_jira_labels(settings, payload, coalesced)
+        and allowed_labels
+        and allowed_labels.isdisjoint(payload_labels)
+    ):
+        msg = "Issue is not labeled with the specified label"
+        logger.warning(f"{repo_name}: {msg}")
+        return {"msg": msg}
+    return None
+
+
+def _updates_jira_labels(
+    settings: RepoSettings, payload: dict, coalesced: frozenset[str] = frozenset()
+) -> bool:
+    actions = coalesced | {payload["action"]}
+    return settings.sync_labels and not actions.isdisjoint(["unlabeled", "labeled"])
+
+
+def process_webhook(
+    payload: dict,
+    webhook_id: str = "unknown",
+    event: str = "",
+    coalesced: frozenset[str] = frozenset(),
+    lane_locked: bool = False,
+) -> dict:
+    """Synchronously process a single GitHub webhook (runs in a worker thread).
+
+    Contains all blocking GitHub/Jira/Redis I/O. Returning a dict yields a 2xx
+    response; raising an exception propagates as a 5xx so GitHub can redeliver
+    the webhook and the work can be retried. `coalesced` holds the actions of the
+    burst of events merged into this one, see `EventCoalescer`. `lane_locked` is set
+    when the caller already holds the Redis lock of the issue, see `IssueLanes`.
+    """
+    response = _triage(payload, event)
+    if response is not None:
+        return response
+
+    with stage_timer.stage("installation"):
+        installation_id = installation_resolver.resolve(payload)
+    if installation_id is None:
+        return {"msg": "GitHub App is not installed on the repository. Ignoring."}
+
+    # the GitHub calls of the webhook count against the limits of its installation
+    with outbound_limits.bind("github", installation_id):
+        return _process_installation_webhook(payload, installation_id, coalesced, lane_locked)
+
+
+def _process_installation_webhook(
+    payload: dict, installation_id: int, coalesced: frozenset[str], lane_locked: bool
+) -> dict:
     owner = payload["repository"]["owner"]["login"]
     repo_name = payload["repository"]["name"]
-
-    git_connection = Github(
-        login_or_token=git_integration.get_access_token(
-            git_integration.get_repo_installation(owner, repo_name).id
-        ).token
-    )
+    with stage_timer.stage("token"):
+        token = token_cache.get_token(installation_id)
+    git_connection = github_client(token)
     repo = Repository(git_connection.requester, {}, payload["repository"], completed=True)
     repo_name = f"{owner}/{repo_name}"
     try:
-        contents = repo.get_contents(".github/.jira_sync_config.yaml")
-        settings_content = contents.decoded_content  # type: ignore[union-attr]
+        with stage_timer.stage("config"):
+            settings_content = config_cache.get(repo_name, repo)
     except GithubException:
+        settings_content = None
+
+    if settings_content is None:
         msg = ".github/.jira_sync_config.yaml file was not found"
         logger.error(f"{repo_name}: {msg}")
         return {"msg": msg}
 
     try:
-        settings = yaml.safe_load(settings_content)
-    except ScannerError:
-        msg = ".github/.jira_sync_config.yaml file is invalid. Check syntax."
-        logger.error(f"{repo_name}: {msg}")
-        return {"msg": msg}
+        # validation problems are logged once, when this config content is first compiled
+        settings: RepoSettings = settings_compiler.compile(settings_content, source=repo_name)
+    except SettingsError as e:
+        return {"msg": str(e)}
+    stage_timer.set_project(settings.jira_project_key)
 
-    if not settings:
-        msg = ".github/.jira_sync_config.yaml file is empty."
-        logger.warning(f"{repo_name}: {msg}")
-        return {"msg": msg}
-
-    merge_dicts(settings, DEFAULT_SETTINGS)
-
-    settings = settings["settings"]
-
-    if not settings["jira_project_key"]:
-        msg = "Jira project key is not specified. Add `jira_project_key` key to the settings file."
-        logger.warning(f"{repo_name}: {msg}")
-        return {"msg": msg}
-
-    if not settings["status_mapping"]:
-        msg = "Status mapping is not specified. Add `status_mapping` key to the settings file."
-        logger.warning(f"{repo_name}: {msg}")
-        return {"msg": msg}
+    gh_issue = _make_gh_issue(git_connection.requester, payload)
 
-    gh_issue = Issue(git_connection.requester, {}, payload["issue"], completed=True)
-
-    labels = settings["labels"] or []
-    allowed_labels = [str(label).lower() for label in labels]
     payload_labels = {label.name.lower() for label in gh_issue.labels}
-    update_jira_labels = settings["sync_labels"] and payload["action"] in ["unlabeled", "labeled"]
-    if (
-        not update_jira_labels
-        and allowed_labels
-        and not any(label in allowed_labels for label in payload_labels)
-    ):
-        msg = "Issue is not labeled with the specified label"
-        logger.warning(f"{repo_name}: {msg}")
-        return {"msg": msg}
-
-    if redis_client:
-        dedup_key = f"jira:create:{gh_issue.html_url}"
-        if redis_client.setnx(dedup_key, "1"):
-            # set expiration to 30 seconds to prevent duplicate processing
-            redis_client.expire(dedup_key, 30)
-            logger.info(f"Webhook {webhook_id}: Redis lock acquired for {gh_issue.html_url}")
-        else:
-            msg = "This issue is already being processed. Ignoring."
-            logger.warning(
-                f"{repo_name}: {msg} (webhook_id={webhook_id}, issue={gh_issue.html_url})"
-            )
-            return {"msg": msg}
+    response = _check_labels(settings, payload, payload_labels, repo_name, coalesced)
+    if response is not None:
+        return response
+
+    # wait for the replicas processing the same issue, the Jira client is taken afterwards
+    with ExitStack() as stack:
+        if not lane_locked:
+            with stage_timer.stage("lock"):
+                stack.enter_context(issue_lanes.distributed(redis_client, gh_issue.html_url))
+        jira = stack.enter_context(jira_pool.client())
+        return _sync_to_jira(jira, payload, settings, gh_issue, payload_labels, coalesced)
+
+
+def _build_issue_fields(
+    settings: RepoSettings,
+    gh_issue: Issue,
+    payload_labels: set[str],
+    allowed_components: frozenset[str] | None,
+) -> dict[str, Any]:
+    """Return the fields of the Jira issue mirroring the GitHub issue.
 
-    jira = JIRA(jira_instance_url, basic_auth=(jira_username, jira_token))
-    jira_task_desc_match = f"This issue was created from GitHub Issue {gh_issue.html_url}"
-    existing_issues = jira.enhanced_search_issues(
-        rf'project="{settings["jira_project_key"]}" AND '
-        + rf'description ~"\"{jira_task_desc_match}\""',
-        json_result=False,
-    )
-    assert isinstance(existing_issues, list), "Jira did not return a list of existing issues"
+    Args:
+        settings: settings of the repository
+        gh_issue: GitHub issue of the webhook
+        payload_labels: lower-cased labels of the GitHub issue
+        allowed_components: components of the Jira project, if `settings.components` is set
 
-    issue_body = gh_issue.body if settings["sync_description"] else ""
+    """
+    issue_body = gh_issue.body if settings.sync_description else ""
     if issue_body:
-        issue_body = truncate_description(issue_body)
-        doc = Document(issue_body)
-        issue_body = jira_text_renderer.render(doc)
+        issue_body = markdown_renderer.render_description(issue_body)
 
     issue_description = jira_issue_description_template.format(
         gh_issue_url=gh_issue.html_url,
@@ -377,43 +1012,59 @@ def process_webhook(payload: dict, webhook_id: str = "unknown") -> dict:
         gh_issue_body=issue_body,
     )
 
-    issue_type = "Bug"
-    if settings["label_mapping"]:
-        for label in payload_labels:
-            if label in settings["label_mapping"]:
-                issue_type = settings["label_mapping"][label]
-                break
-
     issue_dict: dict[str, Any] = {
-        "project": {"key": settings["jira_project_key"]},
-        "summary": _generate_summary(settings, gh_issue),
+        "project": {"key": settings.jira_project_key},
+        "summary": _generate_summary(settings.summary, gh_issue),
         "description": issue_description,
-        "issuetype": {"name": issue_type},
+        "issuetype": {"name": settings.issue_type(payload_labels)},
     }
 
-    if settings["epic_key"]:
-        issue_dict["parent"] = {"key": settings["epic_key"]}
-
-    if settings["components"]:
-        allowed_components = [c.name for c in jira.project_components(settings["jira_project_key"])]
+    if settings.epic_key:
+        issue_dict["parent"] = {"key": settings.epic_key}
 
+    if settings.components:
         issue_dict["components"] = [
             {"name": component}
-            for component in settings["components"]
-            if component in allowed_components
+            for component in settings.components
+            if component in (allowed_components or ())
         ]
+    return issue_dict
+
+
+def _render_comment(payload: dict) -> str:
+    """Return the Jira comment mirroring the GitHub comment of the webhook."""
+    comment_body = markdown_renderer.render_comment(payload["comment"]["body"])
+    return f"User *{payload['sender']['login']}* commented:\n {comment_body}"
+
+
+def _is_new_comment(settings: RepoSettings, payload: dict) -> bool:
+    return settings.sync_comments and payload["action"] == "created" and "comment" in payload
 
-    opened_status = settings["status_mapping"]["opened"]
-    closed_status = settings["status_mapping"]["closed"]
-    not_planned_status = settings["status_mapping"].get("not_planned", closed_status)
+
+def _sync_to_jira(
+    jira: JIRA,
+    payload: dict,
+    settings: RepoSettings,
+    gh_issue: Issue,
+    payload_labels: set[str],
+    coalesced: frozenset[str] = frozenset(),
+) -> dict:
+    """Create or update the Jira issue linked to the GitHub issue of the webhook."""
+    allowed_labels = settings.labels
+    update_jira_labels = _updates_jira_labels(settings, payload, coalesced)
+    with stage_timer.stage("jira_search"):
+        existing_issues = _find_existing_issues(jira, settings, gh_issue.html_url)
+
+    allowed_components = None
+    if settings.components:
+        with stage_timer.stage("jira_metadata"):
+            allowed_components = jira_metadata.components(jira, settings.jira_project_key)
+    with stage_timer.stage("render"):
+        issue_dict = _build_issue_fields(settings, gh_issue, payload_labels, allowed_components)
 
     msg = ""
     if not existing_issues:
-        if (
-            update_jira_labels
-            and allowed_labels
-            and not payload_labels.intersection(set(allowed_labels))
-        ):
+        if update_jira_labels and allowed_labels and allowed_labels.isdisjoint(payload_labels):
             return {
                 "msg": (
                     "Issue in Jira doesn't exist and GitHub labels not found in allowed_labels. "
@@ -424,16 +1075,21 @@ def process_webhook(payload: dict, webhook_id: str = "unknown") -> dict:
         if payload["action"] == "closed":
             return {"msg": "Issue in Jira doesn't exist and GitHub issue was closed. Ignoring."}
 
-        new_issue = jira.create_issue(fields=issue_dict)
+        with stage_timer.stage("jira_create"):
+            new_issue = jira.create_issue(fields=issue_dict)
         existing_issues.append(new_issue)
+        if issue_index:
+            issue_index.set(gh_issue.html_url, new_issue.key)
 
-        if settings.get("add_gh_synced_label", False):
-            gh_issue.add_to_labels(gh_synced_label_name)
+        if settings.add_gh_synced_label:
+            with stage_timer.stage("github_label"):
+                gh_issue.add_to_labels(gh_synced_label_name)
 
-        if settings["add_gh_comment"]:
+        if settings.add_gh_comment:
             gh_comment_body = gh_comment_body_template.format(jira_issue_link=new_issue.permalink())
 
-            gh_issue.create_comment(gh_comment_body)
+            with stage_timer.stage("github_comment"):
+                gh_issue.create_comment(gh_comment_body)
 
         # need this since we allow to sync issue on many actions. And if someone commented
         # we first create a Jira issue, then create a comment
@@ -443,47 +1099,44 @@ def process_webhook(payload: dict, webhook_id: str = "unknown") -> dict:
         jira_issue = existing_issues[0]
         if payload["action"] == "closed":
             if payload["issue"]["state_reason"] == "not_planned":
-                jira.transition_issue(jira_issue, not_planned_status)
+                _transition_issue(jira, settings, jira_issue, settings.not_planned_status)
                 return {"msg": "Closed existing Jira Issue as not planned"}
             else:
-                jira.transition_issue(jira_issue, closed_status)
+                _transition_issue(jira, settings, jira_issue, settings.closed_status)
                 return {"msg": "Closed existing Jira Issue"}
         elif payload["action"] == "reopened":
-            jira.transition_issue(jira_issue, opened_status)
+            _transition_issue(jira, settings, jira_issue, settings.opened_status)
             return {"msg": "Reopened existing Jira Issue"}
+        elif len(coalesced) > 1:
+            fields = _coalesced_fields(settings, jira_issue, issue_dict, payload_labels, coalesced)
+            if fields:
+                with stage_timer.stage("jira_update"):
+                    jira_issue.update(fields=fields)
+            return {"msg": _coalesced_msg(coalesced, fields)}
         elif update_jira_labels:
             jira_labels = {label.lower() for label in jira_issue.fields.labels}
             if jira_labels.symmetric_difference(payload_labels):
-                jira_issue.update(fields={"labels": list(payload_labels)})
-                b_jira_labels = ", ".join(list(jira_labels)) or "None"
-                a_jira_labels = ", ".join(list(payload_labels)) or "None"
-                return {
-                    "msg": (
-                        f"Updated existing Jira Issue labels ({b_jira_labels} -> "
-                        f"{a_jira_labels})"
-                    )
-                }
+                with stage_timer.stage("jira_update"):
+                    jira_issue.update(fields={"labels": list(payload_labels)})
+                return {"msg": _labels_updated_msg(jira_labels, payload_labels)}
 
             return {"msg": "No change to Jira Issue labels required"}
         elif payload["action"] == "edited":
-            if settings["components"]:
+            if settings.components:
                 # need to append components to the existing list
                 for component in jira_issue.fields.components:
                     issue_dict["components"].append({"name": component.name})
 
-            jira_issue.update(fields=issue_dict)
+            with stage_timer.stage("jira_update"):
+                jira_issue.update(fields=issue_dict)
             return {"msg": "Updated existing Jira Issue"}
 
-    if settings["sync_comments"] and payload["action"] == "created" and "comment" in payload.keys():
+    if _is_new_comment(settings, payload):
         # new comment was added to the issue
-
-        comment_body = payload["comment"]["body"]
-        doc = Document(comment_body)
-        comment_body = jira_text_renderer.render(doc)
-        jira.add_comment(
-            existing_issues[0],
-            f"User *{payload['sender']['login']}* commented:\n {comment_body}",
-        )
+        with stage_timer.stage("render"):
+            comment = _render_comment(payload)
+        with stage_timer.stage("jira_comment"):
+            jira.add_comment(existing_issues[0], comment)
         return {"msg": msg + "New comment from GitHub was added to Jira"}
 
     if not msg:
@@ -492,6 +1145,279 @@ def process_webhook(payload: dict, webhook_id: str = "unknown") -> dict:
         return {"msg": msg}
 
 
+def _coalesced_fields(
+    settings: RepoSettings,
+    jira_issue,
+    issue_dict: dict[str, Any],
+    payload_labels: set[str],
+    coalesced: frozenset[str],
+) -> dict[str, Any]:
+    """Return the fields of the Jira issue to update after a burst of coalesced events.
+
+    The fields an `edited` event would update and the labels a `labeled`/`unlabeled` event
+    would update are merged, both taken from the latest state of the GitHub issue.
+    """
+    fields: dict[str, Any] = {}
+    if "edited" in coalesced:
+        fields.update(issue_dict)
+        if settings.components:
+            fields["components"] = issue_dict["components"] + [
+                {"name": component.name} for component in jira_issue.fields.components
+            ]
+    if settings.sync_labels and not coalesced.isdisjoint(["labeled", "unlabeled"]):
+        jira_labels = {label.lower() for label in jira_issue.fields.labels}
+        if jira_labels.symmetric_difference(payload_labels):
+            fields["labels"] = list(payload_labels)
+    return fields
+
+
+def _coalesced_msg(coalesced: frozenset[str], fields: dict[str, Any]) -> str:
+    actions = ", ".join(sorted(coalesced))
+    if not fields:
+        return f"No change to Jira Issue required by coalesced events ({actions})"
+    return f"Updated existing Jira Issue from coalesced events ({actions})"
+
+
+def _labels_updated_msg(jira_labels: set[str], payload_labels: set[str]) -> str:
+    b_jira_labels = ", ".join(list(jira_labels)) or "None"
+    a_jira_labels = ", ".join(list(payload_labels)) or "None"
+    return f"Updated existing Jira Issue labels ({b_jira_labels} -> {a_jira_labels})"
+
+
+async def process_webhook_async(
+    payload: dict,
+    webhook_id: str = "unknown",
+    event: str = "",
+    coalesced: frozenset[str] = frozenset(),
+) -> dict:
+    """Process a single GitHub webhook on the event loop (async execution mode).
+
+    Same flow and responses as `process_webhook`, but GitHub, Jira and Redis are reached
+    with async clients. The issue index is a local SQLite database or a single Redis
+    command, its calls are short and run in the thread pool.
+    """
+    response = _triage(payload, event)
+    if response is not None:
+        return response
+
+    installation_id = (payload.get("installation") or {}).get("id")
+    if installation_id is None:
+        # webhooks delivered to a GitHub App carry the installation, this lookup is a fallback
+        with stage_timer.stage("installation"):
+            installation_id = await anyio.to_thread.run_sync(installation_resolver.resolve, payload)
+    if installation_id is None:
+        return {"msg": "GitHub App is not installed on the repository. Ignoring."}
+
+    # the GitHub calls of the webhook count against the limits of its installation
+    with outbound_limits.bind("github", installation_id):
+        return await _process_installation_webhook_async(payload, installation_id, coalesced)
+
+
+async def _process_installation_webhook_async(
+    payload: dict, installation_id: int, coalesced: frozenset[str]
+) -> dict:
+    repo_name = payload["repository"]["full_name"]
+    github = _async_github_client()
+    with stage_timer.stage("token"):
+        token = await async_token_cache.get_token(installation_id)
+    try:
+        with stage_timer.stage("config"):
+            settings_content = await config_cache.get_async(
+                repo_name, lambda etag: github.get_contents(repo_name, CONFIG_PATH, token, etag)
+            )
+    except httpx.HTTPError:
+        settings_content = None
+
+    if settings_content is None:
+        msg = ".github/.jira_sync_config.yaml file was not found"
+        logger.error(f"{repo_name}: {msg}")
+        return {"msg": msg}
+
+    try:
+        settings: RepoSettings = settings_compiler.compile(settings_content, source=repo_name)
+    except SettingsError as e:
+        return {"msg": str(e)}
+    stage_timer.set_project(settings.jira_project_key)
+
+    # the issue is only read from the payload, its requester is never used
+    gh_issue = _make_gh_issue(payload_requester, payload)
+
+    payload_labels = {label.name.lower() for label in gh_issue.labels}
+    response = _check_labels(settings, payload, payload_labels, repo_name, coalesced)
+    if response is not None:
+        return response
+
+    async with AsyncExitStack() as stack:
+        with stage_timer.stage("lock"):
+            await stack.enter_async_context(
+                issue_lanes.distributed_async(
+                    _async_redis_client() if redis_client else None, gh_issue.html_url
+                )
+            )
+        return await _sync_to_jira_async(
+            _async_jira_client(),
+            github,
+            token,
+            payload,
+            settings,
+            gh_issue,
+            payload_labels,
+            coalesced,
+        )
+
+
+async def _find_existing_issues_async(
+    jira: AsyncJiraClient, settings: RepoSettings, gh_issue_url: str
+) -> list:
+    """Async variant of `_find_existing_issues`."""
+    if issue_index:
+        jira_key = await anyio.to_thread.run_sync(issue_index.get, gh_issue_url)
+        if jira_key and jira_key.startswith(f"{settings.jira_project_key}-"):
+            try:
+                return [await jira.issue(jira_key)]
+            except JIRAError as e:
+                if e.status_code != 404:
+                    raise
+                logger.warning(f"Jira issue {jira_key} linked to {gh_issue_url} does not exist")
+                await anyio.to_thread.run_sync(issue_index.delete, gh_issue_url)
+
+    jira_task_desc_match = f"This issue was created from GitHub Issue {gh_issue_url}"
+    existing_issues = await jira.enhanced_search_issues(
+        rf'project="{settings.jira_project_key}" AND '
+        + rf'description ~"\"{jira_task_desc_match}\""'
+    )
+
+    if existing_issues and issue_index:
+        await anyio.to_thread.run_sync(issue_index.set, gh_issue_url, existing_issues[0].key)
+    return existing_issues
+
+
+async def _transition_issue_async(
+    jira: AsyncJiraClient, settings: RepoSettings, jira_issue, transition_name: str
+):
+    """Async variant of `_transition_issue`."""
+    with stage_timer.stage("jira_transition"):
+        project_key = settings.jira_project_key
+        transition_id = await jira_metadata.transition_id_async(
+            jira, project_key, jira_issue, transition_name
+        )
+        if transition_id is None:
+            await jira.transition_issue(jira_issue, transition_name)
+            return
+
+        try:
+            await jira.transition_issue(jira_issue, transition_id)
+        except JIRAError:
+            logger.warning(f"Cached transition '{transition_name}' failed for {jira_issue.key}")
+            jira_metadata.invalidate(project_key)
+            await jira.transition_issue(jira_issue, transition_name)
+
+
+async def _sync_to_jira_async(
+    jira: AsyncJiraClient,
+    github: AsyncGithubClient,
+    token: str,
+    payload: dict,
+    settings: RepoSettings,
+    gh_issue: Issue,
+    payload_labels: set[str],
+    coalesced: frozenset[str] = frozenset(),
+) -> dict:
+    """Async variant of `_sync_to_jira`, `token` being the installation access token."""
+    allowed_labels = settings.labels
+    update_jira_labels = _updates_jira_labels(settings, payload, coalesced)
+    with stage_timer.stage("jira_search"):
+        existing_issues = await _find_existing_issues_async(jira, settings, gh_issue.html_url)
+
+    allowed_components = None
+    if settings.components:
+        with stage_timer.stage("jira_metadata"):
+            allowed_components = await jira_metadata.components_async(
+                jira, settings.jira_project_key
+            )
+    with stage_timer.stage("render"):
+        # Markdown rendering is CPU-bound, and may wait for the render pool
+        issue_dict = await anyio.to_thread.run_sync(
+            _build_issue_fields, settings, gh_issue, payload_labels, allowed_components
+        )
+
+    msg = ""
+    if not existing_issues:
+        if update_jira_labels and allowed_labels and allowed_labels.isdisjoint(payload_labels):
+            return {
+                "msg": (
+                    "Issue in Jira doesn't exist and GitHub labels not found in allowed_labels. "
+                    "Ignoring."
+                )
+            }
+
+        if payload["action"] == "closed":
+            return {"msg": "Issue in Jira doesn't exist and GitHub issue was closed. Ignoring."}
+
+        with stage_timer.stage("jira_create"):
+            new_issue = await jira.create_issue(fields=issue_dict)
+        existing_issues.append(new_issue)
+        if issue_index:
+            await anyio.to_thread.run_sync(issue_index.set, gh_issue.html_url, new_issue.key)
+
+        gh_issue_api_url = payload["issue"]["url"]
+        if settings.add_gh_synced_label:
+            with stage_timer.stage("github_label"):
+                await github.add_labels(gh_issue_api_url, token, [gh_synced_label_name])
+
+        if settings.add_gh_comment:
+            gh_comment_body = gh_comment_body_template.format(jira_issue_link=new_issue.permalink())
+            with stage_timer.stage("github_comment"):
+                await github.create_comment(gh_issue_api_url, token, gh_comment_body)
+
+        msg = "Issue was created in Jira. "
+    else:
+        jira_issue = existing_issues[0]
+        if payload["action"] == "closed":
+            if payload["issue"]["state_reason"] == "not_planned":
+                await _transition_issue_async(
+                    jira, settings, jira_issue, settings.not_planned_status
+                )
+                return {"msg": "Closed existing Jira Issue as not planned"}
+            else:
+                await _transition_issue_async(jira, settings, jira_issue, settings.closed_status)
+                return {"msg": "Closed existing Jira Issue"}
+        elif payload["action"] == "reopened":
+            await _transition_issue_async(jira, settings, jira_issue, settings.opened_status)
+            return {"msg": "Reopened existing Jira Issue"}
+        elif len(coalesced) > 1:
+            fields = _coalesced_fields(settings, jira_issue, issue_dict, payload_labels, coalesced)
+            if fields:
+                with stage_timer.stage("jira_update"):
+                    await jira.update_issue(jira_issue, fields=fields)
+            return {"msg": _coalesced_msg(coalesced, fields)}
+        elif update_jira_labels:
+            jira_labels = {label.lower() for label in jira_issue.fields.labels}
+            if jira_labels.symmetric_difference(payload_labels):
+                with stage_timer.stage("jira_update"):
+                    await jira.update_issue(jira_issue, fields={"labels": list(payload_labels)})
+                return {"msg": _labels_updated_msg(jira_labels, payload_labels)}
+
+            return {"msg": "No change to Jira Issue labels required"}
+        elif payload["action"] == "edited":
+            if settings.components:
+                for component in jira_issue.fields.components:
+                    issue_dict["components"].append({"name": component.name})
+
+            with stage_timer.stage("jira_update"):
+                await jira.update_issue(jira_issue, fields=issue_dict)
+            return {"msg": "Updated existing Jira Issue"}
+
+    if _is_new_comment(settings, payload):
+        with stage_timer.stage("render"):
+            comment = await anyio.to_thread.run_sync(_render_comment, payload)
+        with stage_timer.stage("jira_comment"):
+            await jira.add_comment(existing_issues[0], comment)
+        return {"msg": msg + "New comment from GitHub was added to Jira"}
+
+    return {"msg": msg or "No action performed"}
+
+
 if __name__ == "__main__":
     import uvicorn
 
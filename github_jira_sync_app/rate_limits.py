@@ -0,0 +1,424 @@
+"""Client-side adaptive limits of the calls to Jira and GitHub."""
+
+import asyncio
+import email.utils
+import functools
+import logging
+import math
+import re
+import threading
+import time
+from contextlib import ExitStack
+from contextlib import asynccontextmanager
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from typing import AsyncIterator
+from typing import Callable
+from typing import Iterator
+from typing import Mapping
+
+import requests
+from github.Requester import HTTPRequestsConnectionClass
+from github.Requester import HTTPSRequestsConnectionClass
+from github.Requester import Requester
+
+from .circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger("sync-bot-server")
+
+# multiplicative decrease of the concurrency limit on a throttled or slow call
+BACKOFF = 0.5
+# interval at which async callers check a limiter waiting for a free slot
+_POLL_INTERVAL = 0.01
+
+
+class RateLimited(Exception):
+    """Raised when a call would wait longer than allowed for its limiter."""
+
+    def __init__(self, backend: str, retry_after: int):
+        super().__init__(f"{backend} calls are rate limited")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class LimiterConfig:
+    """Settings of the limiters of a backend.
+
+    Attributes:
+        rate: calls per second of the token bucket, 0 for no limit
+        burst: calls that can be made at once when the bucket is full
+        max_concurrency: initial and maximum number of concurrent calls
+        min_concurrency: minimum number of concurrent calls
+        latency_tolerance: factor of the no-load latency above which calls are considered
+            slow and the concurrency is decreased, 0 (default) to only react to throttling
+        max_wait: maximum seconds a call waits for the limiter before `RateLimited`
+
+    """
+
+    rate: float = 0
+    burst: int = 10
+    max_concurrency: int = 20
+    min_concurrency: int = 1
+    latency_tolerance: float = 0
+    max_wait: float = 30
+
+
+@dataclass
+class _Call:
+    started: float
+    status: int | None = None
+    headers: Mapping[str, str] = field(default_factory=dict)
+
+    def observe(self, status: int, headers: Mapping[str, str]):
+        """Record the response of the call, for the limiter to adapt to it."""
+        self.status = status
+        self.headers = headers
+
+
+class AdaptiveLimiter:
+    """Token bucket and AIMD concurrency limit of the calls to a backend.
+
+    Calls take a token of the bucket (if `rate` is set) and a slot of the concurrency limit.
+    The limit is increased by one for every `limit` successful calls, and halved at most
+    once per round trip when a call is throttled (429, 503), or if `latency_tolerance` is set,
+    when the latency of the calls rises above `latency_tolerance` times the no-load latency.
+    Calls are paused until the time given by a `Retry-After` header, or by `X-RateLimit-Reset`
+    once `X-RateLimit-Remaining` reaches 0.
+
+    Safe to use from worker threads and from the event loop.
+
+    Args:
+        backend: name of the backend, e.g. `jira`
+        config: settings of the limiter
+        on_backoff: called with the reason (`throttled` or `latency`) of every decrease
+
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        config: LimiterConfig,
+        on_backoff: Callable[[str], None] | None = None,
+    ):
+        self._backend = backend
+        self._config = config
+        self._on_backoff = on_backoff
+        self._cond = threading.Condition()
+        self._tokens = float(config.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._baseline: float | None = None
+        self._latency: float | None = None
+        self.limit = float(config.max_concurrency)
+        self.in_flight = 0
+
+    @contextmanager
+    def call(self) -> Iterator[_Call]:
+        """Hold a slot during a call, the response is reported with `observe`.
+
+        Raises:
+            RateLimited: if no slot is available within `max_wait` seconds
+
+        """
+        call = _Call(self.acquire())
+        try:
+            yield call
+        finally:
+            self.release(call)
+
+    @asynccontextmanager
+    async def call_async(self) -> AsyncIterator[_Call]:
+        """Async variant of `call`, for the async execution mode."""
+        call = _Call(await self.acquire_async())
+        try:
+            yield call
+        finally:
+            self.release(call)
+
+    def acquire(self) -> float:
+        """Wait for a slot, return the time the call started at."""
+        deadline = time.monotonic() + self._config.max_wait
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0:
+                    return time.monotonic()
+                self._cond.wait(self._bounded_wait(wait, deadline))
+
+    async def acquire_async(self) -> float:
+        """Async variant of `acquire`, polling the limiter without blocking the event loop."""
+        deadline = time.monotonic() + self._config.max_wait
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+            if wait == 0:
+                return time.monotonic()
+            await asyncio.sleep(self._bounded_wait(wait or _POLL_INTERVAL, deadline))
+
+    def release(self, call: _Call):
+        """Free the slot of the call and adapt the limits to its response."""
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            if call.status is not None:
+                pause = _pause(call.headers)
+                if pause:
+                    self._paused_until = max(self._paused_until, now + pause)
+                if pause or call.status in [429, 503]:
+                    self._decrease(call, "throttled")
+                elif self._is_slow(now - call.started):
+                    self._decrease(call, "latency")
+                elif call.status < 500:
+                    self.limit = min(self._config.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _try_acquire(self) -> float | None:
+        """Take a slot and return 0, or return how long to wait, None until a release."""
+        now = time.monotonic()
+        if self._paused_until > now:
+            return self._paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        if self._config.rate:
+            self._tokens = min(
+                self._config.burst, self._tokens + (now - self._refilled_at) * self._config.rate
+            )
+            self._refilled_at = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self._config.rate
+            self._tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def _bounded_wait(self, wait: float | None, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if wait is None:
+            wait = remaining
+        if remaining <= 0 or wait > remaining:
+            # no point in waiting for a slot that will not be available in time
+            raise RateLimited(self._backend, max(1, math.ceil(wait)))
+        return wait
+
+    def _is_slow(self, latency: float) -> bool:
+        if not self._config.latency_tolerance:
+            return False
+        # the baseline follows the lowest latencies, and slowly the latency trend
+        if self._baseline is None or self._latency is None:
+            self._baseline = self._latency = latency
+        self._baseline = min(latency, self._baseline + (latency - self._baseline) * 0.01)
+        self._latency += (latency - self._latency) * 0.1
+        return self._latency > self._config.latency_tolerance * self._baseline
+
+    def _decrease(self, call: _Call, reason: str):
+        # the calls started before the previous decrease report the same congestion
+        if call.started < self._decreased_at:
+            return
+        self._decreased_at = time.monotonic()
+        self.limit = max(self._config.min_concurrency, self.limit * BACKOFF)
+        logger.warning(
+            f"{self._backend} calls {reason}, concurrency limit decreased to {int(self.limit)}"
+        )
+        if self._on_backoff is not None:
+            self._on_backoff(reason)
+
+
+def _pause(headers: Mapping[str, str]) -> float | None:
+    """Return the seconds to wait before the next call, as asked by the backend, if any."""
+    try:
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            if retry_after.isdigit():
+                return float(retry_after)
+            return email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time()
+
+        reset = headers.get("X-RateLimit-Reset")
+        if headers.get("X-RateLimit-Remaining") == "0" and reset:
+            # epoch seconds for GitHub, ISO 8601 timestamp for Jira, e.g. 2024-05-24T10:31Z
+            if reset.isdigit():
+                at = float(reset)
+            else:
+                # `fromisoformat` only accepts the `Z` suffix from Python 3.11
+                at = datetime.fromisoformat(re.sub(r"Z$", "+00:00", reset)).timestamp()
+            return at - time.time()
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid rate limit headers: {dict(headers)}")
+    return None
+
+
+_bound_keys: ContextVar[dict[str, str] | None] = ContextVar("outbound_keys", default=None)
+
+
+class OutboundLimits:
+    """Adaptive limiters of the calls to every backend, one per key.
+
+    The keys are e.g. the Jira instances and the GitHub installations. Only the first
+    `max_keys` keys of a backend get their own limiter, the other ones share the limiter
+    of the `other` key. Code without access to the key, such as the connections of
+    PyGithub, finds the limiter of the key bound to the current context with `current`.
+
+    Args:
+        configs: settings of the limiters of every backend
+        max_keys: maximum number of limiters (and metric label values) per backend
+        meter: OpenTelemetry meter of the limits and of their decreases, if any
+
+    """
+
+    def __init__(self, configs: dict[str, LimiterConfig], max_keys: int = 100, meter=None):
+        self._configs = configs
+        self._max_keys = max_keys
+        self._limiters: dict[tuple[str, str], AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+        self._backoff_counter = None
+        if meter is not None:
+            self._instrument(meter)
+
+    def get(self, backend: str, key) -> AdaptiveLimiter:
+        """Return the limiter of the key of the backend."""
+        key = str(key)
+        with self._lock:
+            if (backend, key) not in self._limiters:
+                if sum(1 for b, _ in self._limiters if b == backend) >= self._max_keys:
+                    key = "other"
+            if (backend, key) not in self._limiters:
+                self._limiters[(backend, key)] = AdaptiveLimiter(
+                    backend,
+                    self._configs[backend],
+                    on_backoff=lambda reason: self._count_backoff(backend, reason),
+                )
+            return self._limiters[(backend, key)]
+
+    @contextmanager
+    def bind(self, backend: str, key) -> Iterator[None]:
+        """Make the key of the backend the one of `current` in the `with` block."""
+        token = _bound_keys.set({**(_bound_keys.get() or {}), backend: str(key)})
+        try:
+            yield
+        finally:
+            _bound_keys.reset(token)
+
+    def current(self, backend: str) -> AdaptiveLimiter | None:
+        """Return the limiter of the key bound to the current context, None if unbound."""
+        key = (_bound_keys.get() or {}).get(backend)
+        return self.get(backend, key) if key is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._limiters.clear()
+
+    def _count_backoff(self, backend: str, reason: str):
+        if self._backoff_counter is not None:
+            self._backoff_counter.add(1, {"backend": backend, "reason": reason})
+
+    def _instrument(self, meter):
+        from opentelemetry.metrics import Observation
+
+        def observe(attribute: str):
+            return lambda _options: [
+                Observation(getattr(limiter, attribute), {"backend": backend, "key": key})
+                for (backend, key), limiter in list(self._limiters.items())
+            ]
+
+        meter.create_observable_gauge(
+            "syncbot_outbound_concurrency_limit",
+            callbacks=[observe("limit")],
+            description="Adaptive limit of the concurrent calls to a backend",
+        )
+        meter.create_observable_gauge(
+            "syncbot_outbound_in_flight",
+            callbacks=[observe("in_flight")],
+            description="Calls to a backend in progress",
+        )
+        self._backoff_counter = meter.create_counter(
+            "syncbot_outbound_backoffs_total",
+            description="Total number of decreases of the concurrency limit of a backend",
+        )
+
+
+class ThrottledAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter sending every request within a slot of the limiter of its backend.
+
+    Args:
+        limiter: callable returning the limiter of the requests, None to not limit them
+        breaker: circuit breaker of the backend, failing the requests while it is down
+
+    """
+
+    def __init__(
+        self,
+        limiter: Callable[[], AdaptiveLimiter | None],
+        breaker: CircuitBreaker | None = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._limiter = limiter
+        self._breaker = breaker
+
+    def send(self, request, *args, **kwargs):
+        # the breaker first, not to wait for a slot to call a backend that is down
+        guards = [self._breaker, self._limiter()]
+        with ExitStack() as stack:
+            calls = [stack.enter_context(guard.call()) for guard in guards if guard is not None]
+            response = super().send(request, *args, **kwargs)
+            for call in calls:
+                call.observe(response.status_code, response.headers)
+        return response
+
+
+def _mount(connection, limiter: Callable[[], AdaptiveLimiter | None], breaker):
+    connection.adapter = ThrottledAdapter(
+        limiter,
+        breaker,
+        max_retries=connection.retry,
+        pool_connections=connection.pool_size,
+        pool_maxsize=connection.pool_size,
+    )
+    connection.session.mount(f"{connection.protocol}://", connection.adapter)
+
+
+class _ThrottledHTTPConnection(HTTPRequestsConnectionClass):
+    def __init__(self, *args, limiter, breaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        _mount(self, limiter, breaker)
+
+
+class _ThrottledHTTPSConnection(HTTPSRequestsConnectionClass):
+    def __init__(self, *args, limiter, breaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        _mount(self, limiter, breaker)
+
+
+def throttle_pygithub(
+    requester: Requester,
+    limiter: Callable[[], AdaptiveLimiter | None],
+    breaker: CircuitBreaker | None = None,
+):
+    """Send the requests of a PyGithub client through a `ThrottledAdapter`.
+
+    The requester opens its connection on its first request, and keeps it. Its requests find
+    their limiter at request time, see `OutboundLimits.current`.
+
+    Args:
+        requester: requester of a `Github` or `GithubIntegration` client
+        limiter: callable returning the limiter of the requests, None to not limit them
+        breaker: circuit breaker of GitHub, failing the requests while it is down
+
+    """
+    # `Requester.injectConnectionClasses` would replace the connections of every client of the
+    # process, and stop them from being reused. The private attribute is the one of the pinned
+    # PyGithub 2.5, see pyproject.toml.
+    if not hasattr(requester, "_Requester__connectionClass"):
+        logger.warning("Unsupported PyGithub version, its calls to GitHub are not throttled")
+        return
+    connection_class = (
+        _ThrottledHTTPSConnection if requester.scheme == "https" else _ThrottledHTTPConnection
+    )
+    setattr(
+        requester,
+        "_Requester__connectionClass",
+        functools.partial(connection_class, limiter=limiter, breaker=breaker),
+    )
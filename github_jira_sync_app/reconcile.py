@@ -0,0 +1,491 @@
+"""Reconciliation of the Jira issues with the GitHub issues updated since the previous run.
+
+Usage:
+    python -m github_jira_sync_app.reconcile --dry-run
+    python -m github_jira_sync_app.reconcile --repo canonical/foo --budget 500
+
+Webhooks can be missed (GitHub outage, bot restart, failed redelivery). A run lists, for every
+repository, the GitHub issues updated since the watermark saved by the previous run, fetches
+their Jira issues with batched `key in (...)` searches and fixes the state, labels and summary
+that drifted. Uses the same environment variables as the server, which also runs it every
+`RECONCILE_INTERVAL` seconds if set.
+"""
+
+import argparse
+import json
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from pathlib import Path
+from typing import Iterable
+from typing import Iterator
+from typing import TypeVar
+
+from github import Github
+from github.GithubObject import NotSet
+from github.Issue import Issue
+from github.Repository import Repository
+from jira import JIRA
+from jira import JIRAError
+
+from .backfill import find_linked_issues
+from .backfill import list_installation_repos
+from .issue_index import IssueIndex
+from .repo_settings import RepoSettings
+
+logger = logging.getLogger("sync-bot-server")
+
+DRIFT_KINDS = ["state", "labels", "summary"]
+
+# fields of the Jira issues compared with their GitHub issue
+JIRA_FIELDS = "summary,labels,status,issuetype"
+
+# key of the category of the Jira statuses closing an issue, whatever their name
+DONE_CATEGORY = "done"
+
+T = TypeVar("T")
+
+
+class BudgetExhausted(Exception):
+    """Raised when a run made as many API calls as allowed."""
+
+
+class ApiBudget:
+    """Number of GitHub and Jira API calls a run may still make.
+
+    Every call of a run is charged, including the listing of the installations and
+    repositories and the lookups of tokens and config files. Cached lookups are charged as
+    calls, so the budget bounds the calls of a run from above.
+
+    Args:
+        limit: number of calls allowed
+
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.spent = 0
+
+    def spend(self, calls: int = 1):
+        if self.spent + calls > self.limit:
+            raise BudgetExhausted(f"API budget of {self.limit} calls exhausted")
+        self.spent += calls
+
+    def pages(self, items: Iterable[T], page_size: int) -> Iterator[T]:
+        """Yield the items of a paginated list, charging every page as it is requested."""
+        self.spend()
+        for n, item in enumerate(items):
+            if n and n % page_size == 0:
+                self.spend()
+            yield item
+
+
+class WatermarkStore:
+    """Last update time of the GitHub issues reconciled, per repository, in a JSON file.
+
+    Args:
+        path: JSON file, None to keep the watermarks in memory
+
+    """
+
+    def __init__(self, path: str | None):
+        self._path = Path(path) if path else None
+        self._watermarks: dict[str, str] = {}
+        if self._path and self._path.exists():
+            self._watermarks = json.loads(self._path.read_text())
+        self._lock = threading.Lock()
+
+    def get(self, repo_name: str) -> datetime | None:
+        watermark = self._watermarks.get(repo_name)
+        return datetime.fromisoformat(watermark) if watermark else None
+
+    def set(self, repo_name: str, watermark: datetime):
+        with self._lock:
+            self._watermarks[repo_name] = watermark.isoformat()
+            if self._path:
+                tmp_path = self._path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(self._watermarks, indent=2))
+                tmp_path.replace(self._path)
+
+
+@dataclass
+class Drift:
+    """Differences between a GitHub issue and its Jira issue."""
+
+    jira_key: str
+    kinds: list[str] = field(default_factory=list)
+    fields: dict = field(default_factory=dict)
+    transition: str | None = None
+
+
+@dataclass
+class ReconcileReport:
+    repos: int = 0
+    checked: int = 0
+    unlinked: int = 0
+    drift: Counter = field(default_factory=Counter)
+    fixed: Counter = field(default_factory=Counter)
+    failed: int = 0
+    budget_exhausted: bool = False
+    dry_run: bool = False
+
+    def summary(self) -> str:
+        drift = ", ".join(f"{kind}: {self.drift[kind]}" for kind in DRIFT_KINDS)
+        fixed = (
+            "not fixed (dry run)"
+            if self.dry_run
+            else f"{sum(self.fixed.values())} fixed, {self.failed} failed"
+        )
+        return (
+            f"{self.repos} repositories, {self.checked} issues checked, "
+            f"{self.unlinked} not in Jira, drift ({drift}), {fixed}"
+            + (", API budget exhausted" if self.budget_exhausted else "")
+        )
+
+
+def compute_drift(settings: RepoSettings, gh_issue: Issue, jira_issue) -> Drift:
+    """Return how the Jira issue differs from what the webhooks of the GitHub issue would set.
+
+    The state is compared with the category of the Jira status: a Jira issue is closed when
+    its status is in the "done" category, e.g. "Done" or "Rejected", whatever the transitions
+    of `status_mapping` are named.
+    """
+    from .main import _generate_summary
+
+    drift = Drift(jira_issue.key)
+    jira_closed = jira_issue.fields.status.statusCategory.key == DONE_CATEGORY
+    if gh_issue.state == "closed" and not jira_closed:
+        drift.kinds.append("state")
+        if gh_issue.state_reason == "not_planned":
+            drift.transition = settings.not_planned_status
+        else:
+            drift.transition = settings.closed_status
+    elif gh_issue.state == "open" and jira_closed:
+        drift.kinds.append("state")
+        drift.transition = settings.opened_status
+
+    if settings.sync_labels:
+        gh_labels = {label.name.lower() for label in gh_issue.labels}
+        jira_labels = {label.lower() for label in jira_issue.fields.labels}
+        if gh_labels != jira_labels:
+            drift.kinds.append("labels")
+            drift.fields["labels"] = sorted(gh_labels)
+
+    summary = _generate_summary(settings.summary, gh_issue)
+    if summary != jira_issue.fields.summary:
+        drift.kinds.append("summary")
+        drift.fields["summary"] = summary
+    return drift
+
+
+class Reconciler:
+    """Fix the Jira issues whose GitHub issue changed without the bot syncing it.
+
+    Only the issues not updated within `grace` seconds are reconciled, the ones updated
+    more recently may still have webhooks in flight. The watermark of a repository is moved
+    forward as its issues are reconciled, so a run stopped by the API budget resumes there.
+    An issue whose drift Jira fails to fix (e.g. a transition not available from its status)
+    is logged and counted as failed, the watermark still moves past it.
+
+    Args:
+        watermarks: store of the watermarks
+        index: issue index, if enabled
+        budget: maximum number of GitHub and Jira API calls of a run
+        grace: seconds since their last update before issues are reconciled
+        batch_size: number of Jira issues fetched per search
+        meter: OpenTelemetry meter counting the drift found and fixed, if any
+
+    """
+
+    def __init__(
+        self,
+        watermarks: WatermarkStore,
+        index: IssueIndex | None,
+        budget: int = 1000,
+        grace: float = 300,
+        batch_size: int = 100,
+        meter=None,
+    ):
+        self._watermarks = watermarks
+        self._index = index
+        self._budget = budget
+        self._grace = grace
+        self._batch_size = batch_size
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self._drift_counter = self._fixed_counter = None
+        if meter is not None:
+            self._drift_counter = meter.create_counter(
+                "syncbot_reconcile_drift_total",
+                description="Total number of drifted fields found by the reconciliation",
+            )
+            self._fixed_counter = meter.create_counter(
+                "syncbot_reconcile_fixed_total",
+                description="Total number of drifted fields fixed by the reconciliation",
+            )
+
+    def api_budget(self, budget: int | None = None) -> ApiBudget:
+        """Return the API budget of a run, of `budget` calls instead of the default one."""
+        return ApiBudget(budget or self._budget)
+
+    def run(
+        self,
+        targets: Iterable[tuple[Github, Repository, RepoSettings]],
+        jira: JIRA,
+        dry_run: bool = False,
+        budget: int | ApiBudget | None = None,
+    ) -> ReconcileReport:
+        """Reconcile the repositories, within the API budget of a run.
+
+        Args:
+            targets: GitHub clients, repositories and settings of the repositories
+            jira: Jira client
+            dry_run: only report the drift, without moving the watermarks
+            budget: maximum number of API calls of the run instead of the default one, or
+                the budget the calls listing the targets are charged to
+
+        Returns:
+            the report of the run
+
+        """
+        report = ReconcileReport(dry_run=dry_run)
+        api_budget = budget if isinstance(budget, ApiBudget) else self.api_budget(budget)
+        try:
+            for github, repo, settings in targets:
+                report.repos += 1
+                self.reconcile_repo(github, repo, settings, jira, api_budget, report)
+        except BudgetExhausted as e:
+            logger.warning(f"Reconciliation stopped: {e}")
+            report.budget_exhausted = True
+        logger.info(f"Reconciliation: {report.summary()}")
+        return report
+
+    def reconcile_repo(
+        self,
+        github: Github,
+        repo: Repository,
+        settings: RepoSettings,
+        jira: JIRA,
+        budget: ApiBudget,
+        report: ReconcileReport,
+    ):
+        """Reconcile the issues of the repository updated since its watermark."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self._grace)
+        batch: list[Issue] = []
+        for gh_issue in self._updated_issues(github, repo, budget):
+            if gh_issue.updated_at > cutoff:
+                break
+            batch.append(gh_issue)
+            if len(batch) == self._batch_size:
+                self._reconcile_batch(repo, settings, jira, batch, budget, report)
+                batch = []
+        if batch:
+            self._reconcile_batch(repo, settings, jira, batch, budget, report)
+
+    def start(self, interval: float, run_all):
+        """Call `run_all` every `interval` seconds from a background thread."""
+
+        def loop():
+            while not self._stopping.wait(interval):
+                try:
+                    run_all()
+                except Exception:
+                    logger.exception("Reconciliation failed")
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=loop, name="reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _updated_issues(
+        self, github: Github, repo: Repository, budget: ApiBudget
+    ) -> Iterator[Issue]:
+        from .main import _make_gh_issue
+
+        since = self._watermarks.get(repo.full_name)
+        issues = repo.get_issues(
+            state="all", sort="updated", direction="asc", since=since or NotSet
+        )
+        for issue in budget.pages(issues, page_size=100):
+            if "pull_request" in issue.raw_data:
+                continue
+            yield _make_gh_issue(
+                github.requester, {"issue": issue.raw_data, "repository": repo.raw_data}
+            )
+
+    def _reconcile_batch(
+        self,
+        repo: Repository,
+        settings: RepoSettings,
+        jira: JIRA,
+        batch: list[Issue],
+        budget: ApiBudget,
+        report: ReconcileReport,
+    ):
+        from .main import _transition_issue
+
+        urls = [gh_issue.html_url for gh_issue in batch]
+        linked = find_linked_issues(
+            jira, self._index, settings.jira_project_key, urls, on_search=budget.spend
+        )
+        jira_issues = self._fetch_jira_issues(jira, linked, budget) if linked else {}
+
+        for gh_issue in batch:
+            report.checked += 1
+            jira_issue = jira_issues.get(linked.get(gh_issue.html_url, ""))
+            if jira_issue is None:
+                report.unlinked += 1
+            else:
+                drift = compute_drift(settings, gh_issue, jira_issue)
+                self._count(self._drift_counter, report.drift, drift.kinds)
+                if drift.kinds and not report.dry_run:
+                    logger.info(f"{gh_issue.html_url}: fixing {', '.join(drift.kinds)} drift")
+                    try:
+                        if drift.fields:
+                            budget.spend()
+                            jira_issue.update(fields=drift.fields)
+                        if drift.transition:
+                            budget.spend(2)
+                            _transition_issue(jira, settings, jira_issue, drift.transition)
+                    except JIRAError as e:
+                        logger.error(
+                            f"{gh_issue.html_url}: drift of {jira_issue.key} not fixed: "
+                            f"{e.status_code} {e.text}"
+                        )
+                        report.failed += 1
+                    else:
+                        self._count(self._fixed_counter, report.fixed, drift.kinds)
+                elif drift.kinds:
+                    logger.info(f"{gh_issue.html_url}: {', '.join(drift.kinds)} drifted")
+            if not report.dry_run:
+                self._watermarks.set(repo.full_name, gh_issue.updated_at)
+
+    def _fetch_jira_issues(self, jira: JIRA, linked: dict[str, str], budget: ApiBudget) -> dict:
+        """Return the Jira issues linked to the GitHub issues, by key.
+
+        Issues are fetched with a single search, or one by one if the search fails, e.g. as
+        one of them was deleted. Deleted issues are missing, and removed from the index.
+        """
+        budget.spend()
+        try:
+            found = jira.enhanced_search_issues(
+                f"key in ({', '.join(linked.values())})",
+                maxResults=len(linked),
+                fields=JIRA_FIELDS,
+            )
+            return {issue.key: issue for issue in found}
+        except JIRAError as e:
+            logger.warning(
+                f"Search of {len(linked)} Jira issues failed, fetching them one by one: "
+                f"{e.status_code} {e.text}"
+            )
+
+        jira_issues = {}
+        for gh_issue_url, jira_key in linked.items():
+            budget.spend()
+            try:
+                jira_issues[jira_key] = jira.issue(jira_key, fields=JIRA_FIELDS)
+            except JIRAError as e:
+                if e.status_code == 404 and self._index is not None:
+                    self._index.delete(gh_issue_url)
+                logger.warning(
+                    f"Jira issue {jira_key} linked to {gh_issue_url} not fetched: "
+                    f"{e.status_code} {e.text}"
+                )
+        return jira_issues
+
+    @staticmethod
+    def _count(counter, totals: Counter, kinds: list[str]):
+        for kind in kinds:
+            totals[kind] += 1
+            if counter is not None:
+                counter.add(1, {"kind": kind})
+
+
+def iter_targets(budget: ApiBudget, repo_names: list[str] | None = None) -> Iterator[tuple]:
+    """Yield the GitHub client, repository and settings of the repositories to reconcile.
+
+    Args:
+        budget: API budget of the run, charged with the calls listing the repositories
+        repo_names: repositories (owner/name), all the repositories of all the installations
+            of the GitHub App if not given
+
+    """
+    from .main import config_cache
+    from .main import git_integration
+    from .main import github_client
+    from .main import settings_compiler
+    from .main import token_cache
+    from .repo_settings import SettingsError
+
+    def connect(installation_id: int) -> Github:
+        # the token may be minted
+        budget.spend()
+        return github_client(token_cache.get_token(installation_id), per_page=100)
+
+    def repos() -> Iterator[tuple[Github, Repository]]:
+        if repo_names:
+            for repo_name in repo_names:
+                owner, name = repo_name.split("/", 1)
+                budget.spend()
+                github = connect(git_integration.get_repo_installation(owner, name).id)
+                budget.spend()
+                yield github, github.get_repo(repo_name)
+        else:
+            installations = git_integration.get_installations()
+            for installation in budget.pages(installations, git_integration.requester.per_page):
+                github = connect(installation.id)
+                for repo in budget.pages(list_installation_repos(github), page_size=100):
+                    yield github, repo
+
+    for github, repo in repos():
+        # the config file may be fetched
+        budget.spend()
+        settings_content = config_cache.get(repo.full_name, repo)
+        if settings_content is None:
+            continue
+        try:
+            yield github, repo, settings_compiler.compile(settings_content, source=repo.full_name)
+        except SettingsError:
+            continue
+
+
+def run_all(
+    reconciler: Reconciler, repo_names: list[str] | None = None, **kwargs
+) -> ReconcileReport:
+    """Reconcile the repositories with a pooled Jira client, see `Reconciler.run`."""
+    from .main import jira_pool
+
+    budget = reconciler.api_budget(kwargs.pop("budget", None))
+    with jira_pool.client() as jira:
+        return reconciler.run(iter_targets(budget, repo_names), jira, budget=budget, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--repo",
+        dest="repos",
+        action="append",
+        help="repository (owner/name) to reconcile, can be repeated (default: all)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="only report the drift")
+    parser.add_argument("--budget", type=int, help="maximum number of API calls of the run")
+    args = parser.parse_args(argv)
+
+    from .main import reconciler
+
+    report = run_all(reconciler, args.repos, dry_run=args.dry_run, budget=args.budget)
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
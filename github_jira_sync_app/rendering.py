@@ -0,0 +1,250 @@
+"""Rendering of GitHub Markdown to Jira wiki markup."""
+
+import hashlib
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+logger = logging.getLogger("sync-bot-server")
+
+# Jira rejects descriptions and comments longer than 32767 characters
+DEFAULT_MAX_LENGTH = 28000
+
+TRUNCATION_NOTICE = (
+    "...\n Text exceeded Jira maximum length. Please see the original issue for details."
+)
+
+
+def truncate(text: str, max_length: int = DEFAULT_MAX_LENGTH) -> str:
+    """Truncate the text to `max_length` characters, followed by a notice."""
+    if len(text) > max_length:
+        return text[:max_length] + TRUNCATION_NOTICE
+    return text
+
+
+def _jira_renderer() -> Callable[[str], str]:
+    """Return a function rendering Markdown to Jira wiki markup.
+
+    mistletoe is imported on first use: compiling its grammar takes about a third of the
+    import time of the bot.
+    """
+    from mistletoe import Document  # type: ignore[import]
+    from mistletoe.contrib.jira_renderer import JIRARenderer  # type: ignore[import]
+
+    renderer = JIRARenderer()
+    return lambda text: renderer.render(Document(text))
+
+
+# renderer of the processes of the render pool
+_process_renderer: Callable[[str], str] | None = None
+
+
+def _render_in_process(text: str) -> str:
+    global _process_renderer
+    if _process_renderer is None:
+        _process_renderer = _jira_renderer()
+    return _process_renderer(text)
+
+
+class MarkdownRenderer:
+    """Render Markdown to Jira wiki markup, memoizing the results.
+
+    Inputs are truncated before being parsed, so a huge pasted log costs at most the
+    rendering of `max_*_length` characters. Results are cached by the SHA-256 of their
+    (truncated) input, in an LRU cache evicting entries past `cache_bytes`: the same
+    description is rendered again on every `edited` or `labeled` event of its issue.
+    Rendering is serialized, the mistletoe renderer keeps state while rendering. The renderer
+    is created on first use, or ahead of it with `warm_up`.
+
+    Rendering is pure-Python CPU work holding the GIL. With `pool_workers`, texts of at least
+    `pool_threshold` characters are rendered in a pool of processes instead, so that other
+    webhooks keep running meanwhile. Texts are only submitted to an idle process, and a render
+    running longer than `pool_timeout` seconds is given up: the raw text is sent, as
+    preformatted text, and is not cached. Its process cannot be interrupted, so the pool is
+    terminated, and started again on demand.
+
+    Args:
+        cache_bytes: approximate maximum memory used by the cached results, 0 disables it
+        max_description_length: maximum number of characters of a description to render
+        max_comment_length: maximum number of characters of a comment to render
+        pool_workers: number of render processes, 0 renders in the calling thread
+        pool_threshold: minimum number of characters of a text rendered in the pool
+        pool_timeout: seconds a render of the pool may run
+        meter: OpenTelemetry meter recording the render durations and pool usage, if any
+
+    """
+
+    def __init__(
+        self,
+        cache_bytes: int = 16 * 1024 * 1024,
+        max_description_length: int = DEFAULT_MAX_LENGTH,
+        max_comment_length: int = DEFAULT_MAX_LENGTH,
+        pool_workers: int = 0,
+        pool_threshold: int = 8192,
+        pool_timeout: float = 10,
+        meter=None,
+    ):
+        self._cache_bytes = cache_bytes
+        self._max_lengths = {
+            "description": max_description_length,
+            "comment": max_comment_length,
+        }
+        self._cache: OrderedDict[bytes, str] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._renderer: Callable[[str], str] | None = None
+
+        self._pool_workers = pool_workers
+        self._pool_threshold = pool_threshold
+        self._pool_timeout = pool_timeout
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+        self._pool_pending = 0
+        # one render per process: the timeout is not spent waiting behind other renders
+        self._pool_slots = threading.Semaphore(max(pool_workers, 1))
+
+        self._histogram = self._fallback_counter = None
+        if meter is not None:
+            self._instrument(meter)
+
+    def render_description(self, text: str) -> str:
+        return self._render(text, "description")
+
+    def render_comment(self, text: str) -> str:
+        return self._render(text, "comment")
+
+    def warm_up(self):
+        """Create the renderer, so that the first webhook does not wait for it."""
+        with self._render_lock:
+            if self._renderer is None:
+                self._renderer = _jira_renderer()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._size = 0
+
+    def close(self):
+        """Shut the render processes down, they are started again on demand."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _discard_pool(self, pool: ProcessPoolExecutor, terminate: bool = False):
+        """Stop using the pool, killing its processes with `terminate`."""
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        # processes are private to the pool, `terminate_workers` only exists from Python 3.14
+        processes = list((getattr(pool, "_processes", None) or {}).values()) if terminate else []
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def _render(self, text: str, kind: str) -> str:
+        start = time.perf_counter()
+        text = truncate(text, self._max_lengths[kind])
+        key = hashlib.sha256(text.encode("utf-8", "surrogatepass")).digest()
+
+        with self._lock:
+            rendered = self._cache.get(key)
+            if rendered is not None:
+                self._cache.move_to_end(key)
+
+        source = "cache"
+        if rendered is None:
+            if self._pool_workers and len(text) >= self._pool_threshold:
+                source = "pool"
+                rendered = self._render_in_pool(text)
+            else:
+                source = "thread"
+                with self._render_lock:
+                    if self._renderer is None:
+                        self._renderer = _jira_renderer()
+                    rendered = self._renderer(text)
+            if rendered is None:
+                source = "fallback"
+                rendered = f"{{noformat}}{text}{{noformat}}"
+            else:
+                self._store(key, rendered)
+
+        if self._histogram is not None:
+            self._histogram.record(time.perf_counter() - start, {"kind": kind, "source": source})
+        return rendered
+
+    def _render_in_pool(self, text: str) -> str | None:
+        """Render the text in the process pool, return None if it failed or timed out."""
+        with self._pool_lock:
+            self._pool_pending += 1
+        try:
+            with self._pool_slots:
+                with self._pool_lock:
+                    if self._pool is None:
+                        self._pool = ProcessPoolExecutor(
+                            self._pool_workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    pool = self._pool
+                future = pool.submit(_render_in_process, text)
+                try:
+                    return future.result(timeout=self._pool_timeout)
+                except FutureTimeoutError:
+                    logger.warning(
+                        f"Rendering {len(text)} characters timed out, sending raw text "
+                        "and restarting the render processes"
+                    )
+                    self._discard_pool(pool, terminate=True)
+                except BrokenProcessPool:
+                    logger.exception("Render process pool is broken, restarting it")
+                    self._discard_pool(pool)
+        finally:
+            with self._pool_lock:
+                self._pool_pending -= 1
+
+        if self._fallback_counter is not None:
+            self._fallback_counter.add(1)
+        return None
+
+    def _instrument(self, meter):
+        from opentelemetry.metrics import Observation
+
+        def utilization(_options):
+            # above 1 when renders are waiting for a process
+            if self._pool_workers:
+                yield Observation(self._pool_pending / self._pool_workers)
+
+        self._histogram = meter.create_histogram(
+            "syncbot_render_duration_seconds",
+            unit="s",
+            description="Duration of Markdown to Jira rendering",
+        )
+        meter.create_observable_gauge(
+            "syncbot_render_pool_utilization",
+            callbacks=[utilization],
+            description="Renders in progress or waiting per process of the render pool",
+        )
+        self._fallback_counter = meter.create_counter(
+            "syncbot_render_fallbacks_total",
+            description="Total number of texts sent raw because their render failed or timed out",
+        )
+
+    def _store(self, key: bytes, rendered: str):
+        size = sys.getsizeof(rendered)
+        if size > self._cache_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = rendered
+            self._size += size
+            while self._size > self._cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._size -= sys.getsizeof(evicted)
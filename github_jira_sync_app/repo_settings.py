@@ -0,0 +1,219 @@
+"""Compilation of `.jira_sync_config.yaml` files into immutable settings objects."""
+
+import copy
+import hashlib
+import logging
+import string
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+from typing import Iterable
+from typing import Mapping
+
+import yaml
+
+logger = logging.getLogger("sync-bot-server")
+
+
+class SettingsError(Exception):
+    """Raised when a repository config file cannot be turned into valid settings."""
+
+
+def merge_dicts(d1, d2):
+    """Merge the two dictionaries (d2 into d1) recursively.
+
+    If the key from d2 exists in d1, then skip (do not override).
+
+    Mutates d1
+    """
+    for key in d2:
+        if key in d1 and isinstance(d1[key], dict) and isinstance(d2[key], dict):
+            merge_dicts(d1[key], d2[key])
+        elif key not in d1:
+            d1[key] = d2[key]
+
+
+@dataclass(frozen=True)
+class RepoSettings:
+    """Validated settings of a repository, ready to be used for every webhook."""
+
+    jira_project_key: str
+    opened_status: str
+    closed_status: str
+    not_planned_status: str
+    # lower-cased labels allowed to be synced, empty if all issues are synced
+    labels: frozenset[str]
+    # lower-cased GitHub label -> Jira issue type, in the order of the config file
+    label_mapping: Mapping[str, str]
+    components: tuple[str, ...]
+    epic_key: str | None
+    # validated `summary` format string, None to use the GitHub issue title
+    summary: str | None
+    add_gh_comment: bool
+    add_gh_synced_label: bool
+    sync_description: bool
+    sync_comments: bool
+    sync_labels: bool
+    # problems that did not invalidate the settings, e.g. an invalid summary template
+    warnings: tuple[str, ...] = ()
+
+    def issue_type(self, labels: Iterable[str], default: str = "Bug") -> str:
+        """Return the Jira issue type mapped to the first matching lower-cased label."""
+        labels = set(labels)
+        for label, issue_type in self.label_mapping.items():
+            if label in labels:
+                return issue_type
+        return default
+
+
+def _validate_summary(summary: Any) -> str | None:
+    """Return the summary template if it can be formatted with an `issue`, raise otherwise."""
+    if not summary:
+        return None
+    if not isinstance(summary, str):
+        raise ValueError("summary must be a string")
+
+    for _, field_name, _, _ in string.Formatter().parse(summary):
+        if field_name is None:
+            continue
+        root = field_name.split(".", 1)[0].split("[", 1)[0]
+        if root != "issue":
+            raise ValueError(f"unknown field '{field_name}', only 'issue' is available")
+    return summary
+
+
+def _build(raw_settings: Any, defaults: dict) -> RepoSettings:
+    if not raw_settings:
+        raise SettingsError(".github/.jira_sync_config.yaml file is empty.")
+    if not isinstance(raw_settings, dict) or not isinstance(raw_settings.get("settings", {}), dict):
+        raise SettingsError(
+            ".github/.jira_sync_config.yaml file is invalid. Top level `settings` key is expected."
+        )
+
+    merge_dicts(raw_settings, copy.deepcopy(defaults))
+    settings = raw_settings["settings"]
+
+    if not settings.get("jira_project_key"):
+        raise SettingsError(
+            "Jira project key is not specified. Add `jira_project_key` key to the settings file."
+        )
+
+    status_mapping = settings.get("status_mapping")
+    if not status_mapping:
+        raise SettingsError(
+            "Status mapping is not specified. Add `status_mapping` key to the settings file."
+        )
+    if not isinstance(status_mapping, dict) or not all(
+        status_mapping.get(key) for key in ["opened", "closed"]
+    ):
+        raise SettingsError("Status mapping must specify both `opened` and `closed` statuses.")
+
+    labels = settings.get("labels") or []
+    if isinstance(labels, str):
+        labels = [labels]
+
+    label_mapping = settings.get("label_mapping") or {}
+    if not isinstance(label_mapping, dict):
+        raise SettingsError("Label mapping must be a dictionary of GitHub label to Jira type.")
+
+    warnings = []
+    try:
+        summary = _validate_summary(settings.get("summary"))
+    except ValueError as e:
+        summary = None
+        warnings.append(
+            f".github/.jira_sync_config.yaml has invalid summary field ({e}). "
+            "GitHub issue title is used instead."
+        )
+
+    closed_status = str(status_mapping["closed"])
+    return RepoSettings(
+        jira_project_key=str(settings["jira_project_key"]),
+        opened_status=str(status_mapping["opened"]),
+        closed_status=closed_status,
+        not_planned_status=str(status_mapping.get("not_planned") or closed_status),
+        labels=frozenset(str(label).lower() for label in labels),
+        label_mapping=MappingProxyType(
+            {str(label).lower(): str(issue_type) for label, issue_type in label_mapping.items()}
+        ),
+        components=tuple(str(component) for component in settings.get("components") or []),
+        epic_key=settings.get("epic_key") or None,
+        summary=summary,
+        add_gh_comment=bool(settings.get("add_gh_comment")),
+        add_gh_synced_label=bool(settings.get("add_gh_synced_label")),
+        sync_description=bool(settings.get("sync_description")),
+        sync_comments=bool(settings.get("sync_comments")),
+        sync_labels=bool(settings.get("sync_labels")),
+        warnings=tuple(warnings),
+    )
+
+
+class SettingsCompiler:
+    """Compile config files into `RepoSettings`, memoized by the hash of the file content.
+
+    Every distinct config file is parsed, merged with the defaults and validated only once;
+    validation problems are logged at that moment. Invalid files are memoized as well and
+    raise the same `SettingsError` on every call without being parsed again.
+
+    Args:
+        defaults: default settings merged into every config file
+        maxsize: maximum number of distinct config files to remember
+
+    """
+
+    def __init__(self, defaults: dict, maxsize: int = 1024):
+        self._defaults = defaults
+        self._maxsize = maxsize
+        self._compiled: OrderedDict[str, RepoSettings | SettingsError] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, content: bytes, source: str = "") -> RepoSettings:
+        """Return the settings of the config file content.
+
+        Args:
+            content: raw content of the config file
+            source: name of the repository the content comes from, used for logging
+
+        Raises:
+            SettingsError: if the config file is invalid
+
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            result = self._compiled.get(digest)
+            if result is not None:
+                self._compiled.move_to_end(digest)
+
+        if result is None:
+            result = self._compile(content, source)
+            with self._lock:
+                self._compiled[digest] = result
+                if len(self._compiled) > self._maxsize:
+                    self._compiled.popitem(last=False)
+
+        if isinstance(result, SettingsError):
+            # raise a fresh instance, re-raising the memoized one would grow its traceback
+            raise SettingsError(str(result))
+        return result
+
+    def clear(self):
+        """Forget all compiled settings."""
+        with self._lock:
+            self._compiled.clear()
+
+    def _compile(self, content: bytes, source: str) -> RepoSettings | SettingsError:
+        try:
+            settings = _build(yaml.safe_load(content), self._defaults)
+        except yaml.YAMLError:
+            error = SettingsError(".github/.jira_sync_config.yaml file is invalid. Check syntax.")
+            logger.error(f"{source}: {error}")
+            return error
+        except SettingsError as error:
+            logger.warning(f"{source}: {error}")
+            return error
+
+        for warning in settings.warnings:
+            logger.warning(f"{source}: {warning}")
+        return settings
@@ -0,0 +1,346 @@
+"""Durable local queue of webhooks, drained by worker threads.
+
+Usage:
+    python -m github_jira_sync_app.webhook_queue --requeue-dead
+
+Dead webhooks (given up after too many attempts) are queued again, to be processed by the
+server. Uses the same `WEBHOOK_QUEUE_PATH` environment variable as the server.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable
+from typing import NamedTuple
+
+logger = logging.getLogger("sync-bot-server")
+
+
+class QueuedWebhook(NamedTuple):
+    id: int
+    delivery_id: str | None
+    event: str
+    body: bytes
+    attempts: int
+    enqueued_at: float
+
+
+class WebhookQueue:
+    """Webhooks stored in a local SQLite database (WAL mode) until they are processed.
+
+    A webhook is committed to disk before GitHub is answered, so it survives a restart.
+    Workers lease the webhook they process: if the process dies while processing it, the
+    webhook is handed out again once the lease expired. The same delivery (`X-GitHub-Delivery`)
+    is queued only once, so redeliveries of a pending webhook are ignored.
+
+    Webhooks with the same lane (GitHub issue) are handed out one at a time, in queue order,
+    so the events of an issue are never processed concurrently nor reordered by a retry.
+
+    Args:
+        path: path of the database file, ":memory:" for a non-persistent queue
+
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=FULL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS webhook_queue ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "delivery_id TEXT UNIQUE, "
+                "lane TEXT, "
+                "event TEXT NOT NULL, "
+                "body BLOB NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "enqueued_at REAL NOT NULL, "
+                "available_at REAL NOT NULL, "
+                "leased_until REAL, "
+                "dead INTEGER NOT NULL DEFAULT 0, "
+                "last_error TEXT)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS webhook_queue_available "
+                "ON webhook_queue (dead, available_at)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS webhook_queue_lane ON webhook_queue (lane, id)"
+            )
+
+    def put(
+        self, body: bytes, delivery_id: str | None, event: str, lane: str | None = None
+    ) -> bool:
+        """Store the webhook, return False if the delivery is already queued."""
+        now = time.time()
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO webhook_queue "
+                "(delivery_id, lane, event, body, enqueued_at, available_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (delivery_id, lane, event, body, now, now),
+            )
+        return cursor.rowcount == 1
+
+    def claim(self, lease: float) -> QueuedWebhook | None:
+        """Lease the oldest webhook ready to be processed for `lease` seconds, if any.
+
+        Only the first webhook of a lane can be handed out, the next ones wait for it to be
+        completed (or buried) even while it waits for a retry.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "UPDATE webhook_queue SET leased_until = ? WHERE id = ("
+                "SELECT id FROM webhook_queue AS w WHERE dead = 0 AND available_at <= ? "
+                "AND (leased_until IS NULL OR leased_until <= ?) "
+                "AND (lane IS NULL OR id = ("
+                "SELECT MIN(id) FROM webhook_queue WHERE lane = w.lane AND dead = 0)) "
+                "ORDER BY id LIMIT 1) "
+                "RETURNING id, delivery_id, event, body, attempts, enqueued_at",
+                (now + lease, now, now),
+            ).fetchone()
+        return QueuedWebhook(*row) if row else None
+
+    def complete(self, webhook_id: int):
+        """Remove the processed webhook."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM webhook_queue WHERE id = ?", (webhook_id,))
+
+    def retry(self, webhook_id: int, delay: float, error: str):
+        """Release the webhook, to be processed again in `delay` seconds."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE webhook_queue SET attempts = attempts + 1, available_at = ?, "
+                "leased_until = NULL, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, webhook_id),
+            )
+
+    def defer(self, webhook_id: int, delay: float, error: str):
+        """Release the webhook, to be processed again in `delay` seconds without an attempt."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE webhook_queue SET available_at = ?, leased_until = NULL, last_error = ? "
+                "WHERE id = ?",
+                (time.time() + delay, error, webhook_id),
+            )
+
+    def bury(self, webhook_id: int, error: str):
+        """Keep the webhook for inspection, without processing it again."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE webhook_queue SET attempts = attempts + 1, dead = 1, "
+                "leased_until = NULL, last_error = ? WHERE id = ?",
+                (error, webhook_id),
+            )
+
+    def requeue_dead(self) -> int:
+        """Queue the dead webhooks again with their attempts reset, return their number.
+
+        They keep their place in their lane, ahead of the webhooks queued after them.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "UPDATE webhook_queue SET dead = 0, attempts = 0, available_at = ?, "
+                "leased_until = NULL WHERE dead = 1",
+                (time.time(),),
+            )
+        return cursor.rowcount
+
+    def stats(self) -> tuple[int, float | None]:
+        """Return the number of webhooks to process and the enqueue time of the oldest one."""
+        with self._lock:
+            depth, oldest = self._connection.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM webhook_queue WHERE dead = 0"
+            ).fetchone()
+        return depth, oldest
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class QueueWorkers:
+    """Threads processing the queued webhooks, retrying failures with exponential backoff.
+
+    A failed webhook is retried after ``retry_delay * 2 ** attempt`` seconds (with jitter,
+    capped at ``max_retry_delay``). After ``max_attempts`` failures it is kept in the queue
+    as dead, for inspection. A webhook failing with one of ``deferred_errors`` (e.g. while a
+    backend is down) is retried after their ``retry_after`` seconds, without counting an attempt.
+
+    Args:
+        queue: queue to drain
+        handler: callable processing a webhook, raising an exception if it must be retried
+        workers: number of worker threads
+        max_attempts: number of attempts before a webhook is given up
+        retry_delay: seconds before the first retry
+        max_retry_delay: maximum seconds between two attempts
+        lease: seconds a webhook is reserved for the worker processing it
+        poll_interval: seconds between two checks for retries when the queue is idle
+        meter: OpenTelemetry meter exporting the queue metrics, if any
+        deferred_errors: exceptions, with a ``retry_after`` attribute, not counted as failures
+
+    """
+
+    def __init__(
+        self,
+        queue: WebhookQueue,
+        handler: Callable[[QueuedWebhook], object],
+        workers: int,
+        max_attempts: int = 8,
+        retry_delay: float = 5,
+        max_retry_delay: float = 600,
+        lease: float = 300,
+        poll_interval: float = 1,
+        meter=None,
+        deferred_errors: tuple[type[Exception], ...] = (),
+    ):
+        self._queue = queue
+        self._handler = handler
+        self._workers = workers
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._max_retry_delay = max_retry_delay
+        self._lease = lease
+        self._poll_interval = poll_interval
+        self._deferred_errors = deferred_errors
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+        self._retries_counter = self._dead_counter = None
+        if meter is not None:
+            self._instrument(meter)
+
+    def start(self):
+        self._stopping.clear()
+        for number in range(self._workers):
+            thread = threading.Thread(
+                target=self._run, name=f"webhook-worker-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 30):
+        """Stop the workers, waiting up to `timeout` seconds for the webhooks in progress."""
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
+
+    def notify(self):
+        """Wake up the idle workers, e.g. after a webhook was queued."""
+        self._wakeup.set()
+
+    def process_one(self) -> bool:
+        """Process the next webhook ready to be processed, return False if there is none."""
+        webhook = self._queue.claim(self._lease)
+        if webhook is None:
+            return False
+
+        try:
+            self._handler(webhook)
+        except self._deferred_errors as e:
+            delay = getattr(e, "retry_after")
+            logger.warning(f"Webhook {webhook.delivery_id} deferred for {delay}s: {e!r}")
+            self._queue.defer(webhook.id, delay, repr(e))
+        except Exception as e:
+            self._failed(webhook, e)
+        else:
+            self._queue.complete(webhook.id)
+        return True
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_one()
+            except Exception:
+                logger.exception("Webhook queue worker failed")
+                processed = False
+            if not processed:
+                self._wakeup.wait(self._poll_interval)
+                self._wakeup.clear()
+
+    def _failed(self, webhook: QueuedWebhook, error: Exception):
+        attempt = webhook.attempts + 1
+        if attempt >= self._max_attempts:
+            logger.error(
+                f"Webhook {webhook.delivery_id} failed {attempt} times, giving up: {error!r}"
+            )
+            self._queue.bury(webhook.id, repr(error))
+            if self._dead_counter is not None:
+                self._dead_counter.add(1)
+            return
+
+        delay = min(self._retry_delay * 2**webhook.attempts, self._max_retry_delay)
+        delay *= random.uniform(0.5, 1)
+        logger.warning(
+            f"Webhook {webhook.delivery_id} failed (attempt {attempt}), "
+            f"retrying in {delay:.0f}s: {error!r}"
+        )
+        self._queue.retry(webhook.id, delay, repr(error))
+        if self._retries_counter is not None:
+            self._retries_counter.add(1)
+
+    def _instrument(self, meter):
+        from opentelemetry.metrics import Observation
+
+        def depth(_options):
+            yield Observation(self._queue.stats()[0])
+
+        def oldest_age(_options):
+            oldest = self._queue.stats()[1]
+            yield Observation(time.time() - oldest if oldest else 0)
+
+        meter.create_observable_gauge(
+            "syncbot_queue_depth",
+            callbacks=[depth],
+            description="Number of queued webhooks waiting to be processed",
+        )
+        meter.create_observable_gauge(
+            "syncbot_queue_oldest_age_seconds",
+            callbacks=[oldest_age],
+            unit="s",
+            description="Age of the oldest queued webhook",
+        )
+        self._retries_counter = meter.create_counter(
+            "syncbot_queue_retries_total", description="Total number of retried webhooks"
+        )
+        self._dead_counter = meter.create_counter(
+            "syncbot_queue_dead_total",
+            description="Total number of webhooks given up after too many failures",
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--requeue-dead",
+        action="store_true",
+        required=True,
+        help="queue the dead webhooks again, with their attempts reset",
+    )
+    parser.add_argument(
+        "--path",
+        default=os.getenv("WEBHOOK_QUEUE_PATH", "webhook_queue.sqlite3"),
+        help="SQLite database of the webhook queue",
+    )
+    args = parser.parse_args(argv)
+
+    queue = WebhookQueue(args.path)
+    try:
+        print(f"{queue.requeue_dead()} dead webhooks queued again")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.instrumentation.redis import RedisInstrumentor
+from opentelemetry.instrumentation.requests import RequestsInstrumentor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from starlette.testclient import TestClient
+
+from github_jira_sync_app.instrumentation.stages import StageTimer
+from github_jira_sync_app.instrumentation.tracing import setup_tracing
+
+
+def test_tracing_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("OTEL_TRACES_EXPORTER", raising=False)
+    assert setup_tracing(FastAPI()) is None
+
+
+def test_delivery_spans(monkeypatch):
+    monkeypatch.setenv("OTEL_TRACES_EXPORTER", "console")
+    exporter = InMemorySpanExporter()
+    app = FastAPI()
+    timer = StageTimer()
+
+    @app.post("/")
+    async def bot():
+        with timer.delivery("delivery-1"):
+            with timer.stage("config"):
+                pass
+        return {"msg": "ok"}
+
+    with patch("github_jira_sync_app.instrumentation.tracing._span_exporter") as span_exporter:
+        span_exporter.return_value = exporter
+        provider = setup_tracing(app)
+    try:
+        TestClient(app).post(
+            "/", headers={"X-GitHub-Delivery": "delivery-1", "X-GitHub-Event": "issues"}
+        )
+        provider.force_flush()
+    finally:
+        for instrumentor in [RequestsInstrumentor, HTTPXClientInstrumentor, RedisInstrumentor]:
+            instrumentor().uninstrument()
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    root = spans["POST /"]
+    assert root.parent is None
+    assert root.attributes["github.delivery"] == "delivery-1"
+    assert root.attributes["github.event"] == "issues"
+    assert spans["webhook"].parent.span_id == root.context.span_id
+    assert spans["config"].parent.span_id == spans["webhook"].context.span_id
@@ -1,10 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
+import httpx
 import pytest
 import yaml
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test with empty application caches, so mocks do not leak between tests."""
+    from github_jira_sync_app import main
+
+    main.token_cache.clear()
+    main.installation_resolver.clear()
+    main.config_cache.clear()
+    main.settings_compiler.clear()
+    if main.issue_index:
+        main.issue_index.clear()
+    main.jira_pool.clear()
+    main.jira_metadata.clear()
+    main.async_token_cache.clear()
+    main.issue_lanes.clear()
+    main.event_coalescer.clear()
+    main.markdown_renderer.clear()
+    main.stage_timer.clear()
+    main.outbound_limits.clear()
+    main.circuit_breakers.clear()
+    yield
+
+
 @pytest.fixture(scope="session")
 def signature_mock(request):
     """Bypass webhook signature verification while asserting it was called."""
@@ -63,6 +92,7 @@ def mock_github():
         # GithubIntegration: get_access_token -> token object
         token = MagicMock()
         token.token = "ghs_fake_token"
+        token.expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
         mock_integration.get_access_token.return_value = token
 
         # Github client
@@ -138,3 +168,124 @@ def mock_jira():
         ctx.set_existing_issues = set_existing_issues
 
         yield ctx
+
+
+@pytest.fixture()
+def mock_async_backends():
+    """Switch to the async execution mode, with GitHub and Jira served by fake transports.
+
+    Returns a context object with:
+      - requests: list of (method, path, json body) received by both fake services
+      - set_config(settings_dict): sets the repo config YAML served by GitHub
+      - existing_issues: raw Jira issues returned by JQL searches and issue lookups
+      - transitions: transitions available to every Jira issue
+      - components: components of every Jira project
+    """
+    from github_jira_sync_app.async_clients import AsyncGithubClient
+    from github_jira_sync_app.async_clients import AsyncJiraClient
+
+    ctx = MagicMock()
+    ctx.requests = []
+    ctx.existing_issues = []
+    ctx.transitions = [{"id": "11", "name": "To Do"}, {"id": "31", "name": "Done"}]
+    ctx.components = []
+
+    def set_config(settings_dict=None):
+        content = yaml.dump(settings_dict or _default_settings()).encode()
+        ctx.config = {"content": base64.b64encode(content).decode(), "sha": str(hash(content))}
+
+    ctx.set_config = set_config
+    set_config()
+
+    def github(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/access_tokens"):
+            expires_at = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+            return httpx.Response(201, json={"token": "ghs_async", "expires_at": expires_at})
+        if "/contents/" in path:
+            etag = f'"{ctx.config["sha"]}"'
+            if request.headers.get("If-None-Match") == etag:
+                return httpx.Response(304)
+            return httpx.Response(200, json=ctx.config, headers={"ETag": etag})
+        return httpx.Response(201, json={})
+
+    def jira(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.endswith("/search/jql"):
+            return httpx.Response(200, json={"issues": ctx.existing_issues})
+        if path.endswith("/components"):
+            return httpx.Response(200, json=ctx.components)
+        if path.endswith("/transitions") and request.method == "GET":
+            return httpx.Response(200, json={"transitions": ctx.transitions})
+        if path.endswith("/rest/api/2/issue") and request.method == "POST":
+            return httpx.Response(201, json={"id": "10001", "key": "TEST-1"})
+        if "/rest/api/2/issue/" in path and request.method == "GET":
+            key = path.rsplit("/", 1)[1]
+            for issue in ctx.existing_issues:
+                if issue["key"] == key:
+                    return httpx.Response(200, json=issue)
+            return httpx.Response(404, json={"errorMessages": ["Issue does not exist"]})
+        return httpx.Response(204 if request.method == "PUT" else 201)
+
+    def recorded(handler):
+        def handle(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content) if request.content else None
+            ctx.requests.append((request.method, request.url.path, body))
+            return handler(request)
+
+        return httpx.MockTransport(handle)
+
+    github_client = AsyncGithubClient(
+        httpx.AsyncClient(base_url="https://api.github.com", transport=recorded(github)),
+        lambda: "jwt",
+    )
+    jira_client = AsyncJiraClient(
+        httpx.AsyncClient(base_url="https://my-jira.atlassian.net", transport=recorded(jira)),
+        lambda: ("user", "token"),
+    )
+
+    def paths(method):
+        return [path for m, path, _ in ctx.requests if m == method]
+
+    ctx.paths = paths
+
+    with (
+        patch("github_jira_sync_app.main.webhook_execution_mode", "async"),
+        patch("github_jira_sync_app.main._async_github", github_client),
+        patch("github_jira_sync_app.main._async_jira", jira_client),
+    ):
+        yield ctx
+
+
+def jira_issue_json(key="TEST-99", labels=(), components=(), status="To Do"):
+    """Raw Jira issue, as returned by the Jira REST API."""
+    return {
+        "id": "10099",
+        "key": key,
+        "fields": {
+            "labels": list(labels),
+            "components": [{"name": name} for name in components],
+            "issuetype": {"name": "Bug"},
+            "status": {"name": status},
+        },
+    }
+
+
+@pytest.fixture()
+def mock_webhook_queue():
+    """Switch the bot to the queue acknowledgement mode, with an in-memory queue.
+
+    The workers are not started: tests drain the queue with `workers.process_one()`.
+    """
+    from github_jira_sync_app import main
+    from github_jira_sync_app.webhook_queue import QueueWorkers
+    from github_jira_sync_app.webhook_queue import WebhookQueue
+
+    queue = WebhookQueue(":memory:")
+    workers = QueueWorkers(queue, main._process_queued_webhook, workers=1, retry_delay=0)
+    with (
+        patch("github_jira_sync_app.main.webhook_queue", queue),
+        patch("github_jira_sync_app.main.queue_workers", workers),
+    ):
+        yield workers
+    queue.close()
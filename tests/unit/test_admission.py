@@ -0,0 +1,68 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import anyio
+import pytest
+
+from github_jira_sync_app.admission import AdmissionController
+from github_jira_sync_app.admission import Overloaded
+
+
+async def _hold(admission, limiter, seconds, results):
+    try:
+        async with admission.admit(limiter):
+            await asyncio.sleep(seconds)
+        results.append("done")
+    except Overloaded as e:
+        results.append(e.reason)
+
+
+class TestAdmissionController:
+    def test_unlimited(self):
+        async def run():
+            admission = AdmissionController()
+            limiter = anyio.CapacityLimiter(1)
+            results = []
+            await asyncio.gather(*[_hold(admission, limiter, 0.01, results) for _ in range(5)])
+            return results
+
+        assert asyncio.run(run()) == ["done"] * 5
+
+    def test_max_waiting(self):
+        async def run():
+            meter = MagicMock()
+            admission = AdmissionController(max_waiting=1, retry_after=7, meter=meter)
+            limiter = anyio.CapacityLimiter(1)
+            results = []
+            await asyncio.gather(*[_hold(admission, limiter, 0.05, results) for _ in range(4)])
+            counter = meter.create_counter.return_value
+            return results, counter.add.call_args_list
+
+        results, rejections = asyncio.run(run())
+        # one in flight, one waiting, two rejected right away
+        assert results == ["queue_full", "queue_full", "done", "done"]
+        assert [call.args for call in rejections] == [(1, {"reason": "queue_full"})] * 2
+
+    def test_max_wait(self):
+        async def run():
+            admission = AdmissionController(max_wait=0.02)
+            limiter = anyio.CapacityLimiter(1)
+            results = []
+            await asyncio.gather(*[_hold(admission, limiter, 0.1, results) for _ in range(2)])
+            return results, admission, limiter
+
+        results, admission, limiter = asyncio.run(run())
+        assert results == ["wait_timeout", "done"]
+        assert (admission.in_flight, admission.waiting) == (0, 0)
+        assert limiter.borrowed_tokens == 0
+
+    def test_error_releases_token(self):
+        async def run():
+            admission = AdmissionController()
+            limiter = anyio.CapacityLimiter(1)
+            with pytest.raises(ValueError):
+                async with admission.admit(limiter):
+                    raise ValueError
+            return limiter.borrowed_tokens, admission.in_flight
+
+        assert asyncio.run(run()) == (0, 0)
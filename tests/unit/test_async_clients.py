@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from jira import JIRAError
+
+from github_jira_sync_app.async_clients import AsyncGithubClient
+from github_jira_sync_app.async_clients import AsyncJiraClient
+
+
+def _jira(handler):
+    requests = []
+
+    def handle(request):
+        requests.append(request)
+        return handler(request)
+
+    http = httpx.AsyncClient(
+        base_url="https://my-jira.atlassian.net", transport=httpx.MockTransport(handle)
+    )
+    return AsyncJiraClient(http, lambda: ("user", "token")), requests
+
+
+class TestAsyncJiraClient:
+    def test_search_returns_issue_resources(self):
+        issue = {"key": "TEST-1", "fields": {"labels": ["bug"], "status": {"name": "Done"}}}
+        jira, requests = _jira(lambda request: httpx.Response(200, json={"issues": [issue]}))
+
+        issues = asyncio.run(jira.enhanced_search_issues('project="TEST"'))
+
+        assert issues[0].key == "TEST-1"
+        assert issues[0].fields.labels == ["bug"]
+        assert issues[0].fields.status.name == "Done"
+        assert issues[0].permalink() == "https://my-jira.atlassian.net/browse/TEST-1"
+        assert json.loads(requests[0].content)["jql"] == 'project="TEST"'
+        assert requests[0].headers["Authorization"].startswith("Basic ")
+
+    def test_error_raises_jira_error(self):
+        jira, _ = _jira(lambda request: httpx.Response(404, text="Issue does not exist"))
+
+        with pytest.raises(JIRAError) as error:
+            asyncio.run(jira.issue("TEST-1"))
+        assert error.value.status_code == 404
+
+    def test_transition_by_name(self):
+        def handler(request):
+            if request.method == "GET":
+                return httpx.Response(200, json={"transitions": [{"id": "31", "name": "Done"}]})
+            return httpx.Response(204)
+
+        jira, requests = _jira(handler)
+        issue = jira._issue({"key": "TEST-1"})
+
+        asyncio.run(jira.transition_issue(issue, "done"))
+
+        assert json.loads(requests[-1].content) == {"transition": {"id": "31"}}
+
+    def test_unknown_transition_name(self):
+        jira, _ = _jira(lambda request: httpx.Response(200, json={"transitions": []}))
+
+        with pytest.raises(JIRAError):
+            asyncio.run(jira.transition_issue(jira._issue({"key": "TEST-1"}), "Done"))
+
+
+class TestAsyncGithubClient:
+    def test_access_token_requested_with_jwt(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            data = {"token": "ghs_1", "expires_at": "2030-01-01T00:00:00Z"}
+            return httpx.Response(201, json=data)
+
+        http = httpx.AsyncClient(
+            base_url="https://api.github.com", transport=httpx.MockTransport(handler)
+        )
+        github = AsyncGithubClient(http, lambda: "jwt")
+
+        authorization = asyncio.run(github.get_access_token(42))
+
+        assert authorization.token == "ghs_1"
+        assert authorization.expires_at.year == 2030
+        assert requests[0].url.path == "/app/installations/42/access_tokens"
+        assert requests[0].headers["Authorization"] == "Bearer jwt"
@@ -0,0 +1,231 @@
+import json
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import yaml
+
+from github_jira_sync_app.backfill import Checkpoint
+from github_jira_sync_app.backfill import backfill_repo
+from github_jira_sync_app.backfill import find_linked_issues
+from github_jira_sync_app.backfill import wait_for_rate_limit
+from github_jira_sync_app.issue_index import SQLiteIssueIndex
+
+REPO_URL = "https://github.com/octo/repo"
+
+
+def _url(number):
+    return f"{REPO_URL}/issues/{number}"
+
+
+def _settings(**overrides):
+    from github_jira_sync_app.main import settings_compiler
+    from tests.unit.conftest import _default_settings
+
+    return settings_compiler.compile(yaml.safe_dump(_default_settings(**overrides)).encode())
+
+
+def _gh_issue(number, labels=("bug",), pull_request=False):
+    raw = {
+        "number": number,
+        "url": f"https://api.github.com/repos/octo/repo/issues/{number}",
+        "html_url": _url(number),
+        "title": f"Issue {number}",
+        "body": f"Body of **{number}**",
+        "user": {"login": "octocat"},
+        "labels": [{"name": label} for label in labels],
+    }
+    if pull_request:
+        raw["pull_request"] = {}
+    return MagicMock(number=number, raw_data=raw)
+
+
+def _jira_search_result(*links):
+    return {
+        "issues": [
+            {
+                "key": key,
+                "fields": {"description": f"This issue was created from GitHub Issue {url}\n"},
+            }
+            for url, key in links
+        ]
+    }
+
+
+def _created(*keys):
+    results = []
+    for key in keys:
+        issue = MagicMock(key=key)
+        issue.permalink.return_value = f"https://jira/browse/{key}"
+        results.append({"status": "Success", "issue": issue, "error": None})
+    return results
+
+
+def _repo(*issues):
+    repo = MagicMock(full_name="octo/repo", raw_data={"name": "repo", "full_name": "octo/repo"})
+    repo.get_issues.return_value = list(issues)
+    return repo
+
+
+def _github():
+    github = MagicMock()
+    github.rate_limiting = (5000, 5000)
+    return github
+
+
+class TestFindLinkedIssues:
+    def test_index_then_single_search(self):
+        index = SQLiteIssueIndex(":memory:")
+        index.set(_url(1), "TEST-1")
+        jira = MagicMock()
+        # the text search is fuzzy, issues/10 matches the search of issues/1
+        jira.enhanced_search_issues.return_value = _jira_search_result(
+            (_url(2), "TEST-2"), (_url(10), "TEST-10")
+        )
+
+        linked = find_linked_issues(jira, index, "TEST", [_url(1), _url(2), _url(3)])
+        assert linked == {_url(1): "TEST-1", _url(2): "TEST-2"}
+        jira.enhanced_search_issues.assert_called_once()
+        jql = jira.enhanced_search_issues.call_args.args[0]
+        assert _url(2) in jql and _url(3) in jql and _url(1) not in jql
+        assert index.get(_url(2)) == "TEST-2"
+
+    def test_every_search_page_reported(self):
+        jira = MagicMock()
+        jira.enhanced_search_issues.side_effect = [
+            dict(_jira_search_result((_url(1), "TEST-1")), nextPageToken="next"),
+            _jira_search_result((_url(2), "TEST-2")),
+        ]
+        on_search = MagicMock()
+
+        linked = find_linked_issues(jira, None, "TEST", [_url(1), _url(2)], on_search=on_search)
+        assert linked == {_url(1): "TEST-1", _url(2): "TEST-2"}
+        assert on_search.call_count == 2
+
+    def test_all_indexed(self):
+        index = SQLiteIssueIndex(":memory:")
+        index.set(_url(1), "TEST-1")
+        jira = MagicMock()
+        assert find_linked_issues(jira, index, "TEST", [_url(1)]) == {_url(1): "TEST-1"}
+        jira.enhanced_search_issues.assert_not_called()
+
+
+class TestBackfillRepo:
+    def test_missing_issues_created_in_bulk(self):
+        index = SQLiteIssueIndex(":memory:")
+        index.set(_url(2), "TEST-2")
+        repo = _repo(
+            _gh_issue(1),
+            _gh_issue(2),
+            _gh_issue(3, pull_request=True),
+            _gh_issue(4, labels=["question"]),
+            _gh_issue(5),
+        )
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        jira.create_issues.return_value = _created("TEST-11", "TEST-15")
+        checkpoint = Checkpoint(None)
+
+        report = backfill_repo(_github(), repo, jira, _settings(), index, checkpoint)
+
+        assert (report.listed, report.not_labeled, report.linked) == (4, 1, 1)
+        assert report.created == [_url(1), _url(5)]
+        fields = jira.create_issues.call_args.args[0]
+        assert [f["summary"] for f in fields] == ["Issue 1", "Issue 5"]
+        assert "Body of *1*" in fields[0]["description"]
+        assert index.get(_url(5)) == "TEST-15"
+        assert checkpoint.is_done("octo/repo")
+        assert checkpoint.last_number("octo/repo") == 5
+
+    def test_batches(self):
+        repo = _repo(*[_gh_issue(n) for n in range(1, 6)])
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        jira.create_issues.side_effect = lambda fields, prefetch: _created(*["K-1"] * len(fields))
+
+        report = backfill_repo(_github(), repo, jira, _settings(), None, Checkpoint(None), 2)
+        assert [len(c.args[0]) for c in jira.create_issues.call_args_list] == [2, 2, 1]
+        assert len(report.created) == 5
+
+    def test_dry_run(self):
+        repo = _repo(_gh_issue(1), _gh_issue(2))
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = _jira_search_result((_url(1), "TEST-1"))
+        checkpoint = Checkpoint(None)
+
+        report = backfill_repo(_github(), repo, jira, _settings(), None, checkpoint, dry_run=True)
+        assert report.created == [_url(2)]
+        assert report.linked == 1
+        jira.create_issues.assert_not_called()
+        assert not checkpoint.is_done("octo/repo")
+
+    def test_resumed_from_checkpoint(self, tmp_path):
+        path = str(tmp_path / "checkpoint.json")
+        Checkpoint(path).save("octo/repo", 2)
+        repo = _repo(_gh_issue(1), _gh_issue(2), _gh_issue(3))
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        jira.create_issues.return_value = _created("TEST-3")
+
+        report = backfill_repo(_github(), repo, jira, _settings(), None, Checkpoint(path))
+        assert report.created == [_url(3)]
+        assert json.loads(open(path).read()) == {"octo/repo": {"last_number": 3, "done": True}}
+
+    def test_failed_creation_reported(self):
+        repo = _repo(_gh_issue(1), _gh_issue(2))
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        error = {"status": "Error", "issue": None, "error": {"summary": "too long"}}
+        jira.create_issues.return_value = [error] + _created("TEST-2")
+
+        report = backfill_repo(_github(), repo, jira, _settings(), None, Checkpoint(None))
+        assert report.failed == [_url(1)]
+        assert report.created == [_url(2)]
+
+    def test_failed_creation_retried_on_resume(self, tmp_path):
+        path = str(tmp_path / "checkpoint.json")
+        repo = _repo(_gh_issue(1), _gh_issue(2))
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        error = {"status": "Error", "issue": None, "error": {"summary": "too long"}}
+        jira.create_issues.return_value = [error] + _created("TEST-2")
+        backfill_repo(_github(), repo, jira, _settings(), None, Checkpoint(path))
+        assert json.loads(open(path).read()) == {
+            "octo/repo": {"last_number": 2, "done": False, "failed": [1]}
+        }
+
+        jira.create_issues.return_value = _created("TEST-1")
+        report = backfill_repo(_github(), repo, jira, _settings(), None, Checkpoint(path))
+
+        assert report.created == [_url(1)]
+        assert json.loads(open(path).read()) == {"octo/repo": {"last_number": 2, "done": True}}
+
+    def test_github_updated_only_on_request(self):
+        repo = _repo(_gh_issue(1))
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        jira.create_issues.return_value = _created("TEST-1")
+        settings = _settings(add_gh_comment=True)
+
+        with patch("github_jira_sync_app.backfill.Issue.create_comment") as create_comment:
+            backfill_repo(_github(), repo, jira, settings, None, Checkpoint(None))
+            create_comment.assert_not_called()
+            repo.get_issues.return_value = [_gh_issue(2)]
+            backfill_repo(
+                _github(), repo, jira, settings, None, Checkpoint(None), update_github=True
+            )
+        create_comment.assert_called_once()
+        assert "https://jira/browse/TEST-1" in create_comment.call_args.args[0]
+
+
+class TestRateLimit:
+    def test_waits_for_reset(self):
+        github = MagicMock(rate_limiting=(10, 5000), rate_limiting_resettime=1030)
+        with (
+            patch("github_jira_sync_app.backfill.time.time", return_value=1000),
+            patch("github_jira_sync_app.backfill.time.sleep") as sleep,
+        ):
+            wait_for_rate_limit(github, min_remaining=100)
+            sleep.assert_called_once_with(31)
+            sleep.reset_mock()
+            wait_for_rate_limit(github, min_remaining=5)
+            sleep.assert_not_called()
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+import requests
+from jira import JIRAError
+
+from github_jira_sync_app.async_clients import AsyncJiraClient
+from github_jira_sync_app.circuit_breaker import CLOSED
+from github_jira_sync_app.circuit_breaker import HALF_OPEN
+from github_jira_sync_app.circuit_breaker import OPEN
+from github_jira_sync_app.circuit_breaker import CircuitBreaker
+from github_jira_sync_app.circuit_breaker import CircuitBreakers
+from github_jira_sync_app.circuit_breaker import CircuitOpen
+from github_jira_sync_app.rate_limits import RateLimited
+
+
+def _call(breaker, status=200):
+    with breaker.call() as call:
+        call.observe(status, {})
+
+
+def _fail(breaker, error):
+    with pytest.raises(type(error)):
+        with breaker.call():
+            raise error
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("jira", failure_threshold=3, reset_timeout=60)
+        _call(breaker, 503)
+        _call(breaker, 502)
+        _call(breaker, 200)
+        _call(breaker, 500)
+        _fail(breaker, requests.ConnectionError())
+        assert breaker.state == CLOSED
+
+        _fail(breaker, requests.Timeout())
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpen) as error:
+            breaker.check()
+        assert error.value.backend == "jira"
+        assert 59 <= error.value.retry_after <= 60
+        with pytest.raises(CircuitOpen):
+            _call(breaker)
+
+    def test_client_errors_are_not_failures(self):
+        breaker = CircuitBreaker("jira", failure_threshold=1)
+        _call(breaker, 404)
+        _call(breaker, 429)
+        _fail(breaker, JIRAError("Not found", status_code=404))
+        _fail(breaker, ValueError())
+
+        assert breaker.state == CLOSED
+
+    def test_limiter_rejections_do_not_reset_failures(self):
+        breaker = CircuitBreaker("jira", failure_threshold=3)
+        for _ in range(2):
+            _call(breaker, 503)
+            # raised by the limiter before the request is sent
+            _fail(breaker, RateLimited("jira", 1))
+        assert breaker.state == CLOSED
+
+        _call(breaker, 503)
+        assert breaker.state == OPEN
+
+    def test_half_open_probe_closes(self):
+        breaker = CircuitBreaker("jira", failure_threshold=1, reset_timeout=0.05)
+        _fail(breaker, JIRAError("Unavailable", status_code=503))
+        time.sleep(0.05)
+        breaker.check()
+
+        with breaker.call() as probe:
+            assert breaker.state == HALF_OPEN
+            # a single probe at a time
+            with pytest.raises(CircuitOpen):
+                _call(breaker)
+            probe.observe(200, {})
+
+        assert breaker.state == CLOSED
+
+    def test_state_half_open_after_timeout(self):
+        breaker = CircuitBreaker("jira", failure_threshold=1, reset_timeout=0.05)
+        _call(breaker, 503)
+        assert breaker.state == OPEN
+
+        time.sleep(0.05)
+
+        # without waiting for a call to probe the backend
+        assert breaker.state == HALF_OPEN
+
+    def test_half_open_probe_reopens(self):
+        breaker = CircuitBreaker("github", failure_threshold=1, reset_timeout=0.05)
+        _call(breaker, 500)
+        time.sleep(0.05)
+
+        _call(breaker, 502)
+
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpen):
+            breaker.check()
+
+
+class TestCircuitBreakers:
+    def test_check_and_clear(self):
+        breakers = CircuitBreakers(["jira", "github"], failure_threshold=1)
+        breakers.check()
+        _call(breakers.get("github"), 503)
+
+        with pytest.raises(CircuitOpen) as error:
+            breakers.check()
+        assert error.value.backend == "github"
+
+        breakers.clear()
+        breakers.check()
+
+    def test_state_metric(self):
+        meter = MagicMock()
+        breakers = CircuitBreakers(["jira", "github"], failure_threshold=1, meter=meter)
+        _call(breakers.get("jira"), 503)
+
+        callback = meter.create_observable_gauge.call_args.kwargs["callbacks"][0]
+        observations = {o.attributes["backend"]: o.value for o in callback(None)}
+        assert observations == {"jira": 2, "github": 0}
+
+
+def test_async_client_fails_fast():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ConnectError("Connection refused")
+
+    breaker = CircuitBreaker("jira", failure_threshold=2)
+    http = httpx.AsyncClient(base_url="https://jira", transport=httpx.MockTransport(handler))
+    jira = AsyncJiraClient(http, lambda: ("user", "token"), breaker=breaker)
+
+    # the retries of the transport errors stop once the circuit is open
+    with pytest.raises(CircuitOpen):
+        asyncio.run(jira.issue("TEST-1"))
+    assert len(attempts) == 2
@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import MagicMock
+
+from github_jira_sync_app.coalescing import EventCoalescer
+
+
+async def _burst(coalescer: EventCoalescer, events: list[tuple[str, str]], spacing: float):
+    async def delayed(n, key, action):
+        await asyncio.sleep(n * spacing)
+        return await coalescer.wait(key, action)
+
+    return await asyncio.gather(*[delayed(n, *event) for n, event in enumerate(events)])
+
+
+class TestEventCoalescer:
+    def test_single_event_processed(self):
+        coalescer = EventCoalescer(window=0.01)
+        assert asyncio.run(coalescer.wait("issue-1", "edited")) == {"edited"}
+
+    def test_burst_merged_into_last_event(self):
+        meter = MagicMock()
+        coalescer = EventCoalescer(window=0.2, meter=meter)
+        events = [("issue-1", "edited"), ("issue-1", "labeled"), ("issue-1", "labeled")]
+        results = asyncio.run(_burst(coalescer, events, spacing=0.01))
+        assert results == [None, None, {"edited", "labeled"}]
+        assert meter.create_counter.return_value.add.call_count == 2
+
+    def test_issues_not_merged_together(self):
+        coalescer = EventCoalescer(window=0.2)
+        events = [("issue-1", "edited"), ("issue-2", "labeled")]
+        results = asyncio.run(_burst(coalescer, events, spacing=0.01))
+        assert results == [{"edited"}, {"labeled"}]
+
+    def test_events_after_window_not_merged(self):
+        coalescer = EventCoalescer(window=0.01)
+        events = [("issue-1", "edited"), ("issue-1", "labeled")]
+        results = asyncio.run(_burst(coalescer, events, spacing=0.1))
+        assert results == [{"edited"}, {"labeled"}]
+
+    def test_burst_flushed_after_max_delay(self):
+        coalescer = EventCoalescer(window=10, max_delay=0.1)
+        events = [("issue-1", "edited")] * 3
+        results = asyncio.run(_burst(coalescer, events, spacing=0.03))
+        assert results[:2] == [None, None]
+        assert results[2] == {"edited"}
+
+    def test_flush_releases_pending_event_first(self):
+        coalescer = EventCoalescer(window=10)
+        order = []
+
+        async def edited_then_closed():
+            async def edited():
+                order.append(await coalescer.wait("issue-1", "edited"))
+
+            task = asyncio.create_task(edited())
+            await asyncio.sleep(0.01)
+            await coalescer.flush("issue-1")
+            order.append("closed")
+            await task
+            # nothing left to flush
+            await asyncio.wait_for(coalescer.flush("issue-1"), 1)
+
+        asyncio.run(asyncio.wait_for(edited_then_closed(), 1))
+        assert order == [{"edited"}, "closed"]
+
+    def test_disabled_by_default(self):
+        assert not EventCoalescer().enabled
@@ -0,0 +1,129 @@
+import asyncio
+import base64
+import json
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from github import UnknownObjectException
+
+from github_jira_sync_app.config_cache import CONFIG_PATH
+from github_jira_sync_app.config_cache import RepoConfigCache
+
+
+def _make_repo(content=b"settings: {}", etag='"abc"', sha="sha1"):
+    repo = MagicMock()
+    repo.url = "https://api.github.com/repos/octo/repo"
+    contents = MagicMock()
+    contents.decoded_content = content
+    contents.etag = etag
+    contents.sha = sha
+    repo.get_contents.return_value = contents
+    return repo
+
+
+def _push_payload(paths, ref="refs/heads/main"):
+    return {
+        "ref": ref,
+        "repository": {"full_name": "octo/repo", "default_branch": "main"},
+        "commits": [{"added": [], "modified": paths, "removed": []}],
+    }
+
+
+class TestRepoConfigCache:
+    def test_config_served_from_cache(self):
+        repo = _make_repo()
+        cache = RepoConfigCache()
+        assert cache.get("octo/repo", repo) == b"settings: {}"
+        assert cache.get("octo/repo", repo) == b"settings: {}"
+        repo.get_contents.assert_called_once_with(CONFIG_PATH)
+        repo.requester.requestJson.assert_not_called()
+
+    def test_missing_config_negatively_cached(self):
+        repo = _make_repo()
+        repo.get_contents.side_effect = UnknownObjectException(404, "Not Found", None)
+        cache = RepoConfigCache()
+        assert cache.get("octo/repo", repo) is None
+        assert cache.get("octo/repo", repo) is None
+        repo.get_contents.assert_called_once()
+
+    def test_revalidation_not_modified(self):
+        repo = _make_repo()
+        repo.requester.requestJson.return_value = (304, {}, "")
+        cache = RepoConfigCache(ttl=0)
+        cache.get("octo/repo", repo)
+        assert cache.get("octo/repo", repo) == b"settings: {}"
+        repo.get_contents.assert_called_once()
+        headers = repo.requester.requestJson.call_args[1]["headers"]
+        assert headers == {"If-None-Match": '"abc"'}
+
+    def test_revalidation_modified(self):
+        repo = _make_repo()
+        data = {
+            "type": "file",
+            "encoding": "base64",
+            "content": base64.b64encode(b"settings: {labels: [bug]}").decode(),
+            "sha": "sha2",
+        }
+        repo.requester.requestJson.return_value = (200, {"etag": '"def"'}, json.dumps(data))
+        cache = RepoConfigCache(ttl=0)
+        cache.get("octo/repo", repo)
+        assert cache.get("octo/repo", repo) == b"settings: {labels: [bug]}"
+        repo.get_contents.assert_called_once()
+
+    def test_push_to_config_invalidates(self):
+        repo = _make_repo()
+        cache = RepoConfigCache()
+        cache.get("octo/repo", repo)
+        assert cache.handle_push(_push_payload([CONFIG_PATH]))
+        cache.get("octo/repo", repo)
+        assert repo.get_contents.call_count == 2
+
+    def test_push_to_other_files_keeps_cache(self):
+        repo = _make_repo()
+        cache = RepoConfigCache()
+        cache.get("octo/repo", repo)
+        assert not cache.handle_push(_push_payload(["README.md"]))
+        assert not cache.handle_push(_push_payload([CONFIG_PATH], ref="refs/heads/feature"))
+        cache.get("octo/repo", repo)
+        repo.get_contents.assert_called_once()
+
+
+class TestRepoConfigCacheAsync:
+    @staticmethod
+    def _get(cache, responses):
+        requested_etags = []
+
+        async def fetch(etag):
+            requested_etags.append(etag)
+            return responses.pop(0)
+
+        return asyncio.run(cache.get_async("octo/repo", fetch)), requested_etags
+
+    @staticmethod
+    def _file(content, sha):
+        data = {"content": base64.b64encode(content).decode(), "sha": sha}
+        request = httpx.Request("GET", "https://api.github.com")
+        return httpx.Response(200, json=data, headers={"ETag": f'"{sha}"'}, request=request)
+
+    def test_revalidation(self):
+        cache = RepoConfigCache(ttl=0)
+        assert self._get(cache, [self._file(b"a: 1", "sha1")]) == (b"a: 1", [None])
+        assert self._get(cache, [httpx.Response(304)]) == (b"a: 1", ['"sha1"'])
+        assert self._get(cache, [self._file(b"a: 2", "sha2")]) == (b"a: 2", ['"sha1"'])
+
+    def test_served_from_cache_within_ttl(self):
+        cache = RepoConfigCache()
+        self._get(cache, [self._file(b"a: 1", "sha1")])
+        assert self._get(cache, []) == (b"a: 1", [])
+
+    def test_missing_config_negatively_cached(self):
+        cache = RepoConfigCache()
+        assert self._get(cache, [httpx.Response(404)]) == (None, [None])
+        assert self._get(cache, []) == (None, [])
+
+    def test_error_raised(self):
+        cache = RepoConfigCache()
+        response = httpx.Response(502, request=httpx.Request("GET", "https://api.github.com"))
+        with pytest.raises(httpx.HTTPStatusError):
+            self._get(cache, [response])
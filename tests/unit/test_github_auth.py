@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import MagicMock
+
+from github import UnknownObjectException
+
+from github_jira_sync_app.github_auth import AsyncInstallationTokenCache
+from github_jira_sync_app.github_auth import InstallationResolver
+from github_jira_sync_app.github_auth import InstallationTokenCache
+
+
+def _authorization(token, expires_in=3600):
+    authorization = MagicMock()
+    authorization.token = token
+    authorization.expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+    return authorization
+
+
+class TestAsyncInstallationTokenCache:
+    def test_single_refresh_under_concurrency(self):
+        calls = []
+
+        async def slow_fetch(installation_id):
+            calls.append(installation_id)
+            await asyncio.sleep(0.01)
+            return _authorization("ghs_1")
+
+        async def main():
+            cache = AsyncInstallationTokenCache(slow_fetch)
+            return await asyncio.gather(*[cache.get_token(1) for _ in range(10)])
+
+        assert asyncio.run(main()) == ["ghs_1"] * 10
+        assert calls == [1]
+
+    def test_token_refreshed_before_expiry(self):
+        tokens = iter([_authorization("ghs_old", expires_in=200), _authorization("ghs_new")])
+
+        async def fetch(installation_id):
+            return next(tokens)
+
+        async def main():
+            cache = AsyncInstallationTokenCache(fetch, refresh_margin=300)
+            return [await cache.get_token(1) for _ in range(3)]
+
+        assert asyncio.run(main()) == ["ghs_old", "ghs_new", "ghs_new"]
+
+
+class TestInstallationTokenCache:
+    def test_token_is_reused(self):
+        fetch = MagicMock(return_value=_authorization("ghs_1"))
+        cache = InstallationTokenCache(fetch)
+        assert cache.get_token(1) == "ghs_1"
+        assert cache.get_token(1) == "ghs_1"
+        fetch.assert_called_once_with(1)
+
+    def test_tokens_are_keyed_by_installation(self):
+        fetch = MagicMock(side_effect=[_authorization("ghs_1"), _authorization("ghs_2")])
+        cache = InstallationTokenCache(fetch)
+        assert cache.get_token(1) == "ghs_1"
+        assert cache.get_token(2) == "ghs_2"
+        assert fetch.call_count == 2
+
+    def test_token_refreshed_before_expiry(self):
+        fetch = MagicMock(
+            side_effect=[_authorization("ghs_old", expires_in=200), _authorization("ghs_new")]
+        )
+        cache = InstallationTokenCache(fetch, refresh_margin=300)
+        assert cache.get_token(1) == "ghs_old"
+        assert cache.get_token(1) == "ghs_new"
+        assert cache.get_token(1) == "ghs_new"
+        assert fetch.call_count == 2
+
+    def test_invalidate_forces_new_token(self):
+        fetch = MagicMock(side_effect=[_authorization("ghs_1"), _authorization("ghs_2")])
+        cache = InstallationTokenCache(fetch)
+        cache.get_token(1)
+        cache.invalidate(1)
+        assert cache.get_token(1) == "ghs_2"
+
+    def test_single_refresh_under_concurrency(self):
+        calls = []
+
+        def slow_fetch(installation_id):
+            calls.append(installation_id)
+            time.sleep(0.05)
+            return _authorization("ghs_1")
+
+        cache = InstallationTokenCache(slow_fetch)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_token(1))) for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ["ghs_1"] * 10
+        assert calls == [1]
+
+
+def _payload(installation_id=None, owner="octo", repo="repo"):
+    payload = {"repository": {"name": repo, "owner": {"login": owner}}}
+    if installation_id:
+        payload["installation"] = {"id": installation_id}
+    return payload
+
+
+class TestInstallationResolver:
+    def test_installation_id_taken_from_payload(self):
+        lookup = MagicMock()
+        resolver = InstallationResolver(lookup)
+        assert resolver.resolve(_payload(installation_id=7)) == 7
+        lookup.assert_not_called()
+
+    def test_lookup_is_cached(self):
+        lookup = MagicMock(return_value=7)
+        resolver = InstallationResolver(lookup)
+        assert resolver.resolve(_payload()) == 7
+        assert resolver.resolve(_payload()) == 7
+        lookup.assert_called_once_with("octo", "repo")
+
+    def test_payload_id_populates_cache(self):
+        lookup = MagicMock()
+        resolver = InstallationResolver(lookup)
+        resolver.resolve(_payload(installation_id=7))
+        assert resolver.resolve(_payload()) == 7
+        lookup.assert_not_called()
+
+    def test_expired_entry_is_looked_up_again(self):
+        lookup = MagicMock(side_effect=[7, 8])
+        resolver = InstallationResolver(lookup, ttl=0)
+        assert resolver.resolve(_payload()) == 7
+        assert resolver.resolve(_payload()) == 8
+
+    def test_not_installed_is_negatively_cached(self):
+        lookup = MagicMock(side_effect=UnknownObjectException(404, "Not Found", None))
+        resolver = InstallationResolver(lookup)
+        assert resolver.resolve(_payload()) is None
+        assert resolver.resolve(_payload()) is None
+        lookup.assert_called_once()
+
+    def test_invalidate_by_installation(self):
+        lookup = MagicMock(side_effect=[7, 8])
+        resolver = InstallationResolver(lookup)
+        resolver.resolve(_payload())
+        resolver.invalidate(installation_id=7)
+        assert resolver.resolve(_payload()) == 8
+
+    def test_invalidate_by_repository(self):
+        lookup = MagicMock(return_value=7)
+        resolver = InstallationResolver(lookup)
+        resolver.resolve(_payload(repo="one"))
+        resolver.resolve(_payload(repo="two"))
+        resolver.invalidate(repositories=["Octo/One"])
+        resolver.resolve(_payload(repo="one"))
+        resolver.resolve(_payload(repo="two"))
+        assert lookup.call_count == 3
+
+    def test_invalidate_drops_negative_entries(self):
+        lookup = MagicMock(side_effect=[UnknownObjectException(404, "Not Found", None), 7])
+        resolver = InstallationResolver(lookup)
+        assert resolver.resolve(_payload()) is None
+        resolver.invalidate(installation_id=7)
+        assert resolver.resolve(_payload()) == 7
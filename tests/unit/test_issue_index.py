@@ -0,0 +1,115 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from github_jira_sync_app.issue_index import IssueIndex
+from github_jira_sync_app.issue_index import RedisIssueIndex
+from github_jira_sync_app.issue_index import SQLiteIssueIndex
+from github_jira_sync_app.issue_index import create_issue_index
+
+URL = "https://github.com/octo/repo/issues/1"
+
+
+@pytest.fixture(params=["memory", "file"])
+def sqlite_index(request, tmp_path):
+    path = ":memory:" if request.param == "memory" else str(tmp_path / "index.sqlite3")
+    return SQLiteIssueIndex(path)
+
+
+class TestSQLiteIssueIndex:
+    def test_get_missing(self, sqlite_index):
+        assert sqlite_index.get(URL) is None
+
+    def test_set_and_get(self, sqlite_index):
+        sqlite_index.set(URL, "TEST-1")
+        assert sqlite_index.get(URL) == "TEST-1"
+
+    def test_set_overrides(self, sqlite_index):
+        sqlite_index.set(URL, "TEST-1")
+        sqlite_index.set(URL, "TEST-2")
+        assert sqlite_index.get(URL) == "TEST-2"
+
+    def test_set_many(self, sqlite_index):
+        sqlite_index.set_many([(f"{URL}{i}", f"TEST-{i}") for i in range(100)])
+        assert sqlite_index.get(f"{URL}42") == "TEST-42"
+
+    def test_delete_and_clear(self, sqlite_index):
+        sqlite_index.set_many([(URL, "TEST-1"), (f"{URL}0", "TEST-2")])
+        sqlite_index.delete(URL)
+        assert sqlite_index.get(URL) is None
+        sqlite_index.clear()
+        assert sqlite_index.get(f"{URL}0") is None
+
+    def test_persisted(self, tmp_path):
+        path = str(tmp_path / "index.sqlite3")
+        SQLiteIssueIndex(path).set(URL, "TEST-1")
+        assert SQLiteIssueIndex(path).get(URL) == "TEST-1"
+
+
+class TestRedisIssueIndex:
+    def test_get_decodes(self):
+        redis = MagicMock()
+        redis.hget.return_value = b"TEST-1"
+        assert RedisIssueIndex(redis).get(URL) == "TEST-1"
+        redis.hget.assert_called_once_with("jira:issue-index", URL)
+
+    def test_set_many(self):
+        redis = MagicMock()
+        RedisIssueIndex(redis).set_many([(URL, "TEST-1")])
+        redis.hset.assert_called_once_with("jira:issue-index", mapping={URL: "TEST-1"})
+
+
+def test_incomplete_backend_cannot_be_built():
+    class GetOnlyIndex(IssueIndex):
+        def get(self, gh_issue_url):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyIndex()  # type: ignore[abstract]
+
+
+class TestCreateIssueIndex:
+    def test_none_backend(self):
+        assert create_issue_index("none", ":memory:") is None
+
+    def test_redis_backend(self):
+        assert isinstance(create_issue_index("redis", ":memory:", MagicMock()), RedisIssueIndex)
+
+    def test_redis_unavailable_falls_back_to_sqlite(self):
+        assert isinstance(create_issue_index("redis", ":memory:", None), SQLiteIssueIndex)
+
+
+class TestImportProject:
+    def test_pages_are_imported(self):
+        from github_jira_sync_app.import_index import import_project
+
+        def _issue(key, number):
+            description = (
+                f"\nThis issue was created from GitHub Issue {URL[:-1]}{number}\n"
+                "Issue was submitted by: octocat\n"
+            )
+            return {"key": key, "fields": {"description": description}}
+
+        jira = MagicMock()
+        jira.enhanced_search_issues.side_effect = [
+            {"issues": [_issue("TEST-3", 3), _issue("TEST-2", 2)], "nextPageToken": "next"},
+            {"issues": [_issue("TEST-1", 1), {"key": "TEST-0", "fields": {"description": None}}]},
+        ]
+        index = SQLiteIssueIndex(":memory:")
+
+        assert import_project(jira, index, "TEST", page_size=2) == 3
+        assert index.get(f"{URL[:-1]}2") == "TEST-2"
+        assert jira.enhanced_search_issues.call_args_list[1][1]["nextPageToken"] == "next"
+
+    def test_main_uses_client_pool(self):
+        from github_jira_sync_app import import_index
+
+        pool = MagicMock()
+        jira = pool.client.return_value.__enter__.return_value
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        with patch("github_jira_sync_app.main.jira_pool", pool):
+            import_index.main(["--project", "TEST"])
+
+        pool.client.assert_called_once()
+        assert jira.enhanced_search_issues.call_args.args[0].startswith('project="TEST"')
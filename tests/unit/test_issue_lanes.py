@@ -0,0 +1,93 @@
+import asyncio
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+
+import pytest
+
+from github_jira_sync_app.issue_lanes import IssueLanes
+
+
+async def _run(lanes: IssueLanes, key: str, name: str, events: list, delay: float = 0.01):
+    async with lanes.local(key):
+        events.append(f"{name} start")
+        await asyncio.sleep(delay)
+        events.append(f"{name} end")
+
+
+class TestLocalLanes:
+    def test_same_issue_serialized_in_arrival_order(self):
+        lanes = IssueLanes()
+        events: list[str] = []
+
+        async def scenario():
+            await asyncio.gather(*[_run(lanes, "issue-1", str(n), events) for n in range(3)])
+
+        asyncio.run(scenario())
+        assert events == ["0 start", "0 end", "1 start", "1 end", "2 start", "2 end"]
+        assert lanes.pending() == 0
+
+    def test_different_issues_in_parallel(self):
+        lanes = IssueLanes()
+        events: list[str] = []
+
+        async def scenario():
+            await asyncio.gather(
+                _run(lanes, "issue-1", "a", events), _run(lanes, "issue-2", "b", events)
+            )
+
+        asyncio.run(scenario())
+        assert events[:2] == ["a start", "b start"]
+
+    def test_lane_released_on_error(self):
+        lanes = IssueLanes()
+
+        async def failing():
+            async with lanes.local("issue-1"):
+                raise RuntimeError("Jira is down")
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(failing())
+        assert lanes.pending() == 0
+
+
+class TestDistributedLanes:
+    def test_without_redis(self):
+        with IssueLanes().distributed(None, "issue-1"):
+            pass
+
+    def test_redis_lock_acquired_and_released(self):
+        redis_client = MagicMock()
+        redis_client.lock.return_value.acquire.return_value = True
+        with IssueLanes(lock_timeout=10, wait_timeout=20).distributed(redis_client, "issue-1"):
+            redis_client.lock.return_value.release.assert_not_called()
+
+        redis_client.lock.assert_called_once_with(
+            "jira:lane:issue-1", timeout=10, blocking_timeout=20
+        )
+        redis_client.lock.return_value.release.assert_called_once()
+
+    def test_wait_timeout_raises(self):
+        redis_client = MagicMock()
+        redis_client.lock.return_value.acquire.return_value = False
+        with pytest.raises(TimeoutError):
+            with IssueLanes().distributed(redis_client, "issue-1"):
+                pass
+
+    def test_expired_lock_release_ignored(self):
+        redis_client = MagicMock()
+        redis_client.lock.return_value.acquire.return_value = True
+        redis_client.lock.return_value.release.side_effect = Exception("not owned")
+        with IssueLanes().distributed(redis_client, "issue-1"):
+            pass
+
+    def test_async_redis_lock(self):
+        redis_client = MagicMock()
+        redis_client.lock.return_value = AsyncMock()
+        redis_client.lock.return_value.acquire.return_value = True
+
+        async def scenario():
+            async with IssueLanes().distributed_async(redis_client, "issue-1"):
+                pass
+
+        asyncio.run(scenario())
+        redis_client.lock.return_value.release.assert_awaited_once()
@@ -0,0 +1,69 @@
+from unittest.mock import MagicMock
+
+from github_jira_sync_app.jira_metadata import JiraMetadataCache
+
+
+def _component(name):
+    component = MagicMock()
+    component.name = name
+    return component
+
+
+def _issue(issue_type="Bug", status="To Do"):
+    issue = MagicMock()
+    issue.fields.issuetype.name = issue_type
+    issue.fields.status.name = status
+    return issue
+
+
+class TestComponents:
+    def test_components_cached(self):
+        jira = MagicMock()
+        jira.project_components.return_value = [_component("UI"), _component("API")]
+        cache = JiraMetadataCache()
+        assert cache.components(jira, "TEST") == {"UI", "API"}
+        assert cache.components(jira, "TEST") == {"UI", "API"}
+        jira.project_components.assert_called_once_with("TEST")
+
+    def test_components_expire(self):
+        jira = MagicMock()
+        jira.project_components.return_value = []
+        cache = JiraMetadataCache(ttl=0)
+        cache.components(jira, "TEST")
+        cache.components(jira, "TEST")
+        assert jira.project_components.call_count == 2
+
+    def test_invalidate_project(self):
+        jira = MagicMock()
+        jira.project_components.return_value = []
+        cache = JiraMetadataCache()
+        cache.components(jira, "TEST")
+        cache.components(jira, "OTHER")
+        cache.invalidate("TEST")
+        cache.components(jira, "TEST")
+        cache.components(jira, "OTHER")
+        assert jira.project_components.call_count == 3
+
+
+class TestTransitions:
+    def test_transition_id_resolved_by_name(self):
+        jira = MagicMock()
+        jira.transitions.return_value = [{"id": "31", "name": "Done"}]
+        cache = JiraMetadataCache()
+        assert cache.transition_id(jira, "TEST", _issue(), "done") == "31"
+        assert cache.transition_id(jira, "TEST", _issue(), "Done") == "31"
+        assert cache.transition_id(jira, "TEST", _issue(), "Rejected") is None
+        jira.transitions.assert_called_once()
+
+    def test_transitions_keyed_by_workflow_and_status(self):
+        jira = MagicMock()
+        jira.transitions.side_effect = [
+            [{"id": "31", "name": "Done"}],
+            [{"id": "11", "name": "To Do"}],
+            [{"id": "41", "name": "Done"}],
+        ]
+        cache = JiraMetadataCache()
+        assert cache.transition_id(jira, "TEST", _issue(), "Done") == "31"
+        assert cache.transition_id(jira, "TEST", _issue(status="Done"), "To Do") == "11"
+        assert cache.transition_id(jira, "TEST", _issue(issue_type="Story"), "Done") == "41"
+        assert cache.transition_id(jira, "TEST", _issue(), "Done") == "31"
@@ -0,0 +1,81 @@
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from jira import JIRAError
+
+from github_jira_sync_app.jira_pool import JiraClientPool
+
+
+def _make_pool(credentials=("user", "token"), **kwargs):
+    factory = MagicMock(side_effect=lambda creds: MagicMock(name=f"client-{creds}"))
+    current = {"credentials": credentials}
+    pool = JiraClientPool(factory, lambda: current["credentials"], size=2, **kwargs)
+    return pool, factory, current
+
+
+class TestJiraClientPool:
+    def test_client_is_reused(self):
+        pool, factory, _ = _make_pool()
+        with pool.client() as first:
+            pass
+        with pool.client() as second:
+            pass
+        assert first is second
+        factory.assert_called_once_with(("user", "token"))
+
+    def test_concurrent_borrowers_get_distinct_clients(self):
+        pool, factory, _ = _make_pool()
+        with pool.client() as first, pool.client() as second:
+            assert first is not second
+        assert factory.call_count == 2
+
+    def test_rotated_credentials_reconnect(self):
+        pool, factory, current = _make_pool()
+        with pool.client() as first:
+            pass
+        current["credentials"] = ("user", "new-token")
+        with pool.client() as second:
+            pass
+        assert first is not second
+        first.close.assert_called_once()
+        factory.assert_called_with(("user", "new-token"))
+
+    @pytest.mark.parametrize(
+        "error", [JIRAError(status_code=401), requests.ConnectionError("connection refused")]
+    )
+    def test_client_discarded_on_failure(self, error):
+        pool, factory, _ = _make_pool()
+        with pytest.raises(type(error)):
+            with pool.client() as first:
+                raise error
+        with pool.client() as second:
+            pass
+        assert first is not second
+        first.close.assert_called_once()
+
+    def test_client_kept_on_jira_error(self):
+        pool, factory, _ = _make_pool()
+        with pytest.raises(JIRAError):
+            with pool.client() as first:
+                raise JIRAError(status_code=404)
+        with pool.client() as second:
+            pass
+        assert first is second
+
+    def test_idle_client_health_checked(self):
+        pool, factory, _ = _make_pool(health_check_interval=0)
+        with pool.client() as first:
+            pass
+        first.myself.side_effect = JIRAError(status_code=401)
+        with pool.client() as second:
+            pass
+        assert first is not second
+        first.myself.assert_called_once()
+
+    def test_clear_closes_idle_clients(self):
+        pool, factory, _ = _make_pool()
+        with pool.client() as first:
+            pass
+        pool.clear()
+        first.close.assert_called_once()
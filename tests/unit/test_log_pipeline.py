@@ -0,0 +1,109 @@
+import json
+import logging
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from github_jira_sync_app.log_pipeline import JSONFormatter
+from github_jira_sync_app.log_pipeline import LogPipeline
+from github_jira_sync_app.log_pipeline import log_context
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(JSONFormatter())
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.lines.append(json.loads(self.format(record)))
+        self.threads.add(threading.get_ident())
+
+
+@pytest.fixture
+def log():
+    handler = _ListHandler()
+    pipeline = LogPipeline([handler], max_queue=100)
+    log = logging.Logger("test-pipeline")
+    log.addHandler(pipeline.handler)
+    pipeline.start()
+    yield log, pipeline, handler
+    pipeline.stop()
+
+
+def test_written_by_background_thread(log):
+    log, pipeline, handler = log
+    log.info("Webhook %s processed", "delivery-1", extra={"stages": {"config": 0.01}})
+    pipeline.stop()
+
+    (line,) = handler.lines
+    assert line["message"] == "Webhook delivery-1 processed"
+    assert line["level"] == "INFO"
+    assert line["stages"] == {"config": 0.01}
+    assert line["timestamp"].endswith("Z") and "%f" not in line["timestamp"]
+    assert threading.get_ident() not in handler.threads
+
+
+def test_log_context(log):
+    log, pipeline, handler = log
+    with log_context(delivery="delivery-1", repo="canonical/foo", issue=None):
+        with log_context(issue=42):
+            log.info("nested")
+        # fields set with `extra=` win
+        log.info("extra", extra={"delivery": "delivery-2"})
+    log.info("outside")
+    pipeline.stop()
+
+    assert [
+        (line.get("delivery"), line.get("repo"), line.get("issue")) for line in handler.lines
+    ] == [
+        ("delivery-1", "canonical/foo", 42),
+        ("delivery-2", "canonical/foo", None),
+        (None, None, None),
+    ]
+
+
+def test_exception_formatted(log):
+    log, pipeline, handler = log
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("Failed")
+    pipeline.stop()
+
+    assert "ValueError: boom" in handler.lines[0]["exception"]
+
+
+def test_sampled_records():
+    handler = _ListHandler()
+    pipeline = LogPipeline([handler], sample_rate=0)
+    log = logging.Logger("test-pipeline")
+    log.addHandler(pipeline.handler)
+    pipeline.start()
+
+    log.info("Received webhook: Ignoring.", extra={"sampled": True})
+    log.info("Received webhook")
+    pipeline.stop()
+
+    assert [line["message"] for line in handler.lines] == ["Received webhook"]
+
+
+def test_full_queue_drops_records():
+    handler = _ListHandler()
+    pipeline = LogPipeline([handler], max_queue=2)
+    log = logging.Logger("test-pipeline")
+    log.addHandler(pipeline.handler)
+    meter = MagicMock()
+    pipeline.instrument(meter)
+
+    for i in range(5):
+        log.info(f"record {i}")
+    pipeline.start()
+    pipeline.stop()
+
+    assert [line["message"] for line in handler.lines] == ["record 0", "record 1"]
+    assert pipeline.dropped == 3
+    callback = meter.create_observable_counter.call_args.kwargs["callbacks"][0]
+    assert [observation.value for observation in callback(None)] == [3]
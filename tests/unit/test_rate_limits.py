@@ -0,0 +1,237 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import httpx
+import pytest
+import requests
+from github import Github
+from jira import JIRAError
+
+from github_jira_sync_app.async_clients import AsyncJiraClient
+from github_jira_sync_app.rate_limits import AdaptiveLimiter
+from github_jira_sync_app.rate_limits import LimiterConfig
+from github_jira_sync_app.rate_limits import OutboundLimits
+from github_jira_sync_app.rate_limits import RateLimited
+from github_jira_sync_app.rate_limits import ThrottledAdapter
+from github_jira_sync_app.rate_limits import throttle_pygithub
+
+
+def _call(limiter, status=200, headers=None, latency=0.0):
+    with limiter.call() as call:
+        # as if the call started `latency` seconds ago
+        call.started -= latency
+        call.observe(status, headers or {})
+
+
+class TestAdaptiveLimiter:
+    def test_token_bucket(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(rate=20, burst=2, latency_tolerance=0))
+
+        start = time.monotonic()
+        for _ in range(4):
+            _call(limiter)
+
+        # 2 calls of the burst, then one every 50ms
+        assert time.monotonic() - start >= 0.09
+
+    def test_concurrency_limit(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=2, max_wait=0.05))
+        limiter.acquire()
+        limiter.acquire()
+
+        with pytest.raises(RateLimited) as error:
+            limiter.acquire()
+        assert error.value.backend == "jira"
+
+    def test_waits_for_release(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=1, latency_tolerance=0))
+        release = threading.Timer(0.05, lambda: _call(limiter))
+
+        with limiter.call():
+            release.start()
+            time.sleep(0.1)
+        release.join()
+
+        assert limiter.in_flight == 0
+
+    def test_throttled_call_decreases_limit_once(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=8))
+
+        with limiter.call() as first, limiter.call() as second:
+            first.observe(429, {})
+            second.observe(429, {})
+
+        # both calls report the same congestion
+        assert limiter.limit == 4
+        _call(limiter, status=503)
+        assert limiter.limit == 2
+
+    def test_success_increases_limit(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=4, latency_tolerance=0))
+        _call(limiter, status=429)
+        assert limiter.limit == 2
+
+        for _ in range(10):
+            _call(limiter)
+
+        assert limiter.limit == 4
+
+    def test_retry_after(self):
+        limiter = AdaptiveLimiter("github", LimiterConfig(max_wait=1))
+        _call(limiter, status=403, headers={"Retry-After": "120"})
+
+        with pytest.raises(RateLimited) as error:
+            limiter.acquire()
+        assert 119 <= error.value.retry_after <= 120
+
+    def test_short_retry_after_is_waited(self):
+        limiter = AdaptiveLimiter("github", LimiterConfig())
+        _call(limiter, status=429, headers={"Retry-After": "0"})
+        _call(limiter, status=429, headers={"Retry-After": "1"})
+
+        start = time.monotonic()
+        _call(limiter)
+        assert time.monotonic() - start >= 0.9
+
+    def test_rate_limit_exhausted(self):
+        limiter = AdaptiveLimiter("github", LimiterConfig(max_wait=1))
+        reset = str(int(time.time()) + 600)
+        _call(limiter, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})
+
+        with pytest.raises(RateLimited) as error:
+            limiter.acquire()
+        assert error.value.retry_after > 500
+
+    def test_jira_rate_limit_exhausted(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_wait=1))
+        reset = time.strftime("%Y-%m-%dT%H:%MZ", time.gmtime(time.time() + 600))
+        _call(limiter, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})
+
+        with pytest.raises(RateLimited) as error:
+            limiter.acquire()
+        assert error.value.retry_after > 500
+
+    def test_high_latency_decreases_limit(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=8, latency_tolerance=2))
+        for _ in range(3):
+            _call(limiter, latency=0.001)
+        assert limiter.limit == 8
+
+        for _ in range(5):
+            _call(limiter, latency=0.05)
+        assert limiter.limit < 8
+
+    def test_mixed_latencies_keep_limit(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=8))
+        # e.g. a search after quick issue reads, healthy but slower
+        for _ in range(20):
+            _call(limiter, latency=0.08)
+            _call(limiter, latency=0.6)
+        assert limiter.limit == 8
+
+    def test_async(self):
+        limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=1, latency_tolerance=0))
+
+        async def hold():
+            async with limiter.call_async() as call:
+                await asyncio.sleep(0.02)
+                call.observe(200, {})
+
+        async def run():
+            await asyncio.gather(hold(), hold(), hold())
+
+        start = time.monotonic()
+        asyncio.run(run())
+        assert time.monotonic() - start >= 0.06
+        assert limiter.in_flight == 0
+
+
+class TestOutboundLimits:
+    def test_limiters_per_key(self):
+        limits = OutboundLimits({"github": LimiterConfig()}, max_keys=2)
+
+        assert limits.get("github", 1) is limits.get("github", "1")
+        assert limits.get("github", 1) is not limits.get("github", 2)
+        # keys beyond the limit share a limiter
+        assert limits.get("github", 3) is limits.get("github", 4)
+
+    def test_bind(self):
+        limits = OutboundLimits({"github": LimiterConfig()})
+
+        assert limits.current("github") is None
+        with limits.bind("github", 12):
+            assert limits.current("github") is limits.get("github", 12)
+        assert limits.current("github") is None
+
+    def test_backoff_counter(self):
+        meter = MagicMock()
+        limits = OutboundLimits({"jira": LimiterConfig()}, meter=meter)
+
+        _call(limits.get("jira", "https://jira"), status=429)
+
+        meter.create_counter.return_value.add.assert_called_once_with(
+            1, {"backend": "jira", "reason": "throttled"}
+        )
+
+
+def test_throttled_adapter():
+    limiter = AdaptiveLimiter("jira", LimiterConfig(max_wait=1))
+    response = requests.Response()
+    response.status_code = 429
+    response.headers["Retry-After"] = "60"
+    session = requests.Session()
+    session.mount("https://jira", ThrottledAdapter(lambda: limiter))
+
+    with patch("requests.adapters.HTTPAdapter.send", return_value=response):
+        assert session.get("https://jira/rest/api/2/myself").status_code == 429
+        with pytest.raises(RateLimited):
+            session.get("https://jira/rest/api/2/myself")
+
+
+def test_pygithub_client_throttled():
+    limiter = MagicMock(return_value=AdaptiveLimiter("github", LimiterConfig()))
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response._content = b"{}"
+    github = Github(base_url="https://github.example/api/v3")
+    throttle_pygithub(github.requester, limiter)
+
+    with patch("requests.adapters.HTTPAdapter.send", return_value=response):
+        github.requester.requestJsonAndCheck("GET", "/rate_limit")
+        github.requester.requestJsonAndCheck("GET", "/rate_limit")
+        assert limiter.call_count == 2
+
+        # other PyGithub clients are left alone
+        Github(base_url="https://github.example/api/v3").requester.requestJsonAndCheck(
+            "GET", "/rate_limit"
+        )
+        assert limiter.call_count == 2
+
+
+def test_unsupported_pygithub_not_throttled(caplog):
+    requester = SimpleNamespace(scheme="https")
+
+    throttle_pygithub(requester, lambda: None)
+
+    assert vars(requester) == {"scheme": "https"}
+    assert "not throttled" in caplog.text
+
+
+def test_async_client_limited():
+    limiter = AdaptiveLimiter("jira", LimiterConfig(max_concurrency=4))
+    http = httpx.AsyncClient(
+        base_url="https://jira",
+        transport=httpx.MockTransport(lambda request: httpx.Response(429, text="Slow down")),
+    )
+    jira = AsyncJiraClient(http, lambda: ("user", "token"), limiter=lambda: limiter)
+
+    with pytest.raises(JIRAError):
+        asyncio.run(jira.issue("TEST-1"))
+
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
@@ -0,0 +1,245 @@
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+import yaml
+from github.GithubObject import NotSet
+from jira import JIRAError
+
+from github_jira_sync_app.issue_index import SQLiteIssueIndex
+from github_jira_sync_app.reconcile import ApiBudget
+from github_jira_sync_app.reconcile import BudgetExhausted
+from github_jira_sync_app.reconcile import Reconciler
+from github_jira_sync_app.reconcile import WatermarkStore
+from github_jira_sync_app.reconcile import iter_targets
+
+REPO_URL = "https://github.com/octo/repo"
+LONG_AGO = datetime(2024, 1, 1, tzinfo=timezone.utc)
+LATER = datetime(2024, 1, 2, tzinfo=timezone.utc)
+
+
+def _url(number):
+    return f"{REPO_URL}/issues/{number}"
+
+
+def _settings(**overrides):
+    from github_jira_sync_app.main import settings_compiler
+    from tests.unit.conftest import _default_settings
+
+    return settings_compiler.compile(yaml.safe_dump(_default_settings(**overrides)).encode())
+
+
+def _gh_issue(number, state="open", labels=("bug",), updated_at=LONG_AGO, state_reason=None):
+    raw = {
+        "number": number,
+        "url": f"https://api.github.com/repos/octo/repo/issues/{number}",
+        "html_url": _url(number),
+        "title": f"Issue {number}",
+        "state": state,
+        "state_reason": state_reason,
+        "labels": [{"name": label} for label in labels],
+        "updated_at": updated_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    return MagicMock(number=number, raw_data=raw)
+
+
+def _jira_issue(key, status="To Do", labels=("bug",), summary=None, category=None):
+    issue = MagicMock(key=key)
+    issue.fields.status.name = status
+    issue.fields.status.statusCategory.key = category or ("done" if status == "Done" else "new")
+    issue.fields.labels = list(labels)
+    issue.fields.summary = summary or f"Issue {key.split('-')[1]}"
+    return issue
+
+
+def _repo(*issues):
+    repo = MagicMock(full_name="octo/repo", raw_data={"name": "repo", "full_name": "octo/repo"})
+    repo.get_issues.return_value = list(issues)
+    return repo
+
+
+def _index(*numbers):
+    index = SQLiteIssueIndex(":memory:")
+    for number in numbers:
+        index.set(_url(number), f"TEST-{number}")
+    return index
+
+
+class TestReconciler:
+    def test_drift_fixed(self):
+        repo = _repo(
+            _gh_issue(1, state="closed"),
+            _gh_issue(2, state="closed", state_reason="not_planned"),
+            _gh_issue(3, labels=["bug", "ui"]),
+            _gh_issue(4),
+            _gh_issue(5),
+        )
+        jira_issues = [
+            _jira_issue("TEST-1"),
+            _jira_issue("TEST-2"),
+            _jira_issue("TEST-3", summary="Old title"),
+            _jira_issue("TEST-4", status="Done"),
+            _jira_issue("TEST-5"),
+        ]
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = jira_issues
+        reconciler = Reconciler(WatermarkStore(None), _index(1, 2, 3, 4, 5))
+
+        report = reconciler.run([(MagicMock(), repo, _settings(sync_labels=True))], jira)
+
+        assert report.checked == 5
+        assert report.drift == {"state": 3, "labels": 1, "summary": 1}
+        assert report.fixed == report.drift
+        jql = jira.enhanced_search_issues.call_args.args[0]
+        assert jql == "key in (TEST-1, TEST-2, TEST-3, TEST-4, TEST-5)"
+        transitions = [call.args[1] for call in jira.transition_issue.call_args_list]
+        assert transitions == ["Done", "Rejected", "To Do"]
+        jira_issues[2].update.assert_called_once_with(
+            fields={"labels": ["bug", "ui"], "summary": "Issue 3"}
+        )
+        jira_issues[4].update.assert_not_called()
+
+    def test_closed_under_other_status_name(self):
+        repo = _repo(_gh_issue(1, state="closed", state_reason="not_planned"))
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = [
+            _jira_issue("TEST-1", status="Won't Fix", category="done")
+        ]
+        reconciler = Reconciler(WatermarkStore(None), _index(1))
+
+        report = reconciler.run([(MagicMock(), repo, _settings())], jira)
+        assert report.checked == 1 and not report.drift
+        jira.transition_issue.assert_not_called()
+
+    def test_failed_fix_does_not_stop_run(self):
+        watermarks = WatermarkStore(None)
+        repo = _repo(_gh_issue(1, state="closed"), _gh_issue(2, state="closed", updated_at=LATER))
+        other_repo = _repo(_gh_issue(3, state="closed"))
+        other_repo.full_name = "octo/other"
+        jira = MagicMock()
+        jira.enhanced_search_issues.side_effect = lambda jql, **kwargs: [
+            _jira_issue(key) for key in jql[8:-1].split(", ")
+        ]
+        jira.transition_issue.side_effect = [
+            JIRAError("Transition not available", status_code=400),
+            None,
+            None,
+        ]
+        reconciler = Reconciler(watermarks, _index(1, 2, 3))
+
+        targets = [(MagicMock(), repo, _settings()), (MagicMock(), other_repo, _settings())]
+        report = reconciler.run(targets, jira)
+
+        assert report.checked == 3
+        assert report.failed == 1
+        assert report.fixed == {"state": 2}
+        assert watermarks.get("octo/repo") == LATER
+
+    def test_deleted_issue_fetched_one_by_one(self):
+        index = _index(1, 2)
+        jira = MagicMock()
+        jira.enhanced_search_issues.side_effect = JIRAError(
+            "An issue with key 'TEST-2' does not exist", status_code=400
+        )
+        jira.issue.side_effect = [_jira_issue("TEST-1"), JIRAError("Not found", status_code=404)]
+        reconciler = Reconciler(WatermarkStore(None), index)
+
+        repo = _repo(_gh_issue(1, state="closed"), _gh_issue(2))
+        report = reconciler.run([(MagicMock(), repo, _settings())], jira)
+
+        assert (report.checked, report.unlinked) == (2, 1)
+        assert report.fixed == {"state": 1}
+        assert index.get(_url(2)) is None
+
+    def test_labels_ignored_without_sync_labels(self):
+        repo = _repo(_gh_issue(1, labels=["bug", "ui"]))
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = [_jira_issue("TEST-1")]
+        reconciler = Reconciler(WatermarkStore(None), _index(1))
+
+        report = reconciler.run([(MagicMock(), repo, _settings())], jira)
+        assert report.checked == 1 and not report.drift
+
+    def test_dry_run(self):
+        watermarks = WatermarkStore(None)
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = [_jira_issue("TEST-1")]
+        reconciler = Reconciler(watermarks, _index(1))
+
+        repo = _repo(_gh_issue(1, state="closed"))
+        report = reconciler.run([(MagicMock(), repo, _settings())], jira, dry_run=True)
+
+        assert report.drift == {"state": 1} and not report.fixed
+        jira.transition_issue.assert_not_called()
+        assert watermarks.get("octo/repo") is None
+
+    def test_watermark(self, tmp_path):
+        path = str(tmp_path / "watermarks.json")
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = [_jira_issue("TEST-1")]
+        recent = datetime.now(timezone.utc) - timedelta(seconds=10)
+        repo = _repo(_gh_issue(1), _gh_issue(2, updated_at=recent))
+        reconciler = Reconciler(WatermarkStore(path), _index(1, 2), grace=60)
+
+        report = reconciler.run([(MagicMock(), repo, _settings())], jira)
+        # issues updated within the grace period may still have webhooks in flight
+        assert report.checked == 1
+        assert repo.get_issues.call_args.kwargs["since"] is NotSet
+
+        reconciler = Reconciler(WatermarkStore(path), _index(1, 2), grace=60)
+        reconciler.run([(MagicMock(), repo, _settings())], jira)
+        assert repo.get_issues.call_args.kwargs["since"] == LONG_AGO
+
+    def test_unlinked_issue(self):
+        jira = MagicMock()
+        jira.enhanced_search_issues.return_value = {"issues": []}
+        reconciler = Reconciler(WatermarkStore(None), _index())
+
+        report = reconciler.run([(MagicMock(), _repo(_gh_issue(1)), _settings())], jira)
+        assert (report.checked, report.unlinked) == (1, 1)
+
+    def test_budget(self):
+        watermarks = WatermarkStore(None)
+        jira = MagicMock()
+        jira.enhanced_search_issues.side_effect = lambda jql, **kwargs: [
+            _jira_issue(key, status="Done") for key in jql[8:-1].split(", ")
+        ]
+        repo = _repo(*(_gh_issue(n, updated_at=LONG_AGO + timedelta(n)) for n in range(1, 6)))
+        reconciler = Reconciler(watermarks, _index(1, 2, 3, 4, 5), batch_size=2)
+
+        # listing, then per batch a search + 2 transitions of 2 calls: the 3rd transition is over
+        report = reconciler.run([(MagicMock(), repo, _settings())], jira, budget=8)
+        assert report.budget_exhausted
+        assert report.fixed == {"state": 2}
+        assert watermarks.get("octo/repo") == LONG_AGO + timedelta(2)
+
+
+def test_targets_charged():
+    git_integration = MagicMock()
+    git_integration.requester.per_page = 30
+    git_integration.get_installations.return_value = [MagicMock(id=1)]
+    repos = [MagicMock(full_name=f"octo/repo-{n}") for n in range(150)]
+    budget = ApiBudget(1000)
+
+    with (
+        patch("github_jira_sync_app.main.git_integration", git_integration),
+        patch("github_jira_sync_app.main.token_cache"),
+        patch("github_jira_sync_app.main.github_client"),
+        patch("github_jira_sync_app.main.config_cache.get", return_value=None),
+        patch("github_jira_sync_app.reconcile.list_installation_repos", return_value=repos),
+    ):
+        assert list(iter_targets(budget)) == []
+
+    # installations, token, 2 pages of repositories and a config file per repository
+    assert budget.spent == 1 + 1 + 2 + 150
+
+
+def test_api_budget():
+    budget = ApiBudget(3)
+    budget.spend(2)
+    with pytest.raises(BudgetExhausted):
+        budget.spend(2)
+    budget.spend()
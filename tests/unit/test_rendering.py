@@ -0,0 +1,115 @@
+from multiprocessing.process import BaseProcess
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from mistletoe import Document  # type: ignore[import]
+
+from github_jira_sync_app.rendering import MarkdownRenderer
+
+
+class TestMarkdownRenderer:
+    def test_renders_jira_markup(self):
+        renderer = MarkdownRenderer()
+        assert renderer.render_description("**bold** `code`").strip() == "*bold* {{code}}"
+
+    def test_result_cached_by_content(self):
+        renderer = MarkdownRenderer()
+        with patch("mistletoe.Document", wraps=Document) as document:
+            renderer.render_description("some text")
+            renderer.render_comment("some text")
+            renderer.render_description("other text")
+        assert document.call_count == 2
+
+    def test_least_recently_used_evicted(self):
+        renderer = MarkdownRenderer(cache_bytes=200)
+        renderer._renderer = render = MagicMock(side_effect=lambda text: text * 2)
+        renderer.render_description("a" * 20)
+        renderer.render_description("b" * 20)
+        renderer.render_description("a" * 20)
+        renderer.render_description("c" * 20)  # evicts "b"
+        renderer.render_description("a" * 20)
+        renderer.render_description("b" * 20)
+        assert [call.args[0][0] for call in render.call_args_list] == ["a", "b", "c", "b"]
+
+    def test_renderer_created_on_first_use(self):
+        with patch("mistletoe.contrib.jira_renderer.JIRARenderer") as jira_renderer:
+            renderer = MarkdownRenderer()
+            jira_renderer.assert_not_called()
+            renderer.warm_up()
+            renderer.render_description("some text")
+        jira_renderer.assert_called_once()
+
+    def test_oversized_result_not_cached(self):
+        renderer = MarkdownRenderer(cache_bytes=10)
+        with patch("mistletoe.Document", wraps=Document) as document:
+            renderer.render_description("some text")
+            renderer.render_description("some text")
+        assert document.call_count == 2
+
+    def test_input_truncated_before_parsing(self):
+        renderer = MarkdownRenderer(max_description_length=100, max_comment_length=50)
+        with patch("mistletoe.Document", wraps=Document) as document:
+            renderer.render_description("x" * 1_000_000)
+            renderer.render_comment("y" * 1_000_000)
+        description, comment = (call.args[0] for call in document.call_args_list)
+        assert description.startswith("x" * 100 + "...")
+        assert "Text exceeded Jira maximum length" in description
+        assert comment.startswith("y" * 50 + "...")
+        assert len(comment) < 200
+
+    def test_render_duration_recorded(self):
+        meter = MagicMock()
+        renderer = MarkdownRenderer(meter=meter)
+        renderer.render_comment("text")
+        renderer.render_comment("text")
+        histogram = meter.create_histogram.return_value
+        attributes = [call.args[1] for call in histogram.record.call_args_list]
+        assert attributes == [
+            {"kind": "comment", "source": "thread"},
+            {"kind": "comment", "source": "cache"},
+        ]
+
+
+class TestRenderPool:
+    def test_large_text_rendered_in_pool(self):
+        renderer = MarkdownRenderer(pool_workers=1, pool_threshold=100, pool_timeout=60)
+        text = "**bold** " * 100
+        try:
+            rendered = renderer.render_description(text)
+        finally:
+            renderer.close()
+        assert rendered == MarkdownRenderer().render_description(text)
+
+    def test_small_text_rendered_in_thread(self):
+        renderer = MarkdownRenderer(pool_workers=1, pool_threshold=100)
+        with patch.object(renderer, "_render_in_pool") as render_in_pool:
+            renderer.render_description("**bold**")
+        render_in_pool.assert_not_called()
+
+    def test_timeout_falls_back_to_raw_text(self):
+        meter = MagicMock()
+        renderer = MarkdownRenderer(pool_workers=1, pool_threshold=10, pool_timeout=0, meter=meter)
+        text = "**bold** " * 10
+        try:
+            rendered = renderer.render_description(text)
+        finally:
+            renderer.close()
+        assert rendered == "{noformat}" + text + "{noformat}"
+        meter.create_counter.return_value.add.assert_called_once_with(1)
+
+        # the processes of the timed out render are terminated
+        assert renderer._pool is None
+
+        # the fallback is not cached
+        with patch.object(renderer, "_render_in_pool", return_value="*bold*"):
+            assert renderer.render_description(text) == "*bold*"
+
+    def test_timeout_terminates_processes(self):
+        renderer = MarkdownRenderer(pool_workers=1, pool_threshold=10, pool_timeout=0)
+        with patch.object(
+            BaseProcess, "terminate", autospec=True, side_effect=BaseProcess.terminate
+        ) as terminate:
+            rendered = renderer.render_description("**bold** " * 10)
+
+        assert rendered.startswith("{noformat}")
+        terminate.assert_called()
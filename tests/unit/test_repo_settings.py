@@ -0,0 +1,107 @@
+import logging
+
+import pytest
+import yaml
+
+from github_jira_sync_app.repo_settings import SettingsCompiler
+from github_jira_sync_app.repo_settings import SettingsError
+
+DEFAULTS = {
+    "settings": {
+        "components": None,
+        "labels": None,
+        "add_gh_comment": False,
+        "add_gh_synced_label": False,
+        "sync_description": True,
+        "sync_comments": True,
+        "epic_key": None,
+        "jira_project_key": None,
+        "label_mapping": None,
+        "status_mapping": None,
+        "summary": None,
+        "sync_labels": False,
+    }
+}
+
+
+def _config(**settings):
+    settings.setdefault("jira_project_key", "TEST")
+    settings.setdefault("status_mapping", {"opened": "To Do", "closed": "Done"})
+    return yaml.dump({"settings": settings}).encode()
+
+
+class TestSettingsCompiler:
+    def test_defaults_are_applied(self):
+        settings = SettingsCompiler(DEFAULTS).compile(_config())
+        assert settings.jira_project_key == "TEST"
+        assert settings.sync_description is True
+        assert settings.sync_labels is False
+        assert settings.labels == frozenset()
+        assert settings.components == ()
+
+    def test_defaults_are_not_mutated(self):
+        SettingsCompiler(DEFAULTS).compile(_config(labels=["bug"]))
+        assert DEFAULTS["settings"]["labels"] is None
+
+    def test_statuses_are_resolved(self):
+        settings = SettingsCompiler(DEFAULTS).compile(_config())
+        assert settings.opened_status == "To Do"
+        assert settings.closed_status == "Done"
+        assert settings.not_planned_status == "Done"
+
+        config = _config(status_mapping={"opened": "To Do", "closed": "Done", "not_planned": "No"})
+        assert SettingsCompiler(DEFAULTS).compile(config).not_planned_status == "No"
+
+    def test_labels_are_normalized(self):
+        config = _config(labels=["Bug", "UI"], label_mapping={"Enhancement": "Story"})
+        settings = SettingsCompiler(DEFAULTS).compile(config)
+        assert settings.labels == frozenset({"bug", "ui"})
+        assert settings.issue_type({"enhancement", "bug"}) == "Story"
+        assert settings.issue_type({"bug"}) == "Bug"
+
+    def test_settings_are_immutable(self):
+        settings = SettingsCompiler(DEFAULTS).compile(_config(label_mapping={"a": "Story"}))
+        with pytest.raises(AttributeError):
+            settings.jira_project_key = "OTHER"
+        with pytest.raises(TypeError):
+            settings.label_mapping["b"] = "Bug"
+
+    def test_compiled_once_per_content(self):
+        compiler = SettingsCompiler(DEFAULTS)
+        config = _config()
+        assert compiler.compile(config) is compiler.compile(bytes(config))
+
+    @pytest.mark.parametrize(
+        "content,message",
+        [
+            (b"", "empty"),
+            (b"settings:\n  bad: yaml: indentation: [", "Check syntax"),
+            (b"- a list", "Top level `settings` key"),
+            (_config(jira_project_key=None), "Jira project key"),
+            (_config(status_mapping=None), "Status mapping is not specified"),
+            (_config(status_mapping={"opened": "To Do"}), "`opened` and `closed`"),
+        ],
+    )
+    def test_invalid_config(self, content, message):
+        with pytest.raises(SettingsError, match=message):
+            SettingsCompiler(DEFAULTS).compile(content)
+
+    def test_invalid_config_logged_once(self, caplog):
+        compiler = SettingsCompiler(DEFAULTS)
+        with caplog.at_level(logging.WARNING, logger="sync-bot-server"):
+            for _ in range(3):
+                with pytest.raises(SettingsError):
+                    compiler.compile(b"")
+        assert len(caplog.records) == 1
+
+    @pytest.mark.parametrize("summary", ["{issue.title", "{title}", "{}", "{0.title}"])
+    def test_invalid_summary_falls_back_to_title(self, summary):
+        settings = SettingsCompiler(DEFAULTS).compile(_config(summary=summary))
+        assert settings.summary is None
+        assert "invalid summary" in settings.warnings[0]
+
+    def test_valid_summary(self):
+        summary = "[{issue.repository.name}] {issue.title}"
+        settings = SettingsCompiler(DEFAULTS).compile(_config(summary=summary))
+        assert settings.summary == summary
+        assert settings.warnings == ()
@@ -1,12 +1,20 @@
+import asyncio
 import json
+import logging
 import os
+import time
 from pathlib import Path
+from unittest.mock import AsyncMock
 from unittest.mock import MagicMock
 from unittest.mock import patch
 
+import anyio
+import httpx
+import pytest
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 from github import GithubException
+from github import UnknownObjectException
 
 UNITTESTS_DIR = Path(__file__).parent
 load_dotenv(Path(__file__).parent / "dumm_env", verbose=True)
@@ -64,6 +72,19 @@ class TestEarlyExits:
         assert response.status_code == 200
         assert "PR comment" in response.json()["msg"]
 
+    def test_ignored_webhook_logged_as_sampled(self, signature_mock, caplog):
+        payload = _get_json("comment_created_by_user.json")
+        payload["issue"]["pull_request"] = {"url": "https://api.github.com/repos/test/pulls/1"}
+        with caplog.at_level(logging.INFO, logger="sync-bot-server"):
+            client.post("/", json=payload, headers={"X-GitHub-Delivery": "delivery-1"})
+
+        (record,) = caplog.records
+        assert record.getMessage() == (
+            "Received webhook delivery-1, action=created: "
+            "Action was triggered by PR comment. Ignoring."
+        )
+        assert record.sampled
+
     def test_bot_triggered_ignored(self, signature_mock):
         response = client.post("/", json=_get_json("comment_created_by_bot.json"))
         assert response.status_code == 200
@@ -101,6 +122,70 @@ class TestEarlyExits:
         assert "synced-to-jira" in response.json()["msg"]
         assert "Purposefully ignored" in response.json()["msg"]
 
+    def test_unhandled_event_not_parsed(self, signature_mock):
+        with patch("github_jira_sync_app.main._parse_payload") as parse_payload:
+            response = client.post(
+                "/", content=b"{not parsed", headers={"X-GitHub-Event": "pull_request"}
+            )
+        assert response.status_code == 200
+        assert "wasn't triggered by Issue action" in response.json()["msg"]
+        parse_payload.assert_not_called()
+
+    def test_early_exit_without_thread_hop(self, signature_mock):
+        with patch("github_jira_sync_app.main.run_in_threadpool") as run_in_threadpool:
+            response = client.post(
+                "/",
+                json=_get_json("comment_created_by_bot.json"),
+                headers={"X-GitHub-Event": "issue_comment"},
+            )
+        assert response.json() == {"msg": "Action was triggered by bot. Ignoring."}
+        run_in_threadpool.assert_not_called()
+
+    def test_invalid_json(self, signature_mock):
+        response = client.post("/", content=b"[1, 2")
+        assert response.status_code == 422
+        response = client.post("/", content=b"[1, 2]")
+        assert response.status_code == 422
+
+
+# ---------------------------------------------------------------------------
+# Installation resolution
+# ---------------------------------------------------------------------------
+class TestInstallation:
+    def test_app_not_installed_ignored(self, signature_mock, mock_github):
+        mock_github.integration.get_repo_installation.side_effect = UnknownObjectException(
+            404, "Not Found", None
+        )
+        payload = _get_json("issue_edited.json")  # payload without installation id
+        response = client.post("/", json=payload)
+        assert response.status_code == 200
+        assert "not installed" in response.json()["msg"]
+
+        response = client.post("/", json=payload)
+        assert "not installed" in response.json()["msg"]
+        mock_github.integration.get_repo_installation.assert_called_once()
+
+    def test_installation_event_invalidates_cache(self, signature_mock, mock_github):
+        payload = _get_json("issue_edited.json")
+        client.post("/", json=payload)
+        client.post("/", json=payload)
+        mock_github.integration.get_repo_installation.assert_called_once()
+
+        response = client.post(
+            "/",
+            json={
+                "action": "removed",
+                "installation": {"id": 12345},
+                "repositories_removed": [{"full_name": "beliaev-maksim/test-ci"}],
+            },
+            headers={"X-GitHub-Event": "installation_repositories"},
+        )
+        assert response.status_code == 200
+        assert "cache invalidated" in response.json()["msg"]
+
+        client.post("/", json=payload)
+        assert mock_github.integration.get_repo_installation.call_count == 2
+
 
 # ---------------------------------------------------------------------------
 # Config / validation branches (need GitHub mock)
@@ -112,6 +197,24 @@ class TestConfigValidation:
         assert response.status_code == 200
         assert "jira_sync_config.yaml file was not found" in response.json()["msg"]
 
+    def test_config_file_cached_until_push(self, signature_mock, mock_github):
+        mock_github.issue.labels = [_make_label("enhancement")]
+        client.post("/", json=_get_json("issue_labeled_correct.json"))
+        client.post("/", json=_get_json("issue_labeled_correct.json"))
+        mock_github.repo.get_contents.assert_called_once()
+
+        push = {
+            "ref": "refs/heads/main",
+            "repository": {"full_name": "beliaev-maksim/test-ci", "default_branch": "main"},
+            "commits": [{"modified": [".github/.jira_sync_config.yaml"]}],
+        }
+        response = client.post("/", json=push, headers={"X-GitHub-Event": "push"})
+        assert response.status_code == 200
+        assert "invalidated" in response.json()["msg"]
+
+        client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert mock_github.repo.get_contents.call_count == 2
+
     def test_config_file_invalid_yaml(self, signature_mock, mock_github):
         contents = MagicMock()
         contents.decoded_content = b"settings:\n  bad: yaml: indentation: ["
@@ -197,6 +300,17 @@ class TestCreateNewJiraIssue:
         assert "Issue was created in Jira" in response.json()["msg"]
         mock_jira.client.create_issue.assert_called_once()
 
+    def test_stage_timings_logged(self, signature_mock, mock_github, mock_jira, caplog):
+        mock_github.issue.labels = [_make_label("bug")]
+        with caplog.at_level(logging.INFO, logger="sync-bot-server"):
+            client.post(
+                "/",
+                json=_get_json("issue_labeled_correct.json"),
+                headers={"X-GitHub-Delivery": "delivery-1"},
+            )
+        (record,) = [r for r in caplog.records if getattr(r, "delivery", None) == "delivery-1"]
+        assert {"token", "config", "jira_search", "render", "jira_create"} <= set(record.stages)
+
     def test_create_from_opened_without_label_config(self, signature_mock, mock_github, mock_jira):
         """When no labels are required, opened issue (without labels) should sync."""
         from tests.unit.conftest import _default_settings
@@ -310,6 +424,28 @@ class TestExistingJiraIssue:
             mock_jira.existing_issue, "Rejected"
         )
 
+    def test_close_uses_cached_transition_id(self, signature_mock, mock_github, mock_jira):
+        mock_github.issue.labels = [_make_label("bug")]
+        mock_jira.set_existing_issues()
+        mock_jira.client.issue.return_value = mock_jira.existing_issue
+        mock_jira.client.transitions.return_value = [{"id": "31", "name": "Done"}]
+        for _ in range(2):
+            response = client.post("/", json=_get_json("issue_closed_as_completed.json"))
+            assert response.json() == {"msg": "Closed existing Jira Issue"}
+        mock_jira.client.transitions.assert_called_once()
+        mock_jira.client.transition_issue.assert_called_with(mock_jira.existing_issue, "31")
+
+    def test_stale_transition_id_retried_by_name(self, signature_mock, mock_github, mock_jira):
+        from jira import JIRAError
+
+        mock_github.issue.labels = [_make_label("bug")]
+        mock_jira.set_existing_issues()
+        mock_jira.client.transitions.return_value = [{"id": "31", "name": "Done"}]
+        mock_jira.client.transition_issue.side_effect = [JIRAError(status_code=400), None]
+        response = client.post("/", json=_get_json("issue_closed_as_completed.json"))
+        assert response.json() == {"msg": "Closed existing Jira Issue"}
+        mock_jira.client.transition_issue.assert_called_with(mock_jira.existing_issue, "Done")
+
     def test_reopen_existing_issue(self, signature_mock, mock_github, mock_jira):
         mock_github.issue.labels = [_make_label("bug")]
         mock_jira.set_existing_issues()
@@ -367,6 +503,95 @@ class TestExistingJiraIssue:
         assert response.json() == {"msg": "No action performed"}
 
 
+# ---------------------------------------------------------------------------
+# GitHub issue -> Jira key index
+# ---------------------------------------------------------------------------
+class TestIssueIndex:
+    def test_created_issue_is_indexed(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import issue_index
+
+        mock_github.issue.labels = [_make_label("bug")]
+        client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert issue_index.get(mock_github.issue.html_url) == "TEST-1"
+
+    def test_index_hit_skips_jql_search(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import issue_index
+
+        issue_index.set(mock_github.issue.html_url, "TEST-42")
+        mock_github.issue.labels = [_make_label("bug")]
+        response = client.post("/", json=_get_json("issue_reopened.json"))
+        assert response.json() == {"msg": "Reopened existing Jira Issue"}
+        mock_jira.client.issue.assert_called_once()
+        assert mock_jira.client.issue.call_args[0][0] == "TEST-42"
+        mock_jira.client.enhanced_search_issues.assert_not_called()
+        mock_jira.client.transition_issue.assert_called_once_with(
+            mock_jira.client.issue.return_value, "To Do"
+        )
+
+    def test_jql_search_backfills_index(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import issue_index
+
+        mock_github.issue.labels = [_make_label("bug")]
+        mock_jira.set_existing_issues()
+        client.post("/", json=_get_json("issue_reopened.json"))
+        assert issue_index.get(mock_github.issue.html_url) == "TEST-99"
+
+    def test_deleted_jira_issue_falls_back_to_search(self, signature_mock, mock_github, mock_jira):
+        from jira import JIRAError
+
+        from github_jira_sync_app.main import issue_index
+
+        issue_index.set(mock_github.issue.html_url, "TEST-42")
+        mock_jira.client.issue.side_effect = JIRAError(status_code=404)
+        mock_jira.set_existing_issues()
+        mock_github.issue.labels = [_make_label("bug")]
+        response = client.post("/", json=_get_json("issue_reopened.json"))
+        assert response.json() == {"msg": "Reopened existing Jira Issue"}
+        mock_jira.client.enhanced_search_issues.assert_called_once()
+        assert issue_index.get(mock_github.issue.html_url) == "TEST-99"
+
+    def test_link_to_other_project_ignored(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import issue_index
+
+        issue_index.set(mock_github.issue.html_url, "OTHER-1")
+        mock_github.issue.labels = [_make_label("bug")]
+        client.post("/", json=_get_json("issue_labeled_correct.json"))
+        mock_jira.client.issue.assert_not_called()
+        mock_jira.client.create_issue.assert_called_once()
+
+
+# ---------------------------------------------------------------------------
+# Jira client pool
+# ---------------------------------------------------------------------------
+class TestJiraClientPool:
+    def test_jira_client_reused_across_webhooks(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app import main
+
+        mock_github.issue.labels = [_make_label("bug")]
+        mock_jira.set_existing_issues()
+        with patch.object(main, "JIRA", return_value=mock_jira.client) as MockJIRA:
+            client.post("/", json=_get_json("issue_reopened.json"))
+            client.post("/", json=_get_json("issue_closed_as_completed.json"))
+        MockJIRA.assert_called_once()
+        assert mock_jira.client.transition_issue.call_count == 2
+
+    def test_token_file_read_again_once_modified(self, tmp_path, monkeypatch):
+        from github_jira_sync_app.main import _jira_credentials
+
+        token_file = tmp_path / "jira_token"
+        token_file.write_text("first\n")
+        monkeypatch.setenv("JIRA_TOKEN_FILE", str(token_file))
+        assert _jira_credentials()[1] == "first"
+
+        with patch.object(Path, "read_text") as read_text:
+            assert _jira_credentials()[1] == "first"
+        read_text.assert_not_called()
+
+        token_file.write_text("second\n")
+        os.utime(token_file, ns=(0, 0))
+        assert _jira_credentials()[1] == "second"
+
+
 # ---------------------------------------------------------------------------
 # Comment sync
 # ---------------------------------------------------------------------------
@@ -528,36 +753,463 @@ class TestSyncedLabelFlow:
 # ---------------------------------------------------------------------------
 # Redis deduplication
 # ---------------------------------------------------------------------------
-class TestRedisDedup:
-    def test_redis_dedup_allows_first_request(self, signature_mock, mock_github, mock_jira):
+def _async_redis(acquired: bool = True) -> MagicMock:
+    async_redis = MagicMock()
+    async_redis.lock.return_value.acquire = AsyncMock(return_value=acquired)
+    async_redis.lock.return_value.release = AsyncMock()
+    return async_redis
+
+
+class TestIssueLanes:
+    def test_redis_lock_held_while_syncing(self, signature_mock, mock_github, mock_jira):
         mock_redis = MagicMock()
-        mock_redis.setnx.return_value = True  # first request gets the lock
+        async_redis = _async_redis()
         mock_github.issue.labels = [_make_label("bug")]
-        with patch("github_jira_sync_app.main.redis_client", mock_redis):
+        with (
+            patch("github_jira_sync_app.main.redis_client", mock_redis),
+            patch("github_jira_sync_app.main._async_redis_client", return_value=async_redis),
+        ):
             response = client.post("/", json=_get_json("issue_labeled_correct.json"))
         assert response.status_code == 200
         assert "Issue was created in Jira" in response.json()["msg"]
-        mock_redis.setnx.assert_called_once()
-        mock_redis.expire.assert_called_once()
-        mock_redis.delete.assert_not_called()
+        assert async_redis.lock.call_args.args[0].startswith("jira:lane:https://github.com/")
+        async_redis.lock.return_value.release.assert_awaited_once()
+        # waited for on the event loop, not in the worker thread
+        mock_redis.lock.assert_not_called()
+
+    def test_busy_issue_not_ignored(self, signature_mock, mock_github, mock_jira):
+        """A webhook of an issue being processed elsewhere waits instead of being dropped."""
+        async_redis = _async_redis()
+        mock_github.issue.labels = [_make_label("bug")]
+        mock_jira.set_existing_issues()
+        with (
+            patch("github_jira_sync_app.main.redis_client", MagicMock()),
+            patch("github_jira_sync_app.main._async_redis_client", return_value=async_redis),
+        ):
+            for _ in range(2):
+                response = client.post("/", json=_get_json("issue_closed_as_completed.json"))
+                assert response.json() == {"msg": "Closed existing Jira Issue"}
+        assert async_redis.lock.return_value.release.await_count == 2
+
+    def test_lock_wait_timeout_returns_500(self, signature_mock, mock_github, mock_jira):
+        mock_github.issue.labels = [_make_label("bug")]
+        with (
+            patch("github_jira_sync_app.main.redis_client", MagicMock()),
+            patch(
+                "github_jira_sync_app.main._async_redis_client",
+                return_value=_async_redis(acquired=False),
+            ),
+            patch("github_jira_sync_app.main.process_webhook") as process_webhook,
+        ):
+            with TestClient(app, raise_server_exceptions=False) as test_client:
+                response = test_client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert response.status_code == 500
+        # no worker thread was taken
+        process_webhook.assert_not_called()
+
+    def test_queued_webhook_locks_in_worker(self, mock_github, mock_jira):
+        from github_jira_sync_app.main import process_webhook
 
-    def test_redis_dedup_rejects_duplicate(self, signature_mock, mock_github, mock_jira):
         mock_redis = MagicMock()
-        mock_redis.setnx.return_value = False  # duplicate
+        mock_redis.lock.return_value.acquire.return_value = True
         mock_github.issue.labels = [_make_label("bug")]
         with patch("github_jira_sync_app.main.redis_client", mock_redis):
-            response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+            response = process_webhook(_get_json("issue_labeled_correct.json"), event="issues")
+        assert "Issue was created in Jira" in response["msg"]
+        mock_redis.lock.return_value.release.assert_called_once()
+
+
+class TestAdmission:
+    def test_overload_answered_with_503(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.admission import AdmissionController
+
+        def slow_webhook(*args, **kwargs):
+            time.sleep(0.2)
+            return {"msg": "Issue was created in Jira. "}
+
+        payloads = [_get_json("issue_labeled_correct.json") for _ in range(2)]
+        payloads[1]["issue"]["html_url"] += "0"
+        with (
+            patch("github_jira_sync_app.main.process_webhook", slow_webhook),
+            patch("github_jira_sync_app.main.webhook_slots", anyio.CapacityLimiter(1)),
+            patch("github_jira_sync_app.main.admission", AdmissionController(max_wait=0.05)),
+        ):
+            transport = httpx.ASGITransport(app=app)
+
+            async def post_both():
+                async with httpx.AsyncClient(transport=transport, base_url="http://bot") as c:
+                    return await asyncio.gather(*[c.post("/", json=p) for p in payloads])
+
+            responses = asyncio.run(post_both())
+
+        assert sorted(r.status_code for r in responses) == [200, 503]
+        rejected = next(r for r in responses if r.status_code == 503)
+        assert rejected.headers["Retry-After"] == "60"
+        assert "wait_timeout" in rejected.json()["msg"]
+
+    def test_rate_limited_answered_with_503(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.rate_limits import RateLimited
+
+        mock_github.issue.labels = [_make_label("bug")]
+        mock_jira.client.enhanced_search_issues.side_effect = RateLimited("jira", 42)
+        payload = _get_json("issue_labeled_correct.json")
+
+        response = client.post("/", json=payload)
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "42"
+        assert response.json() == {"msg": "jira calls are rate limited. Retry later."}
+
+    def test_backend_down_answered_with_503(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import circuit_breakers
+
+        breaker = circuit_breakers.get("jira")
+        for _ in range(5):
+            with breaker.call() as call:
+                call.observe(503, {})
+
+        response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) <= 30
+        assert response.json() == {"msg": "jira is unavailable. Retry later."}
+        mock_jira.client.enhanced_search_issues.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Health probes
+# ---------------------------------------------------------------------------
+class TestHealth:
+    def test_liveness(self):
+        response = client.get("/healthz")
         assert response.status_code == 200
-        assert "already being processed" in response.json()["msg"]
-        mock_jira.client.create_issue.assert_not_called()
+        assert response.json() == {"status": "ok"}
+
+    def test_ready_once_started(self):
+        # the lifespan of `client` is never run
+        assert client.get("/readyz").status_code == 503
+
+        with TestClient(app) as test_client:
+            response = test_client.get("/readyz")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "status": "ready",
+            "checks": {"startup": "ok", "redis": "disabled", "jira": "closed", "github": "closed"},
+        }
+
+    def test_not_ready_while_redis_down(self):
+        async_redis = AsyncMock()
+        async_redis.ping.side_effect = ConnectionError("Connection refused")
+
+        with (
+            patch("github_jira_sync_app.main.redis_client", MagicMock()),
+            patch("github_jira_sync_app.main._async_redis_client", return_value=async_redis),
+            TestClient(app) as test_client,
+        ):
+            response = test_client.get("/readyz")
+
+        assert response.status_code == 503
+        assert response.json()["checks"]["redis"] == "down"
+
+    def test_open_circuit_only_reported(self):
+        from github_jira_sync_app.main import circuit_breakers
+
+        for _ in range(5):
+            with circuit_breakers.get("github").call() as call:
+                call.observe(502, {})
+
+        with TestClient(app) as test_client:
+            response = test_client.get("/readyz")
+            assert response.status_code == 200
+            assert response.json()["checks"]["github"] == "open"
+
+            later = time.monotonic() + 3600
+            with patch("github_jira_sync_app.circuit_breaker.time.monotonic", return_value=later):
+                response = test_client.get("/readyz")
+
+        assert response.status_code == 200
+        assert response.json()["checks"] == {
+            "startup": "ok",
+            "redis": "disabled",
+            "jira": "closed",
+            "github": "half_open",
+        }
+
+
+# ---------------------------------------------------------------------------
+# Coalescing of bursts of events
+# ---------------------------------------------------------------------------
+async def _post_with_spacing(payloads: list[dict], spacing: float = 0.02) -> list[dict]:
+    """Post webhooks concurrently, `spacing` seconds apart, return the JSON responses."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bot") as async_client:
+
+        async def post(n, payload):
+            await asyncio.sleep(n * spacing)
+            return (await async_client.post("/", json=payload)).json()
+
+        return await asyncio.gather(*[post(n, payload) for n, payload in enumerate(payloads)])
+
+
+class TestCoalescing:
+    def test_burst_merged_into_one_update(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import event_coalescer
+        from github_jira_sync_app.main import issue_index
+        from tests.unit.conftest import _default_settings
+
+        mock_github.set_config(_default_settings(sync_labels=True))
+        mock_github.issue.labels = [_make_label("bug"), _make_label("enhancement")]
+        issue_index.set(mock_github.issue.html_url, "TEST-42")
+        jira_issue = mock_jira.client.issue.return_value
+        jira_issue.fields.labels = ["bug"]
+
+        payloads = [
+            _get_json("issue_edited.json"),
+            _get_json("issue_labeled_correct.json"),
+            _get_json("issue_unlabeled.json"),
+        ]
+        with patch.object(event_coalescer, "window", 0.5):
+            responses = asyncio.run(_post_with_spacing(payloads))
+
+        ignored = {"msg": "Coalesced with a later event of the issue. Ignoring."}
+        assert responses[:2] == [ignored, ignored]
+        assert responses[2] == {
+            "msg": "Updated existing Jira Issue from coalesced events (edited, labeled, unlabeled)"
+        }
+        jira_issue.update.assert_called_once()
+        fields = jira_issue.update.call_args.kwargs["fields"]
+        assert sorted(fields["labels"]) == ["bug", "enhancement"]
+        assert "summary" in fields and "description" in fields
+
+    def test_edit_not_overtaken_by_close(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import event_coalescer
+        from github_jira_sync_app.main import issue_index
 
-    def test_redis_dedup_cleanup_on_existing_issue(self, signature_mock, mock_github, mock_jira):
-        mock_redis = MagicMock()
-        mock_redis.setnx.return_value = True
         mock_github.issue.labels = [_make_label("bug")]
-        mock_jira.set_existing_issues()
-        with patch("github_jira_sync_app.main.redis_client", mock_redis):
+        issue_index.set(mock_github.issue.html_url, "TEST-42")
+        calls = []
+        jira_issue = mock_jira.client.issue.return_value
+        jira_issue.update.side_effect = lambda **kwargs: calls.append("update")
+        mock_jira.client.transition_issue.side_effect = lambda *args: calls.append("transition")
+
+        payloads = [_get_json("issue_edited.json"), _get_json("issue_closed_as_completed.json")]
+        with patch.object(event_coalescer, "window", 5):
+            start = time.monotonic()
+            responses = asyncio.run(_post_with_spacing(payloads))
+
+        assert time.monotonic() - start < 5
+        assert responses == [
+            {"msg": "Updated existing Jira Issue"},
+            {"msg": "Closed existing Jira Issue"},
+        ]
+        assert calls == ["update", "transition"]
+
+    def test_unknown_issue_not_delayed(self, signature_mock, mock_github, mock_jira):
+        """Events of issues not in Jira yet may create them, they are processed right away."""
+        from github_jira_sync_app.main import event_coalescer
+
+        mock_github.issue.labels = [_make_label("bug")]
+        with (
+            patch.object(event_coalescer, "window", 0.5),
+            patch.object(event_coalescer, "wait") as wait,
+        ):
+            response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert "Issue was created in Jira" in response.json()["msg"]
+        wait.assert_not_called()
+        mock_jira.client.create_issue.assert_called_once()
+
+    def test_transition_not_delayed(self, signature_mock, mock_github, mock_jira):
+        from github_jira_sync_app.main import event_coalescer
+        from github_jira_sync_app.main import issue_index
+
+        issue_index.set(mock_github.issue.html_url, "TEST-42")
+        mock_github.issue.labels = [_make_label("bug")]
+        with (
+            patch.object(event_coalescer, "window", 0.5),
+            patch.object(event_coalescer, "wait") as wait,
+        ):
             response = client.post("/", json=_get_json("issue_closed_as_completed.json"))
-        assert response.status_code == 200
         assert response.json() == {"msg": "Closed existing Jira Issue"}
-        mock_redis.delete.assert_not_called()
+        wait.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# Async execution mode
+# ---------------------------------------------------------------------------
+class TestAsyncExecutionMode:
+    def test_create_issue(self, signature_mock, mock_async_backends):
+        from tests.unit.conftest import _default_settings
+
+        mock_async_backends.set_config(
+            _default_settings(
+                add_gh_comment=True,
+                add_gh_synced_label=True,
+                summary="[{issue.repository.name}] {issue.title}",
+            )
+        )
+        response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert response.status_code == 200
+        assert response.json() == {"msg": "Issue was created in Jira. "}
+
+        created = [body for m, p, body in mock_async_backends.requests if p == "/rest/api/2/issue"]
+        assert created[0]["fields"]["summary"].startswith("[test-ci] ")
+        issue_path = "/repos/beliaev-maksim/test-ci/issues/30"
+        assert mock_async_backends.paths("POST")[-2:] == [
+            f"{issue_path}/labels",
+            f"{issue_path}/comments",
+        ]
+        comment = mock_async_backends.requests[-1][2]["body"]
+        assert "https://my-jira.atlassian.net/browse/TEST-1" in comment
+
+    def test_markdown_rendered_off_the_event_loop(self, signature_mock, mock_async_backends):
+        from github_jira_sync_app import main
+
+        build_issue_fields = main._build_issue_fields
+
+        def build_off_loop(*args):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return build_issue_fields(*args)
+
+        with patch.object(main, "_build_issue_fields", side_effect=build_off_loop) as mock:
+            response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+
+        assert response.status_code == 200
+        mock.assert_called_once()
+
+    def test_token_and_config_reused(self, signature_mock, mock_async_backends):
+        for _ in range(2):
+            response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+            assert response.status_code == 200
+
+        token_paths = [p for p in mock_async_backends.paths("POST") if "access_tokens" in p]
+        config_paths = [p for p in mock_async_backends.paths("GET") if "/contents/" in p]
+        assert len(token_paths) == 1
+        assert len(config_paths) == 1
+
+    def test_missing_config(self, signature_mock, mock_async_backends):
+        with patch("github_jira_sync_app.main.config_cache.get_async", return_value=None):
+            response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert response.json() == {"msg": ".github/.jira_sync_config.yaml file was not found"}
+
+    def test_close_existing_issue(self, signature_mock, mock_async_backends):
+        from tests.unit.conftest import jira_issue_json
+
+        mock_async_backends.existing_issues = [jira_issue_json()]
+        for _ in range(2):
+            response = client.post("/", json=_get_json("issue_closed_as_completed.json"))
+            assert response.json() == {"msg": "Closed existing Jira Issue"}
+
+        transitions = [
+            (m, body) for m, p, body in mock_async_backends.requests if p.endswith("/transitions")
+        ]
+        # transitions are listed once, then the cached id is used
+        assert transitions == [
+            ("GET", None),
+            ("POST", {"transition": {"id": "31"}}),
+            ("POST", {"transition": {"id": "31"}}),
+        ]
+
+    def test_create_with_components(self, signature_mock, mock_async_backends):
+        from tests.unit.conftest import _default_settings
+
+        mock_async_backends.set_config(_default_settings(components=["Frontend", "Backend"]))
+        mock_async_backends.components = [{"id": "1", "name": "Frontend"}]
+        response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert response.status_code == 200
+        created = [body for m, p, body in mock_async_backends.requests if p == "/rest/api/2/issue"]
+        assert created[0]["fields"]["components"] == [{"name": "Frontend"}]
+
+    def test_sync_labels(self, signature_mock, mock_async_backends):
+        from tests.unit.conftest import _default_settings
+        from tests.unit.conftest import jira_issue_json
+
+        mock_async_backends.set_config(_default_settings(sync_labels=True))
+        mock_async_backends.existing_issues = [jira_issue_json(labels=["old"])]
+        response = client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert response.json() == {"msg": "Updated existing Jira Issue labels (old -> bug)"}
+        assert ("PUT", "/rest/api/2/issue/TEST-99", {"fields": {"labels": ["bug"]}}) in (
+            mock_async_backends.requests
+        )
+
+    def test_comment_synced(self, signature_mock, mock_async_backends):
+        from tests.unit.conftest import jira_issue_json
+
+        mock_async_backends.existing_issues = [jira_issue_json()]
+        response = client.post("/", json=_get_json("comment_created_by_user.json"))
+        assert response.json() == {"msg": "New comment from GitHub was added to Jira"}
+        method, path, body = mock_async_backends.requests[-1]
+        assert path == "/rest/api/2/issue/TEST-99/comment"
+        assert body["body"].startswith("User *beliaev-maksim* commented:")
+
+    def test_jira_error_returns_500(self, signature_mock, mock_async_backends):
+        from github_jira_sync_app.main import JIRAError
+
+        with patch(
+            "github_jira_sync_app.main.AsyncJiraClient.create_issue",
+            side_effect=JIRAError("Unauthorized", status_code=401),
+        ):
+            with TestClient(app, raise_server_exceptions=False) as test_client:
+                response = test_client.post("/", json=_get_json("issue_labeled_correct.json"))
+        assert response.status_code == 500
+
+
+# ---------------------------------------------------------------------------
+# Queue acknowledgement mode
+# ---------------------------------------------------------------------------
+class TestQueueAckMode:
+    def test_webhook_queued_then_processed(
+        self, signature_mock, mock_github, mock_jira, mock_webhook_queue
+    ):
+        mock_github.issue.labels = [_make_label("bug")]
+        response = client.post(
+            "/",
+            json=_get_json("issue_labeled_correct.json"),
+            headers={"X-GitHub-Delivery": "delivery-1", "X-GitHub-Event": "issues"},
+        )
+        assert response.status_code == 202
+        mock_jira.client.create_issue.assert_not_called()
+
+        assert mock_webhook_queue.process_one()
+        mock_jira.client.create_issue.assert_called_once()
+
+    def test_redelivery_ignored_while_queued(self, signature_mock, mock_webhook_queue):
+        headers = {"X-GitHub-Delivery": "delivery-1", "X-GitHub-Event": "issues"}
+        client.post("/", json=_get_json("issue_labeled_correct.json"), headers=headers)
+        response = client.post("/", json=_get_json("issue_labeled_correct.json"), headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"msg": "Webhook is already queued. Ignoring."}
+
+    def test_webhooks_of_issue_processed_in_order(
+        self, signature_mock, mock_github, mock_jira, mock_webhook_queue
+    ):
+        client.post("/", json=_get_json("issue_labeled_correct.json"))
+        client.post("/", json=_get_json("issue_closed_as_completed.json"))
+
+        from github_jira_sync_app.main import webhook_queue as queue
+
+        first = queue.claim(lease=60)
+        assert first is not None
+        assert queue.claim(lease=60) is None  # same issue, waits for the first webhook
+        queue.complete(first.id)
+        assert queue.claim(lease=60) is not None
+
+    def test_ignored_webhook_answered_directly(self, signature_mock, mock_webhook_queue):
+        response = client.post("/", json=_get_json("comment_created_by_bot.json"))
+        assert response.status_code == 200
+        assert response.json() == {"msg": "Action was triggered by bot. Ignoring."}
+        assert not mock_webhook_queue.process_one()
+
+    def test_failed_webhook_retried(
+        self, signature_mock, mock_github, mock_jira, mock_webhook_queue
+    ):
+        mock_github.issue.labels = [_make_label("bug")]
+        new_issue = mock_jira.client.create_issue.return_value
+        mock_jira.client.create_issue.side_effect = [Exception("Jira is down"), new_issue]
+        client.post("/", json=_get_json("issue_labeled_correct.json"))
+
+        mock_webhook_queue.process_one()
+        mock_webhook_queue.process_one()
+        assert mock_jira.client.create_issue.call_count == 2
+        assert not mock_webhook_queue.process_one()
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+from starlette.concurrency import run_in_threadpool
+
+from github_jira_sync_app.instrumentation.stages import StageTimer
+
+
+def _recorded(meter) -> list[tuple[str, str, str]]:
+    histogram = meter.create_histogram.return_value
+    return [
+        (attrs["stage"], attrs["outcome"], attrs["jira_project"])
+        for (_, attrs), _ in histogram.record.call_args_list
+    ]
+
+
+class TestStageTimer:
+    def test_stages_recorded_and_logged(self, caplog):
+        meter = MagicMock()
+        timer = StageTimer(meter=meter)
+
+        with caplog.at_level(logging.INFO, logger="sync-bot-server"):
+            with timer.delivery("delivery-1"):
+                with timer.stage("token"):
+                    pass
+                timer.set_project("TEST")
+                with timer.stage("jira_update"):
+                    pass
+                with pytest.raises(ValueError), timer.stage("jira_update"):
+                    raise ValueError
+
+        assert _recorded(meter) == [
+            ("token", "ok", "unknown"),
+            ("jira_update", "ok", "TEST"),
+            ("jira_update", "error", "TEST"),
+        ]
+        (record,) = caplog.records
+        assert record.getMessage().startswith("Webhook delivery-1 processed in ")
+        assert record.delivery == "delivery-1"
+        assert list(record.stages) == ["token", "jira_update"]
+
+    def test_bounded_projects(self):
+        meter = MagicMock()
+        timer = StageTimer(meter=meter, max_projects=2)
+
+        for project in ["A", "B", "C", "A"]:
+            with timer.delivery(project):
+                timer.set_project(project)
+                with timer.stage("jira_search"):
+                    pass
+
+        assert [project for _, _, project in _recorded(meter)] == ["A", "B", "other", "A"]
+
+    def test_stages_of_worker_thread(self, caplog):
+        timer = StageTimer()
+
+        def work():
+            with timer.stage("config"):
+                pass
+
+        async def deliver():
+            with timer.delivery("delivery-1"):
+                await run_in_threadpool(work)
+
+        with caplog.at_level(logging.INFO, logger="sync-bot-server"):
+            asyncio.run(deliver())
+        assert list(caplog.records[0].stages) == ["config"]
+
+    def test_no_log_without_stages(self, caplog):
+        with caplog.at_level(logging.INFO, logger="sync-bot-server"):
+            with StageTimer().delivery("delivery-1"):
+                pass
+        assert not caplog.records
@@ -4,9 +4,9 @@ import pytest
 from fastapi import HTTPException
 
 from github_jira_sync_app.main import _generate_summary
-from github_jira_sync_app.main import merge_dicts
 from github_jira_sync_app.main import truncate_description
 from github_jira_sync_app.main import verify_signature
+from github_jira_sync_app.repo_settings import merge_dicts
 
 
 class TestMergeDicts:
@@ -72,33 +72,33 @@ class TestGenerateSummary:
 
     def test_default_falls_back_to_title(self):
         issue = self._make_issue()
-        result = _generate_summary({}, issue)
+        result = _generate_summary(None, issue)
         assert result == "Test Issue Title"
 
     def test_empty_summary_falls_back_to_title(self):
         issue = self._make_issue()
-        result = _generate_summary({"summary": ""}, issue)
+        result = _generate_summary("", issue)
         assert result == "Test Issue Title"
 
     def test_custom_format_with_title(self):
         issue = self._make_issue()
-        result = _generate_summary({"summary": "[{issue.repository.name}] {issue.title}"}, issue)
+        result = _generate_summary("[{issue.repository.name}] {issue.title}", issue)
         assert result == "[test-repo] Test Issue Title"
 
     def test_custom_format_with_user(self):
         issue = self._make_issue()
-        result = _generate_summary({"summary": "{issue.user.login}: {issue.title}"}, issue)
+        result = _generate_summary("{issue.user.login}: {issue.title}", issue)
         assert result == "test-user: Test Issue Title"
 
     def test_invalid_format_falls_back_to_title(self):
         issue = self._make_issue()
         # Use a format string that will cause an exception (KeyError)
-        result = _generate_summary({"summary": "{nonexistent_var}"}, issue)
+        result = _generate_summary("{nonexistent_var}", issue)
         assert result == "Test Issue Title"
 
     def test_non_string_summary_falls_back_to_title(self):
         issue = self._make_issue()
-        result = _generate_summary({"summary": 123}, issue)
+        result = _generate_summary(123, issue)
         assert result == "Test Issue Title"
 
 
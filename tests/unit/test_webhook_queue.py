@@ -0,0 +1,193 @@
+import time
+from unittest.mock import MagicMock
+
+from github_jira_sync_app.circuit_breaker import CircuitOpen
+from github_jira_sync_app.rate_limits import RateLimited
+from github_jira_sync_app.webhook_queue import QueueWorkers
+from github_jira_sync_app.webhook_queue import WebhookQueue
+from github_jira_sync_app.webhook_queue import main
+
+
+class TestWebhookQueue:
+    def test_put_and_claim_in_order(self):
+        queue = WebhookQueue(":memory:")
+        assert queue.put(b'{"n": 1}', "delivery-1", "issues")
+        assert queue.put(b'{"n": 2}', "delivery-2", "issues")
+
+        first = queue.claim(lease=60)
+        second = queue.claim(lease=60)
+        assert (first.delivery_id, first.body, first.event) == ("delivery-1", b'{"n": 1}', "issues")
+        assert second.delivery_id == "delivery-2"
+        assert queue.claim(lease=60) is None
+
+    def test_redelivery_queued_once(self):
+        queue = WebhookQueue(":memory:")
+        assert queue.put(b"{}", "delivery-1", "issues")
+        assert not queue.put(b"{}", "delivery-1", "issues")
+        assert queue.put(b"{}", None, "issues")
+        assert queue.put(b"{}", None, "issues")
+        assert queue.stats()[0] == 3
+
+    def test_expired_lease_claimed_again(self):
+        queue = WebhookQueue(":memory:")
+        queue.put(b"{}", "delivery-1", "issues")
+        assert queue.claim(lease=0).delivery_id == "delivery-1"
+        assert queue.claim(lease=60).delivery_id == "delivery-1"
+        assert queue.claim(lease=60) is None
+
+    def test_complete_removes_webhook(self):
+        queue = WebhookQueue(":memory:")
+        queue.put(b"{}", "delivery-1", "issues")
+        queue.complete(queue.claim(lease=60).id)
+        assert queue.stats() == (0, None)
+
+    def test_retry_delays_webhook(self):
+        queue = WebhookQueue(":memory:")
+        queue.put(b"{}", "delivery-1", "issues")
+        queue.retry(queue.claim(lease=60).id, delay=60, error="boom")
+        assert queue.claim(lease=60) is None
+
+        queue.retry(1, delay=0, error="boom")
+        assert queue.claim(lease=60).attempts == 2
+
+    def test_buried_webhook_not_claimed(self):
+        queue = WebhookQueue(":memory:")
+        queue.put(b"{}", "delivery-1", "issues")
+        queue.bury(queue.claim(lease=60).id, error="boom")
+        assert queue.claim(lease=60) is None
+        assert queue.stats() == (0, None)
+
+    def test_dead_webhooks_requeued(self, tmp_path):
+        path = str(tmp_path / "queue.sqlite3")
+        queue = WebhookQueue(path)
+        queue.put(b"{}", "delivery-1", "issues")
+        queue.bury(queue.claim(lease=60).id, error="boom")
+
+        main(["--requeue-dead", "--path", path])
+
+        webhook = queue.claim(lease=60)
+        assert webhook.delivery_id == "delivery-1"
+        assert webhook.attempts == 0
+
+    def test_persisted_across_instances(self, tmp_path):
+        path = str(tmp_path / "queue.sqlite3")
+        WebhookQueue(path).put(b"{}", "delivery-1", "issues")
+        assert WebhookQueue(path).claim(lease=60).delivery_id == "delivery-1"
+
+
+class TestQueueWorkers:
+    def test_processed_webhook_completed(self):
+        queue = WebhookQueue(":memory:")
+        handler = MagicMock()
+        workers = QueueWorkers(queue, handler, workers=1)
+        queue.put(b"{}", "delivery-1", "issues")
+
+        assert workers.process_one()
+        handler.assert_called_once()
+        assert queue.stats()[0] == 0
+        assert not workers.process_one()
+
+    def test_failed_webhook_retried(self):
+        queue = WebhookQueue(":memory:")
+        handler = MagicMock(side_effect=[RuntimeError("Jira is down"), None])
+        meter = MagicMock()
+        workers = QueueWorkers(queue, handler, workers=1, retry_delay=0, meter=meter)
+        queue.put(b"{}", "delivery-1", "issues")
+
+        workers.process_one()
+        assert queue.stats()[0] == 1
+        workers.process_one()
+        assert handler.call_count == 2
+        assert queue.stats()[0] == 0
+        meter.create_counter.return_value.add.assert_called_once_with(1)
+
+    def test_retry_delay_grows_exponentially(self):
+        queue = MagicMock()
+        workers = QueueWorkers(
+            queue, MagicMock(side_effect=RuntimeError), workers=1, max_attempts=20
+        )
+        for attempts, max_delay in [(0, 5), (3, 40), (10, 600)]:
+            queue.claim.return_value = MagicMock(attempts=attempts)
+            workers.process_one()
+            delay = queue.retry.call_args.args[1]
+            assert max_delay / 2 <= delay <= max_delay
+
+    def test_outage_does_not_count_as_attempt(self):
+        queue = WebhookQueue(":memory:")
+        handler = MagicMock(side_effect=[CircuitOpen("jira", 0)] * 10 + [None])
+        workers = QueueWorkers(
+            queue, handler, workers=1, max_attempts=2, deferred_errors=(CircuitOpen,)
+        )
+        queue.put(b"{}", "delivery-1", "issues")
+
+        while workers.process_one():
+            pass
+        assert handler.call_count == 11
+        assert queue.stats()[0] == 0
+
+    def test_deferred_until_retry_after(self):
+        queue = WebhookQueue(":memory:")
+        handler = MagicMock(side_effect=RateLimited("github", 60))
+        workers = QueueWorkers(queue, handler, workers=1, deferred_errors=(RateLimited,))
+        queue.put(b"{}", "delivery-1", "issues")
+
+        assert workers.process_one()
+        assert not workers.process_one()
+        assert queue.stats()[0] == 1
+
+    def test_webhook_buried_after_max_attempts(self):
+        queue = WebhookQueue(":memory:")
+        handler = MagicMock(side_effect=RuntimeError("invalid payload"))
+        workers = QueueWorkers(queue, handler, workers=1, max_attempts=2, retry_delay=0)
+        queue.put(b"{}", "delivery-1", "issues")
+
+        while workers.process_one():
+            pass
+        assert handler.call_count == 2
+        assert queue.stats()[0] == 0
+
+    def test_workers_drain_queue(self):
+        queue = WebhookQueue(":memory:")
+        handler = MagicMock()
+        workers = QueueWorkers(queue, handler, workers=2, poll_interval=0.01)
+        for n in range(5):
+            queue.put(b"{}", f"delivery-{n}", "issues")
+
+        workers.start()
+        deadline = time.monotonic() + 5
+        while queue.stats()[0] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        workers.stop(timeout=5)
+        assert handler.call_count == 5
+
+
+class TestLanes:
+    def test_lane_processed_one_at_a_time(self):
+        queue = WebhookQueue(":memory:")
+        queue.put(b"1", "delivery-1", "issues", lane="issue-1")
+        queue.put(b"2", "delivery-2", "issues", lane="issue-1")
+        queue.put(b"3", "delivery-3", "issues", lane="issue-2")
+
+        first = queue.claim(lease=60)
+        assert first.body == b"1"
+        assert queue.claim(lease=60).body == b"3"  # other issues are not blocked
+        assert queue.claim(lease=60) is None
+
+        queue.complete(first.id)
+        assert queue.claim(lease=60).body == b"2"
+
+    def test_retried_webhook_keeps_its_place(self):
+        queue = WebhookQueue(":memory:")
+        queue.put(b"1", "delivery-1", "issues", lane="issue-1")
+        queue.put(b"2", "delivery-2", "issues", lane="issue-1")
+
+        queue.retry(queue.claim(lease=60).id, delay=60, error="boom")
+        assert queue.claim(lease=60) is None
+
+    def test_buried_webhook_unblocks_lane(self):
+        queue = WebhookQueue(":memory:")
+        queue.put(b"1", "delivery-1", "issues", lane="issue-1")
+        queue.put(b"2", "delivery-2", "issues", lane="issue-1")
+
+        queue.bury(queue.claim(lease=60).id, error="boom")
+        assert queue.claim(lease=60).body == b"2"